@@ -1,11 +1,14 @@
 #Created from tools/GenerateAst.py
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from abc import ABC, abstractmethod
 from .token import Token
 from typing import TypeVar, Generic
 
 #Allows for subtypes to be accepted
 T_co = TypeVar('T_co', covariant=True)
+
+#struct_hash: structural hash precomputed by the interning factory (interner.py), 0 if the node was not interned.
+#Excluded from __eq__/__hash__/__repr__, so it never changes how nodes compare.
  
  
 #Abstract Expr Interface - Not to be instantiated directly
@@ -50,6 +53,7 @@ class ExprVisitor(ABC, Generic[T_co]):
 class Assign(Expr):
     name: Token
     value: Expr
+    struct_hash: int = field(default=0, compare=False, repr=False)
     
     def accept(self, visitor: 'ExprVisitor[T_co]') -> T_co:
         return visitor.visit_assign_expr(self)
@@ -60,6 +64,7 @@ class Binary(Expr):
     left: Expr
     operator: Token
     right: Expr
+    struct_hash: int = field(default=0, compare=False, repr=False)
     
     def accept(self, visitor: 'ExprVisitor[T_co]') -> T_co:
         return visitor.visit_binary_expr(self)
@@ -70,6 +75,7 @@ class Call(Expr):
     callee: Expr
     paren: Token
     arguments: list[Expr]
+    struct_hash: int = field(default=0, compare=False, repr=False)
     
     def accept(self, visitor: 'ExprVisitor[T_co]') -> T_co:
         return visitor.visit_call_expr(self)
@@ -78,6 +84,7 @@ class Call(Expr):
 @dataclass(frozen=True, slots=True)
 class Grouping(Expr):
     expression: Expr
+    struct_hash: int = field(default=0, compare=False, repr=False)
     
     def accept(self, visitor: 'ExprVisitor[T_co]') -> T_co:
         return visitor.visit_grouping_expr(self)
@@ -86,6 +93,7 @@ class Grouping(Expr):
 @dataclass(frozen=True, slots=True)
 class Literal(Expr):
     value: object
+    struct_hash: int = field(default=0, compare=False, repr=False)
     
     def accept(self, visitor: 'ExprVisitor[T_co]') -> T_co:
         return visitor.visit_literal_expr(self)
@@ -95,6 +103,7 @@ class Literal(Expr):
 class Unary(Expr):
     operator: Token
     right: Expr
+    struct_hash: int = field(default=0, compare=False, repr=False)
     
     def accept(self, visitor: 'ExprVisitor[T_co]') -> T_co:
         return visitor.visit_unary_expr(self)
@@ -105,6 +114,7 @@ class Logical(Expr):
     left: Expr
     operator: Token
     right: Expr
+    struct_hash: int = field(default=0, compare=False, repr=False)
     
     def accept(self, visitor: 'ExprVisitor[T_co]') -> T_co:
         return visitor.visit_logical_expr(self)
@@ -113,6 +123,7 @@ class Logical(Expr):
 @dataclass(frozen=True, slots=True)
 class Variable(Expr):
     name: Token
+    struct_hash: int = field(default=0, compare=False, repr=False)
     
     def accept(self, visitor: 'ExprVisitor[T_co]') -> T_co:
         return visitor.visit_variable_expr(self)
@@ -0,0 +1,708 @@
+from array import array
+from functools import lru_cache
+from collections.abc import Iterable
+from heapq import heapify, heappop, heappush
+
+from .netcore import NetlistCore, Operation, NO_NET, SEEN, DRIVEN
+
+#rewrite tries every cut of up to REWRITE_LEAVES leaves of a node, refactor one cut of up to REFACTOR_LEAVES
+REWRITE_LEAVES = 4
+REFACTOR_LEAVES = 8
+#Cuts kept per node while enumerating
+MAX_CUTS = 8
+#Passes run by optimize()
+SCRIPT = ('balance', 'rewrite', 'refactor', 'balance', 'rewrite')
+
+#fanin0/fanin1 of the constant and of input nodes
+NO_FANIN = -1
+
+
+class AIG:
+    '''
+    And-Inverter Graph: every node is a two input AND and edges can be complemented, so AND, OR, XOR and NOT
+    all become one kind of node and structurally equal logic is found by a dict lookup.
+    Edges are literals: 2 * node + 1 if complemented. Node 0 is constant 0 (literal 0 is False, 1 is True),
+    input nodes have no fanins, and every other node is an AND with fanin0 <= fanin1. Nodes are only ever
+    appended after their fanins, so node order is a topological order, and nodes never change once made.
+
+    and_() structurally hashes (strash) every AND it is asked for and applies the one level rules
+    (x & 0 = 0, x & 1 = x, x & x = x, x & ~x = 0), so a graph built through it has no duplicate nodes.
+    Passes never edit a graph: strash, balance, rewrite and refactor each build and return a new one.
+    '''
+
+    def __init__(self) -> None:
+        #Per node columns
+        self.fanin0 = array('i', [NO_FANIN])
+        self.fanin1 = array('i', [NO_FANIN])
+        self.level = array('I', [0])
+        #Input name -> node, output name -> literal
+        self.inputs: dict[object, int] = {}
+        self.outputs: dict[object, int] = {}
+        self._strash: dict[tuple[int, int], int] = {}
+        #node -> cuts, filled by _cuts (nodes never change, so this stays valid)
+        self._cut_memo: dict[int, list[tuple[int, ...]]] = {}
+
+    @classmethod
+    def from_operations(cls, operations: Iterable[Operation], outputs: Iterable[object] | None) -> 'AIG':
+        '''
+        AIG of a gate list in order (NetlistGenerator.operations). A net takes the value of the last gate
+        driving it, nets read before any gate drives them are inputs and True/False are constants. Operators
+        with no gate ('' with two inputs) cannot be converted and raise ValueError.
+        '''
+        aig = cls()
+        values: dict[object, int] = {False: 0, True: 1}
+
+        def value(name: object) -> int:
+            lit = values.get(name)
+            if lit is None:
+                lit = values[name] = aig.add_input(name)
+            return lit
+
+        for op in operations:
+            a = value(op.A)
+            match op.operation:
+                case '~': result = a ^ 1
+                case '&': result = aig.and_(a, value(op.B))
+                case '|': result = aig.or_(a, value(op.B))
+                case '^': result = aig.xor_(a, value(op.B))
+                case '' if op.B is None: result = a
+                case _: raise ValueError(f'{op} has no gate, it cannot be converted to an AIG.')
+            values[op.output] = result
+
+        for name in sorted(outputs or (), key=str):
+            aig.outputs[name] = value(name)
+        return aig
+
+    def __str__(self) -> str:
+        return f'{self.n_ands} ANDs, depth {self.depth}'
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.fanin0)
+
+    @property
+    def n_ands(self) -> int:
+        return len(self.fanin0) - 1 - len(self.inputs)
+
+    @property
+    def depth(self) -> int:
+        #Levels of AND on the longest input to output path
+        return max((self.level[lit >> 1] for lit in self.outputs.values()), default=0)
+
+    def is_and(self, node: int) -> bool:
+        return self.fanin0[node] != NO_FANIN
+
+    #Construction
+    def add_input(self, name: object) -> int:
+        node = len(self.fanin0)
+        self.fanin0.append(NO_FANIN)
+        self.fanin1.append(NO_FANIN)
+        self.level.append(0)
+        self.inputs[name] = node
+        return node << 1
+
+    def and_(self, a: int, b: int) -> int:
+        if a > b:
+            a, b = b, a
+        if a == 0 or a ^ b == 1: return 0
+        if a == 1 or a == b: return b
+        node = self._strash.get((a, b))
+        if node is None:
+            node = len(self.fanin0)
+            self.fanin0.append(a)
+            self.fanin1.append(b)
+            self.level.append(1 + max(self.level[a >> 1], self.level[b >> 1]))
+            self._strash[(a, b)] = node
+        return node << 1
+
+    def lookup(self, a: int, b: int) -> int | None:
+        #and_ without adding a node: the literal a & b already has, None if it would need a new node
+        if a > b:
+            a, b = b, a
+        if a == 0 or a ^ b == 1: return 0
+        if a == 1 or a == b: return b
+        node = self._strash.get((a, b))
+        return None if node is None else node << 1
+
+    def or_(self, a: int, b: int) -> int:
+        return self.and_(a ^ 1, b ^ 1) ^ 1
+
+    def xor_(self, a: int, b: int) -> int:
+        #~(a & b) & ~(~a & ~b), the form to_core() maps back to one XOR
+        if a <= 1 or b <= 1 or a >> 1 == b >> 1:
+            if a <= 1: return b ^ a
+            if b <= 1: return a ^ b
+            return (a ^ b) & 1
+        return self.and_(self.and_(a, b) ^ 1, self.and_(a ^ 1, b ^ 1) ^ 1)
+
+    #Passes
+    def optimize(self, script: Iterable[str] = SCRIPT, depth: bool = False) -> 'AIG':
+        #Runs the passes named in script in order and returns the graph seen that maps to the fewest gates, then
+        #the fewest levels (to_core); depth=True puts levels first. AND count alone is not the measure: an XOR
+        #is three ANDs but one gate.
+        def cost(aig: AIG) -> tuple[int, int]:
+            core = aig.to_core()
+            return (core.max_level, core.n_gates) if depth else (core.n_gates, core.max_level)
+
+        best = aig = self.strash()
+        best_cost = cost(best)
+        for step in script:
+            aig = getattr(aig, step)()
+            aig_cost = cost(aig)
+            if aig_cost < best_cost:
+                best, best_cost = aig, aig_cost
+        return best
+
+    def strash(self) -> 'AIG':
+        #Copy of the graph with only the nodes the outputs reach, rehashed
+        new, mapping = self._start()
+        live = self._live()
+        for node in range(1, self.n_nodes):
+            if live[node] and self.is_and(node):
+                mapping[node] = new.and_(_map(mapping, self.fanin0[node]), _map(mapping, self.fanin1[node]))
+        return new._finish(self, mapping)
+
+    def balance(self) -> 'AIG':
+        '''
+        Rebuilds every multi input AND as a tree of minimum depth. A supergate is the AND of the leaves reached
+        from a node through uncomplemented edges into ANDs with one fanout; its leaves are combined two at a
+        time, always the two of lowest level first (Huffman on levels), so late arriving signals go in last.
+        '''
+        new, mapping = self._start()
+        live = self._live()
+        fanouts = self._fanouts(live)
+
+        #Supergate roots are the outputs and the leaves of other supergates, found from the outputs down
+        needed = bytearray(self.n_nodes)
+        for lit in self.outputs.values():
+            needed[lit >> 1] = 1
+        supergates: dict[int, list[int]] = {}
+        for node in range(self.n_nodes - 1, 0, -1):
+            if needed[node] and self.is_and(node):
+                leaves = self._supergate(node, fanouts)
+                supergates[node] = leaves
+                for lit in leaves:
+                    needed[lit >> 1] = 1
+
+        for node in range(1, self.n_nodes):
+            if node in supergates:
+                mapping[node] = new._and_balanced([_map(mapping, lit) for lit in supergates[node]])
+        return new._finish(self, mapping)
+
+    def rewrite(self) -> 'AIG':
+        #Replaces the logic of each node over one of its cuts of up to REWRITE_LEAVES leaves by a smaller
+        #structure, when one exists (see _resynthesize)
+        return self._resynthesize(lambda graph, node: graph._cuts(node, REWRITE_LEAVES))
+
+    def refactor(self) -> 'AIG':
+        #As rewrite, over one large reconvergent cut of up to REFACTOR_LEAVES leaves per node
+        return self._resynthesize(lambda graph, node: [graph._reconvergent_cut(node, REFACTOR_LEAVES)])
+
+    #Mapping
+    def to_core(self) -> NetlistCore:
+        '''
+        Maps the graph back to the AND, OR, XOR and NOT gates NetlistGenerator emits. ~(a & b) & ~(~a & ~b) is
+        one XOR, which takes either polarity of its inputs. Any other node is an AND of its fanins or, inverted,
+        an OR of their complements; going in node order, each node takes the form needing fewer NOTs, counting
+        its inputs' polarities that do not exist yet and the polarity of itself that its readers want.
+        Each output's gate drives the output net directly.
+        '''
+        #Structure of each AND node that is used: ('^', a, b) computes a ^ b, ('&', a, b) computes a & b
+        needed = bytearray(self.n_nodes)
+        reads: dict[int, int] = {}
+        for lit in self.outputs.values():
+            needed[lit >> 1] = 1
+            reads[lit] = reads.get(lit, 0) + 1
+        gates: dict[int, tuple[str, int, int]] = {}
+        for node in range(self.n_nodes - 1, 0, -1):
+            if needed[node] and self.is_and(node):
+                gate = gates[node] = self._gate(node)
+                needed[gate[1] >> 1] = needed[gate[2] >> 1] = 1
+                if gate[0] == '&':
+                    reads[gate[1]] = reads.get(gate[1], 0) + 1
+                    reads[gate[2]] = reads.get(gate[2], 0) + 1
+
+        core = NetlistCore()
+
+        #An output's literal is made on the output net, the first output (sorted) wins if two share one
+        targets: dict[int, int] = {}
+        for name, lit in sorted(self.outputs.items(), key=lambda item: str(item[0])):
+            if lit > 1 and (self.is_and(lit >> 1) or lit & 1) and lit not in targets:
+                targets[lit] = core.net(name)
+        names = {node: name for name, node in self.inputs.items()}
+        nets: dict[int, int] = {}
+
+        def exists(lit: int) -> bool:
+            return lit in nets or lit <= 1 or not lit & 1 and not self.is_and(lit >> 1)
+
+        def net_of(lit: int) -> int:
+            net = nets.get(lit)
+            if net is not None:
+                return net
+            node = lit >> 1
+            if node == 0:
+                net = core.net(bool(lit & 1))
+            elif not self.is_and(node) and not lit & 1:
+                net = core.net(names[node])
+                core.mark(net, SEEN)
+            else:
+                base = net_of(lit ^ 1)
+                net = targets.get(lit)
+                if net is None:
+                    net = core.new_temp()
+                core.add_gate('~', base, NO_NET, net)
+            nets[lit] = net
+            return net
+
+        for node in range(1, self.n_nodes):
+            if node not in gates:
+                continue
+            kind, a, b = gates[node]
+            if kind == '^':
+                #a ^ b from whichever polarities exist, the output is inverted once per complement used
+                a_, b_ = (lit if exists(lit) else lit ^ 1 for lit in (a, b))
+                op, inverted = '^', (a ^ a_ ^ b ^ b_) & 1
+                a, b = a_, b_
+            else:
+                nots_and = (not exists(a)) + (not exists(b)) + (reads.get(node << 1 | 1, 0) > 0)
+                nots_or = (not exists(a ^ 1)) + (not exists(b ^ 1)) + (reads.get(node << 1, 0) > 0)
+                if nots_or < nots_and:
+                    op, a, b, inverted = '|', a ^ 1, b ^ 1, 1
+                else:
+                    op, inverted = '&', 0
+            lit = node << 1 | inverted
+            out = targets.get(lit)
+            if out is None:
+                out = core.new_temp()
+            core.add_gate(op, net_of(a), net_of(b), out)
+            nets[lit] = out
+
+        for name, lit in sorted(self.outputs.items(), key=lambda item: str(item[0])):
+            net, out = net_of(lit), core.net(name)
+            if net != out:
+                core.add_gate('', net, NO_NET, out)
+            core.mark(out, DRIVEN)
+        return core
+
+    #Helpers
+    def _start(self) -> tuple['AIG', array]:
+        #Empty graph with the same inputs, and a node -> new literal map with the inputs filled in
+        new = AIG()
+        mapping = array('i', [0]) * self.n_nodes
+        for name, node in self.inputs.items():
+            mapping[node] = new.add_input(name)
+        return new, mapping
+
+    def _finish(self, old: 'AIG', mapping: array) -> 'AIG':
+        self.outputs = {name: _map(mapping, lit) for name, lit in old.outputs.items()}
+        return self
+
+    def _live(self, roots: Iterable[int] | None = None) -> bytearray:
+        #1 for every node the outputs (or the given root literals) reach
+        live = bytearray(self.n_nodes)
+        for lit in self.outputs.values() if roots is None else roots:
+            live[lit >> 1] = 1
+        for node in range(self.n_nodes - 1, 0, -1):
+            if live[node] and self.is_and(node):
+                live[self.fanin0[node] >> 1] = live[self.fanin1[node] >> 1] = 1
+        return live
+
+    def _fanouts(self, live: bytearray) -> array:
+        #Edges into each node from live nodes and outputs
+        fanouts = array('I', [0]) * self.n_nodes
+        for lit in self.outputs.values():
+            fanouts[lit >> 1] += 1
+        for node in range(1, self.n_nodes):
+            if live[node] and self.is_and(node):
+                fanouts[self.fanin0[node] >> 1] += 1
+                fanouts[self.fanin1[node] >> 1] += 1
+        return fanouts
+
+    def _supergate(self, node: int, fanouts: array) -> list[int]:
+        leaves = []
+        stack = [self.fanin1[node], self.fanin0[node]]
+        while stack:
+            lit = stack.pop()
+            child = lit >> 1
+            if not lit & 1 and self.is_and(child) and fanouts[child] == 1:
+                stack.extend((self.fanin1[child], self.fanin0[child]))
+            else:
+                leaves.append(lit)
+        return leaves
+
+    def _and_balanced(self, lits: list[int]) -> int:
+        unique = set(lits)
+        if any(lit ^ 1 in unique for lit in unique):
+            return 0
+        heap = [(self.level[lit >> 1], i, lit) for i, lit in enumerate(sorted(unique))]
+        heapify(heap)
+        order = len(heap)
+        while len(heap) > 1:
+            _, _, a = heappop(heap)
+            _, _, b = heappop(heap)
+            result = self.and_(a, b)
+            if result == 0:
+                return 0
+            heappush(heap, (self.level[result >> 1], order, result))
+            order += 1
+        return heap[0][2]
+
+    def _gate(self, node: int) -> tuple[str, int, int]:
+        f0, f1 = self.fanin0[node], self.fanin1[node]
+        if f0 & 1 and f1 & 1:
+            p, q = f0 >> 1, f1 >> 1
+            if self.is_and(p) and self.is_and(q):
+                a, b = self.fanin0[p], self.fanin1[p]
+                if {self.fanin0[q], self.fanin1[q]} == {a ^ 1, b ^ 1}:
+                    return '^', a, b
+        return '&', f0, f1
+
+    #Cuts
+    def _cuts(self, root: int, k: int) -> list[tuple[int, ...]]:
+        #Cuts of up to k leaves of root (all but the trivial one), at most MAX_CUTS per node, smallest first.
+        memo = self._cut_memo
+        stack = [root]
+        while stack:
+            node = stack[-1]
+            if node in memo:
+                stack.pop()
+                continue
+            if not self.is_and(node):
+                memo[node] = [(node,)]
+                stack.pop()
+                continue
+            a, b = self.fanin0[node] >> 1, self.fanin1[node] >> 1
+            missing = [child for child in (a, b) if child not in memo]
+            if missing:
+                stack.extend(missing)
+                continue
+            stack.pop()
+            merged = set()
+            for cut_a in memo[a]:
+                for cut_b in memo[b]:
+                    cut = tuple(sorted(set(cut_a) | set(cut_b)))
+                    if len(cut) <= k:
+                        merged.add(cut)
+            cuts = []
+            for cut in sorted(merged, key=lambda cut: (len(cut), cut)):
+                leaves = set(cut)
+                if not any(leaves.issuperset(kept) for kept in cuts):
+                    cuts.append(cut)
+            memo[node] = [(node,)] + cuts[:MAX_CUTS - 1]
+        return memo[root][1:]
+
+    def _reconvergent_cut(self, root: int, k: int) -> tuple[int, ...]:
+        #Grows a cut from the fanins of root, each time expanding the leaf that adds fewest new leaves,
+        #so reconvergent paths close inside the cut
+        leaves = {self.fanin0[root] >> 1, self.fanin1[root] >> 1}
+        visited = leaves | {root}
+        while True:
+            best, best_cost = None, None
+            for leaf in leaves:
+                if not self.is_and(leaf):
+                    continue
+                cost = sum(1 for lit in (self.fanin0[leaf], self.fanin1[leaf]) if lit >> 1 not in visited) - 1
+                if best is None or (cost, -self.level[leaf], leaf) < (best_cost, -self.level[best], best):
+                    best, best_cost = leaf, cost
+            if best is None or len(leaves) + best_cost > k:
+                return tuple(sorted(leaves))
+            leaves.remove(best)
+            for lit in (self.fanin0[best], self.fanin1[best]):
+                leaves.add(lit >> 1)
+                visited.add(lit >> 1)
+
+    def _truth_table(self, root: int, leaves: tuple[int, ...]) -> int:
+        #Truth table of root over the leaves as an int: bit r is the value when leaf i is bit i of r
+        k = len(leaves)
+        full = _FULL[k]
+        tables = {leaf: _var(i, k) for i, leaf in enumerate(leaves)}
+        stack = [root]
+        while stack:
+            node = stack[-1]
+            if node in tables:
+                stack.pop()
+                continue
+            f0, f1 = self.fanin0[node], self.fanin1[node]
+            missing = [lit >> 1 for lit in (f0, f1) if lit >> 1 not in tables]
+            if missing:
+                stack.extend(missing)
+                continue
+            stack.pop()
+            tables[node] = (tables[f0 >> 1] ^ (full if f0 & 1 else 0)) & (tables[f1 >> 1] ^ (full if f1 & 1 else 0))
+        return tables[root]
+
+    #Rewriting
+    def _resynthesize(self, cuts) -> 'AIG':
+        '''
+        Copies the graph node by node in order, and after copying each node tries to replace its logic over
+        each cut from cuts(new graph, node) by a resynthesized structure (_synthesize). A replacement is taken
+        when it adds fewer nodes than it frees: the freed nodes are the node's maximum fanout free cone above
+        the cut (nodes only it uses), the added ones are the structure's nodes that strash cannot find already
+        in use. Equal counts are taken when they lower the level.
+        Reference counts in the new graph include the fanouts each copied node will get from nodes not
+        copied yet (its fanouts in this graph), so a cone is never counted as free when later logic reads it.
+        '''
+        new, mapping = self._start()
+        live = self._live()
+        fanouts = self._fanouts(live)
+        refs: list[int] = [0] * new.n_nodes
+
+        def grow() -> None:
+            refs.extend([0] * (new.n_nodes - len(refs)))
+
+        def ref(node: int, leaves=()) -> None:
+            #One more reference to node; a node coming back to life references its fanins again
+            stack = [node]
+            while stack:
+                node = stack.pop()
+                refs[node] += 1
+                if refs[node] == 1 and new.is_and(node) and node not in leaves:
+                    stack.extend((new.fanin0[node] >> 1, new.fanin1[node] >> 1))
+
+        def deref(node: int, leaves=()) -> int:
+            #One reference less; returns the number of AND nodes that die (have no references left)
+            dead = 0
+            stack = [node]
+            while stack:
+                node = stack.pop()
+                refs[node] -= 1
+                if refs[node] == 0 and new.is_and(node) and node not in leaves:
+                    dead += 1
+                    stack.extend((new.fanin0[node] >> 1, new.fanin1[node] >> 1))
+            return dead
+
+        def fanins(node: int) -> tuple[int, int]:
+            return new.fanin0[node] >> 1, new.fanin1[node] >> 1
+
+        for node in range(1, self.n_nodes):
+            if not live[node]:
+                continue
+            if not self.is_and(node):
+                refs[mapping[node] >> 1] += fanouts[node]
+                continue
+            a, b = _map(mapping, self.fanin0[node]), _map(mapping, self.fanin1[node])
+            result = new.and_(a, b)
+            grow()
+            #This node's references to a and b move to result
+            ref(result >> 1)
+            refs[result >> 1] += fanouts[node] - 1
+            deref(a >> 1)
+            deref(b >> 1)
+
+            root = result >> 1
+            if result > 1 and new.is_and(root) and refs[root] == fanouts[node]:
+                best = None
+                count = refs[root]
+                for leaves in cuts(new, root):
+                    leaf_set = set(leaves)
+                    #Root's cone above the cut that only root uses: the nodes that die with root's fanin references.
+                    #Root counts as unreferenced too while the replacement is costed, so it is not found for free.
+                    refs[root] = 0
+                    freed = 1 + sum(deref(fanin, leaf_set) for fanin in fanins(root))
+                    graph, top = _synthesize(new._truth_table(root, leaves), len(leaves))
+                    added, level = _dry_run(new, refs, graph, top, leaves)
+                    for fanin in fanins(root):
+                        ref(fanin, leaf_set)
+                    refs[root] = count
+                    gain = freed - added
+                    if (gain > 0 or gain == 0 and level < new.level[root]) and (best is None or (gain, -level) > best[0]):
+                        best = ((gain, -level), graph, top, leaves)
+
+                if best is not None:
+                    _, graph, top, leaves = best
+                    replacement = _build(new, graph, top, leaves)
+                    grow()
+                    if replacement >> 1 != root:
+                        #The replacement takes over root's references, and root's cone dies unless used elsewhere
+                        ref(replacement >> 1)
+                        refs[replacement >> 1] += count - 1
+                        refs[root] -= count - 1
+                        deref(root)
+                        #The replacement computes root, so it takes result's complement
+                        result = replacement ^ (result & 1)
+            mapping[node] = result
+
+        return new._finish(self, mapping).strash()
+
+
+#Truth tables: bit r of a table over k variables is the value at row r, variable i is bit i of r
+_FULL = [(1 << (1 << k)) - 1 for k in range(REFACTOR_LEAVES + 1)]
+_VARS: dict[tuple[int, int], int] = {}
+
+
+def _var(i: int, k: int) -> int:
+    table = _VARS.get((i, k))
+    if table is None:
+        block = ((1 << (1 << i)) - 1) << (1 << i)
+        table = 0
+        for start in range(0, 1 << k, 2 << i):
+            table |= block << start
+        _VARS[(i, k)] = table
+    return table
+
+
+def _cofactors(f: int, i: int, k: int) -> tuple[int, int]:
+    #f with variable i set to 0 and to 1, both still over k variables (independent of i)
+    v, s = _var(i, k), 1 << i
+    low = f & (_FULL[k] ^ v)
+    high = f & v
+    return low | low << s, high | high >> s
+
+
+def _map(mapping: array, lit: int) -> int:
+    return mapping[lit >> 1] ^ (lit & 1)
+
+
+#Resynthesis: a truth table over k leaves becomes a small AIG whose inputs 1..k are the leaves
+@lru_cache(maxsize=1 << 14)
+def _synthesize(f: int, k: int) -> tuple[AIG, int]:
+    #The smallest of a Shannon/XOR decomposition and factored irredundant SOPs of f and ~f. Small functions
+    #repeat all over a design, so results are cached: the graphs are shared, and only ever read afterwards.
+    candidates = []
+    graph = _leaf_graph(k)
+    candidates.append((graph, _shannon(graph, f, k, {})))
+    for negate in (0, 1):
+        graph = _leaf_graph(k)
+        cubes, _ = _isop(f ^ (_FULL[k] if negate else 0), f ^ (_FULL[k] if negate else 0), k, k)
+        candidates.append((graph, _factor(graph, [frozenset(cube) for cube in cubes]) ^ negate))
+    return min(candidates, key=lambda candidate: (_size(*candidate), candidate[0].level[candidate[1] >> 1]))
+
+
+def _leaf_graph(k: int) -> AIG:
+    graph = AIG()
+    for i in range(k):
+        graph.add_input(i)
+    return graph
+
+
+def _size(graph: AIG, root: int) -> int:
+    live = graph._live((root,))
+    return sum(1 for node in range(graph.n_nodes) if live[node] and graph.is_and(node))
+
+
+def _shannon(graph: AIG, f: int, k: int, memo: dict[int, int]) -> int:
+    full = _FULL[k]
+    if f == 0: return 0
+    if f == full: return 1
+    if f in memo: return memo[f]
+    if f ^ full in memo: return memo[f ^ full] ^ 1
+
+    split = None
+    for i in range(k):
+        low, high = _cofactors(f, i, k)
+        if low == high:
+            continue
+        x = (i + 1) << 1
+        #AND, OR and XOR with one variable, cheapest first
+        if low == 0: result = graph.and_(x, _shannon(graph, high, k, memo))
+        elif high == 0: result = graph.and_(x ^ 1, _shannon(graph, low, k, memo))
+        elif high == full: result = graph.or_(x, _shannon(graph, low, k, memo))
+        elif low == full: result = graph.or_(x ^ 1, _shannon(graph, high, k, memo))
+        elif low ^ high == full: result = graph.xor_(x, _shannon(graph, low, k, memo))
+        else:
+            support = _support_size(low, k) + _support_size(high, k)
+            if split is None or support < split[0]:
+                split = (support, x, low, high)
+            continue
+        memo[f] = result
+        return result
+
+    #No simple decomposition: multiplex on the variable leaving the smallest cofactors
+    _, x, low, high = split
+    result = graph.or_(graph.and_(x, _shannon(graph, high, k, memo)), graph.and_(x ^ 1, _shannon(graph, low, k, memo)))
+    memo[f] = result
+    return result
+
+
+def _support_size(f: int, k: int) -> int:
+    return sum(1 for i in range(k) if len(set(_cofactors(f, i, k))) == 2)
+
+
+def _isop(lower: int, upper: int, k: int, top: int) -> tuple[list[list[int]], int]:
+    #Minato-Morreale irredundant sum of products of some f with lower <= f <= upper, over variables below top.
+    #Returns (cubes as lists of leaf graph literals, truth table of the cover).
+    full = _FULL[k]
+    if lower == 0:
+        return [], 0
+    if upper == full:
+        return [[]], full
+    i = top - 1
+    while i >= 0:
+        lower0, lower1 = _cofactors(lower, i, k)
+        upper0, upper1 = _cofactors(upper, i, k)
+        if lower0 != lower1 or upper0 != upper1:
+            break
+        i -= 1
+    cubes0, cover0 = _isop(lower0 & (full ^ upper1), upper0, k, i)
+    cubes1, cover1 = _isop(lower1 & (full ^ upper0), upper1, k, i)
+    rest = (lower0 & (full ^ cover0)) | (lower1 & (full ^ cover1))
+    cubes2, cover2 = _isop(rest, upper0 & upper1, k, i)
+    v = _var(i, k)
+    x = (i + 1) << 1
+    cubes = [cube + [x ^ 1] for cube in cubes0] + [cube + [x] for cube in cubes1] + cubes2
+    return cubes, (cover0 & (full ^ v)) | (cover1 & v) | cover2
+
+
+def _factor(graph: AIG, cubes: list[frozenset[int]]) -> int:
+    #Algebraic factoring: pull out the literal in the most cubes, f = x & (f / x) | rest
+    if len(cubes) == 0:
+        return 0
+    if any(len(cube) == 0 for cube in cubes):
+        return 1
+    counts: dict[int, int] = {}
+    for cube in cubes:
+        for lit in cube:
+            counts[lit] = counts.get(lit, 0) + 1
+    lit, count = max(sorted(counts.items()), key=lambda item: item[1])
+    if count == 1:
+        result = 0
+        for cube in cubes:
+            term = 1
+            for lit in sorted(cube):
+                term = graph.and_(term, lit)
+            result = graph.or_(result, term)
+        return result
+    inside = [cube - {lit} for cube in cubes if lit in cube]
+    outside = [cube for cube in cubes if lit not in cube]
+    return graph.or_(graph.and_(lit, _factor(graph, inside)), _factor(graph, outside))
+
+
+def _dry_run(target: AIG, refs: list[int], graph: AIG, root: int, leaves: tuple[int, ...]) -> tuple[int, int]:
+    #(nodes building graph over leaves in target would add, level of its root). Nodes strash finds but that
+    #have no references (e.g. the cone being replaced) count as added, as they only live if this is built.
+    live = graph._live((root,))
+    lits: dict[int, int | None] = {0: 0}
+    levels: dict[int, int] = {0: 0}
+    for i, leaf in enumerate(leaves):
+        lits[i + 1] = leaf << 1
+        levels[i + 1] = target.level[leaf]
+    added = 0
+    for node in range(len(leaves) + 1, graph.n_nodes):
+        if not live[node]:
+            continue
+        f0, f1 = graph.fanin0[node], graph.fanin1[node]
+        a, b = lits[f0 >> 1], lits[f1 >> 1]
+        found = None
+        if a is not None and b is not None:
+            found = target.lookup(a ^ (f0 & 1), b ^ (f1 & 1))
+        if found is None:
+            added += 1
+            levels[node] = 1 + max(levels[f0 >> 1], levels[f1 >> 1])
+        else:
+            if found > 1 and target.is_and(found >> 1) and refs[found >> 1] == 0:
+                added += 1
+            levels[node] = target.level[found >> 1]
+        lits[node] = found
+    return added, levels[root >> 1]
+
+
+def _build(target: AIG, graph: AIG, root: int, leaves: tuple[int, ...]) -> int:
+    #Adds graph over leaves to target, returns the literal of root
+    lits = array('i', [0]) * graph.n_nodes
+    for i, leaf in enumerate(leaves):
+        lits[i + 1] = leaf << 1
+    live = graph._live((root,))
+    for node in range(len(leaves) + 1, graph.n_nodes):
+        if live[node]:
+            lits[node] = target.and_(_map(lits, graph.fanin0[node]), _map(lits, graph.fanin1[node]))
+    return _map(lits, root)
@@ -0,0 +1,218 @@
+from time import perf_counter
+import heapq
+
+
+class MinimumCover:
+    """Minimum cost set cover for prime implicant charts.
+    rows[j] is the bitset of columns (minterms) row j (a prime implicant) covers, and costs[j] its cost.
+    Columns are stored the other way round, as bitsets of the rows covering them, so every step of the
+    reduction and the search is integer and/or/popcount.
+
+    solve() first reduces the chart (essential rows, row dominance, column dominance, repeated until nothing
+    changes), then runs a branch and bound exact cover on what is left. The search starts from a greedy
+    cover, always branches on the column with the fewest rows, and prunes with a lower bound from columns
+    that share no row. If it runs past the time budget the best cover found so far is returned and exact is
+    False."""
+
+    def __init__(self, rows: list[int], costs: list[int] | None = None) -> None:
+        self.rows = rows
+        self.costs = costs if costs is not None else [1] * len(rows)
+        self.n_columns = max((row.bit_length() for row in rows), default=0)
+        self.columns = [0] * self.n_columns
+        for j, row in enumerate(rows):
+            for i in _bits(row):
+                self.columns[i] |= 1 << j
+
+        # True if the returned cover is proven minimal
+        self.exact = True
+        # Branch and bound nodes visited
+        self.nodes = 0
+
+    def solve(self, time_budget: float = 1.0) -> list[int]:
+        """Return the indices of the rows in a minimum cost cover, sorted."""
+        self._deadline = perf_counter() + time_budget
+        uncovered = (1 << self.n_columns) - 1
+        for i in range(self.n_columns):
+            if self.columns[i] == 0:
+                raise ValueError(f"Column {i} is not covered by any row.")
+
+        alive = (1 << len(self.rows)) - 1
+        chosen, uncovered, alive = self._reduce([], uncovered, alive)
+        if uncovered:
+            self._best = self._greedy(uncovered, alive)
+            self._best_cost = self._cost(self._best)
+            try:
+                self._search(uncovered, alive, [], 0)
+            except _OutOfTime:
+                self.exact = False
+            chosen += self._best
+        return sorted(chosen)
+
+    def _cost(self, rows: list[int]) -> int:
+        return sum(self.costs[j] for j in rows)
+
+    def _reduce(self, chosen: list[int], uncovered: int, alive: int) -> tuple[list[int], int, int]:
+        """Apply the reductions until none changes the chart. Returns (chosen rows, uncovered, alive rows).
+        Charts can have thousands of rows, and one and/or/shift of a bitset that wide costs as much as the
+        whole int, so this works on index lists, sets and bytearray flags and rebuilds the bitsets at the end."""
+        rows, columns, costs = self.rows, self.columns, self.costs
+        row_columns = [list(_bits(row)) for row in rows]
+        column_rows = [list(_bits(column)) for column in columns]
+        row_sets = [set(row) for row in row_columns]
+        column_sets = [set(column) for column in column_rows]
+        is_alive = bytearray(len(rows))
+        is_uncovered = bytearray(len(columns))
+        for j in _bits(alive):
+            is_alive[j] = 1
+        for i in _bits(uncovered):
+            is_uncovered[i] = 1
+
+        changed = True
+        while changed:
+            changed = False
+
+            # Essential rows: the only row left covering a column
+            for i in range(len(columns)):
+                if is_uncovered[i]:
+                    covering = [j for j in column_rows[i] if is_alive[j]]
+                    if len(covering) == 1:
+                        j = covering[0]
+                        chosen.append(j)
+                        is_alive[j] = 0
+                        for k in row_columns[j]:
+                            is_uncovered[k] = 0
+                        changed = True
+
+            # Row dominance: drop a row whose columns another row covers at no more cost.
+            # A dominating row shares every column, so it is one of the rows covering the row's first column.
+            for j in range(len(rows)):
+                if not is_alive[j]:
+                    continue
+                row = [i for i in row_columns[j] if is_uncovered[i]]
+                if len(row) == 0:
+                    is_alive[j] = 0
+                    changed = True
+                    continue
+                for k in column_rows[row[0]]:
+                    if k == j or not is_alive[k] or costs[k] > costs[j]:
+                        continue
+                    other = row_sets[k]
+                    if all(i in other for i in row):
+                        # Equal rows at equal cost: keep the lower index
+                        equal = len(row) == sum(1 for i in row_columns[k] if is_uncovered[i])
+                        if not equal or costs[k] < costs[j] or k < j:
+                            is_alive[j] = 0
+                            changed = True
+                            break
+
+            # Column dominance: a column whose rows include every row of another column is covered whenever
+            # that column is, so it can be dropped. Superset columns share the rows of the column's first row.
+            for i in range(len(columns)):
+                if not is_uncovered[i]:
+                    continue
+                covering = [j for j in column_rows[i] if is_alive[j]]
+                for k in row_columns[covering[0]]:
+                    if k == i or not is_uncovered[k]:
+                        continue
+                    other = column_sets[k]
+                    if all(j in other for j in covering):
+                        equal = len(covering) == sum(1 for j in column_rows[k] if is_alive[j])
+                        if not equal or k > i:
+                            is_uncovered[k] = 0
+                            changed = True
+
+        return chosen, _from_flags(is_uncovered), _from_flags(is_alive)
+
+    def _greedy(self, uncovered: int, alive: int) -> list[int]:
+        """Return a cover built by repeatedly taking the row covering the most columns per unit cost.
+        Scores only go down as columns get covered, so rows sit in a heap under a possibly stale score and are
+        rescored when they reach the top (lazy greedy)."""
+        rows, costs = self.rows, self.costs
+        heap = [(-(rows[j] & uncovered).bit_count() / costs[j], j) for j in _bits(alive)]
+        heapq.heapify(heap)
+        chosen = []
+        while uncovered:
+            _, j = heapq.heappop(heap)
+            score = -(rows[j] & uncovered).bit_count() / costs[j]
+            if score == 0:
+                continue
+            if heap and score > heap[0][0]:
+                heapq.heappush(heap, (score, j))
+                continue
+            chosen.append(j)
+            uncovered &= ~rows[j]
+        return chosen
+
+    def _lower_bound(self, uncovered: int, alive: int) -> int:
+        """Return a lower bound on the cost of covering uncovered: columns that share no row each need a
+        different row, so the cheapest row of each such column must be paid for."""
+        bound = 0
+        used = 0
+        for i in _bits(uncovered):
+            covering = self.columns[i] & alive
+            if covering & used == 0:
+                used |= covering
+                bound += min(self.costs[j] for j in _bits(covering))
+        return bound
+
+    def _search(self, uncovered: int, alive: int, chosen: list[int], cost: int) -> None:
+        self.nodes += 1
+        if perf_counter() > self._deadline:
+            raise _OutOfTime()
+        if uncovered == 0:
+            if cost < self._best_cost:
+                self._best, self._best_cost = list(chosen), cost
+            return
+        if cost + self._lower_bound(uncovered, alive) >= self._best_cost:
+            return
+
+        # Branch on the column with the fewest rows left
+        column, covering, fewest = -1, 0, None
+        for i in _bits(uncovered):
+            rows_left = self.columns[i] & alive
+            count = rows_left.bit_count()
+            if fewest is None or count < fewest:
+                column, covering, fewest = i, rows_left, count
+                if count <= 1:
+                    break
+        if covering == 0:
+            return
+
+        # Rows covering more of what is left first. A row is excluded from the branches after its own.
+        order = sorted(_bits(covering), key=lambda j: (-(self.rows[j] & uncovered).bit_count(), self.costs[j]))
+        for j in order:
+            chosen.append(j)
+            self._search(uncovered & ~self.rows[j], alive & ~(1 << j), chosen, cost + self.costs[j])
+            chosen.pop()
+            alive &= ~(1 << j)
+
+
+_DIGITS = bytes.maketrans(b"\x00\x01", b"01")
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+def _from_flags(flags: bytearray) -> int:
+    """Return the bitset with bit i set iff flags[i] (flags are 0/1)."""
+    return int(flags[::-1].translate(_DIGITS) or b"0", 2)
+
+
+def _bits(x: int):
+    """Yield the indices of the set bits of x, lowest first."""
+    # Clearing a bit copies the whole int, so sparse ints clear bits one by one and dense ones are read off
+    # their binary string in a single scan
+    if x.bit_count() * 64 < x.bit_length():
+        found = []
+        while x:
+            top = x.bit_length() - 1
+            found.append(top)
+            x ^= 1 << top
+        yield from reversed(found)
+        return
+    digits = bin(x)[:1:-1]
+    i = digits.find("1")
+    while i >= 0:
+        yield i
+        i = digits.find("1", i + 1)
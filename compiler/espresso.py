@@ -0,0 +1,154 @@
+class Espresso:
+    """Heuristic two-level minimisation in the style of Espresso, for functions too wide for Quine-McCluskey.
+    Works on cube covers rather than minterms: cubes are (value, mask) integer pairs as in SimplifyExpression
+    (mask has a 1 for every dash), and nothing is ever expanded to minterms.
+
+    minimize() runs EXPAND and IRREDUNDANT on the input cover, then repeats REDUCE, EXPAND, IRREDUNDANT while
+    the cover gets cheaper (fewer cubes, then fewer literals). Every containment question "is cube c covered
+    by cover G" is answered with a tautology check of G cofactored against c, so no off-set is built."""
+
+    def __init__(self, n_inputs: int, dont_cares: list[tuple[int, int]] | None = None) -> None:
+        self.n_inputs = n_inputs
+        self.full = (1 << n_inputs) - 1
+        self.dont_cares = list(dont_cares) if dont_cares is not None else []
+
+    def minimize(self, cover: list[tuple[int, int]]) -> list[tuple[int, int]]:
+        """Return a cheaper cover of the same function (don't cares aside), sorted by (mask, value)."""
+        cover = self._single_cube_containment([(value & ~mask, mask) for value, mask in cover])
+        # Cubes are only ever checked against the original function, which EXPAND/REDUCE never change
+        self.function = cover + self.dont_cares
+
+        cover = self.irredundant(self.expand(cover))
+        cost = self._cost(cover)
+        while True:
+            candidate = self.irredundant(self.expand(self.reduce(cover)))
+            candidate_cost = self._cost(candidate)
+            if candidate_cost >= cost:
+                break
+            cover, cost = candidate, candidate_cost
+        return sorted(cover, key=lambda cube: (cube[1], cube[0]))
+
+    # Passes
+    def expand(self, cover: list[tuple[int, int]]) -> list[tuple[int, int]]:
+        """Raise literals of each cube (largest cubes first) as long as it stays inside the function, then
+        drop the cubes the expanded cubes contain."""
+        expanded = []
+        for value, mask in sorted(cover, key=lambda cube: -cube[1].bit_count()):
+            if any(self._cube_contains(cube, (value, mask)) for cube in expanded):
+                continue
+            for bit in self._raise_order((value, mask), cover):
+                candidate = (value & ~bit, mask | bit)
+                if self._covers(self.function, candidate):
+                    value, mask = candidate
+            expanded.append((value, mask))
+        return self._single_cube_containment(expanded)
+
+    def irredundant(self, cover: list[tuple[int, int]]) -> list[tuple[int, int]]:
+        """Drop cubes covered by the rest of the cover, smallest cubes first."""
+        cover = sorted(cover, key=lambda cube: cube[1].bit_count())
+        i = 0
+        while i < len(cover):
+            rest = cover[:i] + cover[i + 1:] + self.dont_cares
+            if self._covers(rest, cover[i]):
+                del cover[i]
+            else:
+                i += 1
+        return cover
+
+    def reduce(self, cover: list[tuple[int, int]]) -> list[tuple[int, int]]:
+        """Shrink each cube (largest first) to the part of it no other cube covers, one dash at a time:
+        a dash can become a literal when the other half of the cube is covered by the rest of the cover."""
+        cover = sorted(cover, key=lambda cube: -cube[1].bit_count())
+        for i in range(len(cover)):
+            value, mask = cover[i]
+            rest = cover[:i] + cover[i + 1:] + self.dont_cares
+            for bit in _bits(mask):
+                low, high = (value, mask & ~bit), (value | bit, mask & ~bit)
+                if self._covers(rest, high):
+                    value, mask = low
+                elif self._covers(rest, low):
+                    value, mask = high
+            cover[i] = (value, mask)
+        return cover
+
+    # Helpers
+    def _cost(self, cover: list[tuple[int, int]]) -> tuple[int, int]:
+        """Return (cubes, literals): one AND gate per cube, one input per literal."""
+        return len(cover), sum(self.n_inputs - mask.bit_count() for _, mask in cover)
+
+    def _raise_order(self, cube: tuple[int, int], cover: list[tuple[int, int]]) -> list[int]:
+        """Return the literals of cube, the ones most cubes of cover disagree with first, so expanding
+        towards them is most likely to swallow those cubes."""
+        value, mask = cube
+        literals = list(_bits(self.full & ~mask))
+        disagree = {bit: 0 for bit in literals}
+        for other_value, other_mask in cover:
+            differ = (other_value ^ value) & ~other_mask & ~mask
+            for bit in literals:
+                if differ & bit:
+                    disagree[bit] += 1
+        return sorted(literals, key=lambda bit: -disagree[bit])
+
+    def _single_cube_containment(self, cover: list[tuple[int, int]]) -> list[tuple[int, int]]:
+        """Return cover without duplicates and without cubes contained in another single cube."""
+        kept = []
+        for cube in sorted(set(cover), key=lambda cube: -cube[1].bit_count()):
+            if not any(self._cube_contains(other, cube) for other in kept):
+                kept.append(cube)
+        return kept
+
+    @staticmethod
+    def _cube_contains(outer: tuple[int, int], inner: tuple[int, int]) -> bool:
+        """Return True if every minterm of inner is in outer."""
+        return inner[1] & ~outer[1] == 0 and (inner[0] ^ outer[0]) & ~outer[1] == 0
+
+    def _covers(self, cover: list[tuple[int, int]], cube: tuple[int, int]) -> bool:
+        """Return True if the cube is contained in the union of cover."""
+        return self._tautology(self._cofactor(cover, cube))
+
+    def _cofactor(self, cover: list[tuple[int, int]], cube: tuple[int, int]) -> list[tuple[int, int]]:
+        """Return cover restricted to the cube: cubes that intersect it, with the cube's literals made dashes."""
+        value, mask = cube
+        fixed = self.full & ~mask
+        cofactor = []
+        for other_value, other_mask in cover:
+            if (other_value ^ value) & ~other_mask & fixed == 0:
+                other_mask |= fixed
+                cofactor.append((other_value & ~other_mask, other_mask))
+        return cofactor
+
+    def _tautology(self, cover: list[tuple[int, int]]) -> bool:
+        """Return True if the union of cover is every minterm. Splits on the most used binate variable,
+        a cover that is unate in every variable is a tautology only if it has the universal cube."""
+        full = self.full
+        if len(cover) == 0:
+            return False
+        if any(mask == full for _, mask in cover):
+            return True
+        # Not enough minterms to fill the space
+        if sum(1 << mask.bit_count() for _, mask in cover) < 1 << self.n_inputs:
+            return False
+
+        ones = zeros = 0
+        for value, mask in cover:
+            fixed = full & ~mask
+            ones |= value & fixed
+            zeros |= ~value & fixed
+        binate = ones & zeros
+        if binate == 0:
+            return False
+
+        bit = max(_bits(binate), key=lambda bit: sum(1 for _, mask in cover if not mask & bit))
+        for half in (0, bit):
+            cofactor = [(value & ~bit, mask | bit) for value, mask in cover if mask & bit or value & bit == half]
+            if not self._tautology(cofactor):
+                return False
+        return True
+
+
+def _bits(x: int):
+    """Yield the set bits of x as single bit masks, lowest first."""
+    while x:
+        bit = x & -x
+        yield bit
+        x ^= bit
@@ -0,0 +1,163 @@
+from .token import Token, Tok
+from .Expr import Expr, Assign, Binary, Call, Grouping, Literal, Logical, Unary, Variable
+from .interner import InterningExprFactory
+
+
+class ExprFolder:
+    '''
+    Constant folding and Boolean identity simplification over Expr trees, run before netlist generation.
+    Rules, for the gate operators &, |, ^ and ~ (x is any operand, 0/1 are constants):
+        constants:        x & 0 = 0, x & 1 = x, x | 1 = 1, x | 0 = x, x ^ 0 = x, x ^ 1 = ~x, ~0 = 1, ~1 = 0
+        idempotence:      x & x = x, x | x = x
+        complements:      x & ~x = 0, x | ~x = 1, x ^ ~x = 1
+        double negation:  ~~x = x
+        XOR with self:    x ^ x = 0
+    Literals are constants by truthiness, as in NetlistGenerator. Groupings are dropped, they only group.
+
+    Folded nodes are rebuilt with an InterningExprFactory, so structurally equal operands are the same
+    object and every rule is an identity check. The walk is iterative and post-order, and the result for
+    each node is memoized on its identity (results map to themselves), so folding is linear in the number
+    of distinct nodes and shared (interned) subtrees are folded once.
+    '''
+
+    def __init__(self, factory: InterningExprFactory | None = None) -> None:
+        self.nodes = InterningExprFactory() if factory is None else factory
+        self.build = self.nodes.build
+        #id(node) -> (node, folded). node is kept so its id cannot be reused while memoized.
+        self._memo: dict[int, tuple[Expr, Expr]] = {}
+        #Number of rules applied
+        self.folded = 0
+        self._false = self.build(Literal, False)
+        self._true = self.build(Literal, True)
+
+    def clear(self) -> None:
+        #Drops the memo and the interned nodes (the count of rules applied is kept). Folding after this does
+        #not recognise nodes from before, so call it between independent expressions to bound memory.
+        self._memo.clear()
+        self.nodes.clear()
+        self._false = self.build(Literal, False)
+        self._true = self.build(Literal, True)
+
+    def fold(self, expr: Expr) -> Expr:
+        memo = self._memo
+        hit = memo.get(id(expr))
+        if hit is not None:
+            return hit[1]
+
+        #Frames are (node, children pushed)
+        stack = [(expr, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if id(node) in memo:
+                continue
+            children = _children(node)
+            if not expanded and children:
+                stack.append((node, True))
+                stack.extend((child, False) for child in children if id(child) not in memo)
+                continue
+            result = self._fold_node(node, [memo[id(child)][1] for child in children])
+            memo[id(node)] = (node, result)
+            memo.setdefault(id(result), (result, result))
+        return memo[id(expr)][1]
+
+    #Helpers
+    def _const(self, expr: Expr) -> bool | None:
+        #Truth value of a constant operand, None if expr is not constant
+        if isinstance(expr, Literal):
+            return expr.value is not None and expr.value is not False
+        return None
+
+    def _literal(self, value: bool) -> Literal:
+        self.folded += 1
+        return self._true if value else self._false
+
+    def _is_not(self, expr: Expr) -> bool:
+        return isinstance(expr, Unary) and expr.operator.kind == Tok.NOT
+
+    def _complements(self, left: Expr, right: Expr) -> bool:
+        return (self._is_not(left) and left.right is right) or (self._is_not(right) and right.right is left)
+
+    def _negate(self, expr: Expr, at: Token) -> Expr:
+        #~expr, folded. at supplies the position of the new operator token.
+        value = self._const(expr)
+        if value is not None:
+            return self._literal(not value)
+        if self._is_not(expr):
+            self.folded += 1
+            return expr.right
+        return self.build(Unary, Token(Tok.NOT, '~', at.line, at.col), expr)
+
+    def _reduced(self, expr: Expr) -> Expr:
+        self.folded += 1
+        return expr
+
+    def _fold_node(self, node: Expr, children: list[Expr]) -> Expr:
+        if isinstance(node, Binary):
+            left, right = children
+            match node.operator.kind:
+                case Tok.AND: return self._fold_and(node, left, right)
+                case Tok.OR: return self._fold_or(node, left, right)
+                case Tok.XOR: return self._fold_xor(node, left, right)
+            return self.build(Binary, left, node.operator, right)
+        if isinstance(node, Unary):
+            if node.operator.kind == Tok.NOT:
+                return self._negate(children[0], node.operator)
+            return self.build(Unary, node.operator, children[0])
+        if isinstance(node, Grouping):
+            return children[0]
+        if isinstance(node, Logical):
+            return self.build(Logical, children[0], node.operator, children[1])
+        if isinstance(node, Assign):
+            return self.build(Assign, node.name, children[0])
+        if isinstance(node, Call):
+            return self.build(Call, children[0], node.paren, children[1:])
+        if isinstance(node, Variable):
+            return self.build(Variable, node.name)
+        if isinstance(node, Literal):
+            return self.build(Literal, node.value)
+        return node
+
+    def _fold_and(self, node: Binary, left: Expr, right: Expr) -> Expr:
+        a, b = self._const(left), self._const(right)
+        if a is False or b is False: return self._literal(False)
+        if a is True and b is True: return self._literal(True)
+        if a is True: return self._reduced(right)
+        if b is True: return self._reduced(left)
+        if left is right: return self._reduced(left)
+        if self._complements(left, right): return self._literal(False)
+        return self.build(Binary, left, node.operator, right)
+
+    def _fold_or(self, node: Binary, left: Expr, right: Expr) -> Expr:
+        a, b = self._const(left), self._const(right)
+        if a is True or b is True: return self._literal(True)
+        if a is False and b is False: return self._literal(False)
+        if a is False: return self._reduced(right)
+        if b is False: return self._reduced(left)
+        if left is right: return self._reduced(left)
+        if self._complements(left, right): return self._literal(True)
+        return self.build(Binary, left, node.operator, right)
+
+    def _fold_xor(self, node: Binary, left: Expr, right: Expr) -> Expr:
+        a, b = self._const(left), self._const(right)
+        if a is not None and b is not None: return self._literal(a != b)
+        if a is False: return self._reduced(right)
+        if b is False: return self._reduced(left)
+        if a is True: return self._negate(self._reduced(right), node.operator)
+        if b is True: return self._negate(self._reduced(left), node.operator)
+        if left is right: return self._literal(False)
+        if self._complements(left, right): return self._literal(True)
+        return self.build(Binary, left, node.operator, right)
+
+
+def _children(node: Expr) -> list[Expr]:
+    if isinstance(node, (Binary, Logical)):
+        return [node.left, node.right]
+    if isinstance(node, Unary):
+        return [node.right]
+    if isinstance(node, Grouping):
+        return [node.expression]
+    if isinstance(node, Assign):
+        return [node.value]
+    if isinstance(node, Call):
+        return [node.callee, *node.arguments]
+    return []
@@ -0,0 +1,80 @@
+from .Expr import Expr, Binary, Grouping, Literal, Logical, Unary, Variable
+
+
+class ExprFactory:
+    '''Builds Expr nodes for the Parser. The default factory allocates a new node on every call.'''
+
+    def build(self, cls: type[Expr], *fields: object) -> Expr:
+        return cls(*fields)
+
+
+class InterningExprFactory(ExprFactory):
+    '''
+    Hash-consing factory: structurally identical Binary, Logical, Unary, Grouping, Variable and Literal
+    subtrees are built once and shared. Nodes are bottom-up, so children are already interned and a parent
+    is keyed on the identity of its children, which keeps every lookup O(1) regardless of subtree size.
+    Tokens are keyed on kind (operators) or lexeme (variables); a shared node keeps the tokens of its first
+    occurrence, so errors reported against it point at that occurrence.
+
+    Every node built here carries struct_hash, so later passes can memoize on node identity and still
+    bucket nodes structurally. Nodes of other types (Assign, Call) are built as usual and never shared.
+    '''
+
+    def __init__(self) -> None:
+        self._table: dict[tuple, Expr] = {}
+        #Number of interned node requests, and how many of them returned an existing node
+        self.requested = 0
+        self.shared = 0
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def clear(self) -> None:
+        #Forgets every interned node: nodes built after this are never shared with nodes built before
+        self._table.clear()
+
+    def build(self, cls: type[Expr], *fields: object) -> Expr:
+        keyer = _KEYS.get(cls)
+        if keyer is None:
+            return cls(*fields)
+
+        self.requested += 1
+        key = keyer(*fields)
+        node = self._table.get(key)
+        if node is not None:
+            self.shared += 1
+            return node
+
+        node = cls(*fields, _struct_hash(cls, fields))
+        self._table[key] = node
+        return node
+
+
+def _child(node: Expr) -> int:
+    #Interned children contribute their structural hash, anything else (Call, Assign) its identity
+    return node.struct_hash or id(node)
+
+
+def _struct_hash(cls: type[Expr], fields: tuple) -> int:
+    if cls is Binary or cls is Logical:
+        left, operator, right = fields
+        return hash((cls.__name__, operator.kind, _child(left), _child(right)))
+    if cls is Unary:
+        operator, right = fields
+        return hash((cls.__name__, operator.kind, _child(right)))
+    if cls is Grouping:
+        return hash((cls.__name__, _child(fields[0])))
+    if cls is Variable:
+        return hash((cls.__name__, fields[0].lexeme))
+    return hash((cls.__name__, type(fields[0]), fields[0]))
+
+
+#Table keys. Type is part of the Literal key so True and 1.0 stay distinct.
+_KEYS = {
+    Binary: lambda left, operator, right: (Binary, operator.kind, id(left), id(right)),
+    Logical: lambda left, operator, right: (Logical, operator.kind, id(left), id(right)),
+    Unary: lambda operator, right: (Unary, operator.kind, id(right)),
+    Grouping: lambda expression: (Grouping, id(expression)),
+    Variable: lambda name: (Variable, name.lexeme),
+    Literal: lambda value: (Literal, type(value), value),
+}
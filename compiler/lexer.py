@@ -1,7 +1,11 @@
 from types import MappingProxyType
 from .token import Tok, Token
+from .tokenstream import TokenStream
 from .errors import error
 from pathlib import Path
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator
+import re
 
 
 KEYWORDS = MappingProxyType({
@@ -33,13 +37,57 @@ KEYWORDS = MappingProxyType({
     'var': Tok.VAR
 })
 
+#Table engine: one master regex over the source. Only ASCII is matched here, anything the regex
+#can not decide on its own (non-ASCII neighbours, ' literals, '.', bad characters) is handed to _scan_token.
+_MASTER = re.compile(r'''
+     (?P<ws>[ \t\r\n]+)
+    |(?P<comment>//[^\n]*)
+    |(?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+    |(?P<number>[0-9]+)
+    |(?P<string>"[^"]*")
+    |(?P<op>===|!==|==|!=|<=|>=|&&|\^\^|\|\||[()?:\[\]{};,+\-*%/~&^|!=<>@\#])
+''', re.VERBOSE)
+
+#Multi character operators are consumed with _match, which does not move col. Each extra character is
+#recorded as column skew so the table engine reports the same positions as the match engine.
+OPERATORS = MappingProxyType({
+    '(': Tok.LPAREN, ')': Tok.RPAREN, '?': Tok.QMARK, ':': Tok.COLON,
+    '[': Tok.LBRACKET, ']': Tok.RBRACKET, '{': Tok.LBRACE, '}': Tok.RBRACE,
+    ';': Tok.SEMICOLON, ',': Tok.COMMA,
+    '+': Tok.PLUS, '-': Tok.SUB, '*': Tok.MULTIPLY, '%': Tok.MOD, '/': Tok.DIVIDE,
+    '~': Tok.NOT, '&': Tok.AND, '^': Tok.XOR, '|': Tok.OR, '!': Tok.LNOT, '=': Tok.EQUAL,
+    '<': Tok.LT, '>': Tok.GT, '@': Tok.AT, '#': Tok.HASH,
+    '&&': Tok.LAND, '^^': Tok.LXOR, '||': Tok.LOR,
+    '==': Tok.EQ, '!=': Tok.NEQ, '<=': Tok.LTE, '>=': Tok.GTE,
+    '===': Tok.CEQ, '!==': Tok.CNEQ
+})
+
+ENGINES = ('match', 'table')
+
+#Statement splitting for streaming (split_statements)
+_BOUNDARY = re.compile(r'//|"|;|\n|\b(?:begin|end)\b')
+_GAP = re.compile(r'(?:\s+|//[^\n]*\n)*')
+_ELSE = re.compile(r'else\b')
+
+
 class LexerError(Exception):
     pass
 
 #TODO: Fix Line and Col enumeration
 class Lexer:
+    '''
+    Two scanning engines are available:
+        match - the reference scanner. _scan_token walks the source one character at a time.
+        table - single pass over a precompiled master regex. Line/col are computed lazily from
+                a newline offset index, and only for emitted tokens.
+    Both produce the same Token stream and LexerError positions.
+    '''
     
-    def __init__(self, source: str, is_file: bool = False):
+    def __init__(self, source: str, is_file: bool = False, engine: str = 'match', line: int = 1):
+        #line: line of source[0] in the original file, when lexing one piece of a larger source (split_statements)
+        if engine not in ENGINES:
+            raise ValueError(f'Unknown lexer engine "{engine}". Expected one of {ENGINES}.')
+        self.engine = engine
 
         if is_file: 
             self.source = Path(source).read_text(encoding='utf-8')
@@ -47,13 +95,19 @@ class Lexer:
             self.source = source
         self.start = 0
         self.current = 0 #NOTE: Current represents the character TO BE consumed. Does NOT look at the just consumed character.
-        self.line = 1
+        self.line = line
         self.col = 1
         self.tokens: list[Token] = []
 
 
 
     def scan_tokens(self) -> list:
+        if self.engine == 'table':
+            append = self.tokens.append
+            self._scan_table(lambda kind, lexeme, start, end, line, col, literal=None:
+                             append(Token(kind, lexeme, line, col, literal)))
+            return self.tokens
+
         while not self._at_end():
             self.start = self.current
             self._scan_token()
@@ -63,6 +117,95 @@ class Lexer:
         
 
 
+    def scan_stream(self) -> TokenStream:
+        #Scans with the table engine into a compact TokenStream instead of a list of Tokens
+        stream = TokenStream(self.source)
+        self._scan_table(stream.append, stream)
+        return stream
+
+
+    def _scan_table(self, emit, stream: TokenStream | None = None) -> None:
+        #emit(kind, lexeme, start, end, line, col, literal) is called once per token, in order.
+        source = self.source
+        n = len(source)
+        master = _MASTER.match
+        keywords = KEYWORDS
+        operators = OPERATORS
+        IDENT, NUMBER = Tok.IDENT, Tok.NUMBER
+
+        #Newline offset index. Tokens only move forward, so the physical line (phys) is cached and
+        #only looked up again in the index once a token ends past the next newline.
+        newlines = [m.start() for m in re.finditer('\n', source)]
+        newlines.append(n + 1)
+        phys, line_start, next_nl = 0, 0, newlines[0]
+
+        #line_bias: extra lines counted by _string (and the starting line). skew: columns lost to _match on the current line.
+        line_bias = self.line - 1
+        skew = 0
+
+        pos = 0
+        while pos < n:
+            m = master(source, pos)
+            group = m.lastindex if m else 0
+            if group == 1:
+                #Whitespace
+                pos = m.end()
+                continue
+
+            end = m.end() if m else pos
+            if end > next_nl:
+                phys = bisect_left(newlines, end)
+                line_start = newlines[phys - 1] + 1
+                next_nl = newlines[phys]
+                skew = 0
+
+            if group == 3 or group == 4:
+                #Non-ASCII letters/digits and ' literals are left to the reference scanner
+                if end < n and (not source[end].isascii() or (group == 4 and source[end] == "'")):
+                    group = 0
+
+            if group == 6:
+                text = source[pos:end]
+                skew += len(text) - 1
+                emit(operators[text], text, pos, end, phys + 1 + line_bias, end - line_start + 1 - skew)
+            elif group == 3:
+                text = source[pos:end]
+                emit(keywords.get(text, IDENT), text, pos, end, phys + 1 + line_bias, end - line_start + 1 - skew, text)
+            elif group == 4:
+                num = float(source[pos:end])
+                emit(NUMBER, num, pos, end, phys + 1 + line_bias, end - line_start + 1 - skew, num)
+            elif group == 2:
+                #Comment: the second '/' is consumed by _match
+                skew += 1
+            elif group == 5:
+                text = source[pos:end]
+                line_bias += text.count('\n')
+                emit(Tok.STRING, text, pos, end, phys + 1 + line_bias, end - line_start + 1 - skew, text[1:-1])
+            else:
+                #Delegate a single token to _scan_token, then resync bias/skew from its line/col
+                self.start = self.current = pos
+                self.line, self.col = phys + 1 + line_bias, pos - line_start + 1 - skew
+                self._scan_token()
+                end = self.current
+                if stream is not None and self.tokens:
+                    stream.append_token(self.tokens.pop(), pos, end)
+                if end > next_nl:
+                    phys = bisect_left(newlines, end)
+                    line_start = newlines[phys - 1] + 1
+                    next_nl = newlines[phys]
+                line_bias = self.line - phys - 1
+                skew = (end - line_start + 1) - self.col
+            pos = end
+
+        self.start = self.current = n
+        if n > next_nl:
+            phys = bisect_left(newlines, n)
+            line_start = newlines[phys - 1] + 1
+            skew = 0
+        self.line, self.col = phys + 1 + line_bias, n - line_start + 1 - skew
+        emit(Tok.EOF, "", n, n, self.line, self.col)
+
+
     def _at_end(self) -> bool:
         return (self.current>=len(self.source))
 
@@ -307,3 +450,73 @@ class Lexer:
     def current_position(self) -> tuple[int, int, int]:
         #Returns current index, line, and column number.
         return (self.current, self.line, self.col)
+
+
+def split_statements(lines: Iterable[str]) -> Iterator[tuple[str, int]]:
+    '''
+    Groups source text, read incrementally (e.g. a file object), into whole lines holding complete top level
+    statements, so each group can be lexed and parsed on its own. Yields (text, line) with the line text starts
+    on. A group ends at the end of a line with a ';' outside strings, comments and begin/end blocks, unless the
+    next token is else. Groups always start at col 1, so Lexer(text, line=line) reports the same positions as
+    lexing the whole source. Only the group being collected is held in memory.
+    '''
+    buffer = ''
+    scan = 0 #buffer[:scan] has been scanned
+    ended = False #A statement ended on the current line
+    cut = None #End of a complete group, waiting on the next token in case it is else
+    depth = 0
+    line = 1
+    #The Lexer counts newlines inside strings twice (see _string), so the group's lines do too
+    string_lines = 0
+
+    for part in lines:
+        buffer += part
+        while True:
+            if cut is not None:
+                gap = _GAP.match(buffer, cut).end()
+                if gap == len(buffer):
+                    break
+                if _ELSE.match(buffer, gap):
+                    scan = gap
+                else:
+                    text, buffer = buffer[:cut], buffer[cut:]
+                    yield text, line
+                    line += text.count('\n') + string_lines
+                    string_lines = 0
+                    scan = 0
+                cut = None
+                continue
+
+            m = _BOUNDARY.search(buffer, scan)
+            if m is None:
+                scan = len(buffer)
+                break
+            scan = m.end()
+            match m.group():
+                case '//':
+                    scan = buffer.find('\n', m.end())
+                case '"':
+                    scan = buffer.find('"', m.end()) + 1
+                    if scan > 0:
+                        string_lines += buffer.count('\n', m.end(), scan)
+                case 'begin':
+                    depth += 1
+                case 'end':
+                    depth -= 1
+                case ';':
+                    ended = ended or depth <= 0
+                case '\n':
+                    if ended and depth <= 0:
+                        cut = m.end()
+                        ended = False
+            if scan <= 0:
+                #Comment or string continues past the text read so far
+                scan = m.start()
+                break
+
+    if cut is not None:
+        text, buffer = buffer[:cut], buffer[cut:]
+        yield text, line
+        line += text.count('\n') + string_lines
+    if buffer.strip():
+        yield buffer, line
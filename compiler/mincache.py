@@ -0,0 +1,247 @@
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from hashlib import blake2b
+from itertools import permutations
+from pathlib import Path
+import json
+import os
+
+import numpy as np
+
+#Bump when the cached results could change (minimiser or key format)
+VERSION = 1
+#Functions with up to this many support inputs are NP-canonicalised (n! * 2^n transforms are tried)
+NPN_INPUTS = 6
+#A disk tier past its limit is evicted down to this fraction of it, so a full one is not rescanned every store
+EVICT_TO = 0.75
+
+DEFAULT_DIRECTORY = Path(os.environ.get('XDG_CACHE_HOME', Path.home() / '.cache')) / 'rhls' / 'minimize'
+
+
+class MinimizationCache:
+    '''
+    Cache of minimised sums of products, keyed by a fingerprint of the function's truth table.
+    Before keying, a function is reduced to its support (inputs it depends on), so the same mux or parity
+    tree is found whatever other inputs the design has. With npn=True functions of up to NPN_INPUTS support
+    inputs are also canonicalised over input permutations and negations: every transform is applied at once
+    with NumPy and the smallest table is the key, so permuted or inverted inputs hit the same entry.
+    Output negation is not part of the canonical form, since a minimal cover of ~f says nothing about one of f.
+
+    Entries hold the cover of the canonical function and are mapped back through the transform on the way
+    out. Two tiers: an in-memory LRU of capacity entries, and optionally one JSON file per entry in directory,
+    evicted least recently used first (by mtime) down to EVICT_TO of disk_limit bytes once the files pass it.
+    The files' size is kept as a running total, so the directory is only scanned on the first store and when
+    it passes the limit.
+    '''
+
+    def __init__(self, capacity: int = 1024, directory: Path | None = None, disk_limit: int = 32 << 20,
+                 npn: bool = True) -> None:
+        self.capacity = capacity
+        self.directory = directory
+        self.disk_limit = disk_limit
+        self.npn = npn
+        self._memory: OrderedDict[str, list[str]] = OrderedDict()
+        #The directory is only created by the first store, so a cache that is never written leaves no trace
+        self._made = False
+        #Bytes in the disk tier: one scan on the first store counts them, then stores add to it
+        self._disk_bytes: int | None = None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def __str__(self) -> str:
+        lookups = self.hits + self.disk_hits + self.misses
+        rate = (self.hits + self.disk_hits) / lookups if lookups else 0.0
+        return f'{self.hits} hits, {self.disk_hits} disk hits, {self.misses} misses ({rate:.0%} hit rate)'
+
+    def minimize(self, n_inputs: int, on: np.ndarray, dont_care: np.ndarray,
+                 minimizer: Callable[[list[str], list[str]], list[str]]) -> list[str]:
+        '''
+        Returns the cover of the function of n_inputs inputs with the given on-set and don't-care rows
+        (truth table row numbers, first input most significant), as cubes like '1-0'. On a miss the canonical
+        function is minimised with minimizer(minterms, dont_cares) and stored.
+        '''
+        lookup = self.lookup(n_inputs, on, dont_care)
+        if lookup.cubes is None:
+            self.store(lookup, minimizer(*lookup.job()))
+        return lookup.result()
+
+    def lookup(self, n_inputs: int, on: np.ndarray, dont_care: np.ndarray) -> 'CacheLookup':
+        #First half of minimize, for callers that minimise the misses themselves (e.g. in other processes):
+        #lookup.cubes is None on a miss, then minimise lookup.job() and store() the cover.
+        on_table = np.zeros(1 << n_inputs, dtype=bool)
+        on_table[on] = True
+        dc_table = np.zeros(1 << n_inputs, dtype=bool)
+        dc_table[dont_care] = True
+
+        support, on_table, dc_table = _support(n_inputs, on_table, dc_table)
+        k = len(support)
+        if k == 0:
+            #Constant (or all don't care): nothing to minimise or cache
+            return CacheLookup(None, (), 0, support, n_inputs, on_table, dc_table, [''] if on_table[0] else [])
+        if self.npn and k <= NPN_INPUTS:
+            key, perm, negate, on_table, dc_table = _np_canonical(k, on_table, dc_table)
+        else:
+            perm, negate = tuple(range(k)), 0
+            digest = blake2b(np.packbits(on_table).tobytes() + np.packbits(dc_table).tobytes(), digest_size=16)
+            key = f'{VERSION}-raw-{k}-{digest.hexdigest()}'
+
+        cubes = self._lookup(key)
+        if cubes is None:
+            self.misses += 1
+        return CacheLookup(key, perm, negate, support, n_inputs, on_table, dc_table, cubes)
+
+    def store(self, lookup: 'CacheLookup', cubes: list[str]) -> None:
+        lookup.cubes = cubes
+        self._store(lookup.key, cubes)
+
+    #Tiers
+    def _lookup(self, key: str) -> list[str] | None:
+        cubes = self._memory.get(key)
+        if cubes is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return cubes
+        if self.directory is None:
+            return None
+        path = self.directory / f'{key}.json'
+        try:
+            cubes = json.loads(path.read_text(encoding='utf-8'))['cubes']
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            return None
+        self.disk_hits += 1
+        self._remember(key, cubes)
+        return cubes
+
+    def _store(self, key: str, cubes: list[str]) -> None:
+        self._remember(key, cubes)
+        if self.directory is None:
+            return
+        path = self.directory / f'{key}.json'
+        try:
+            if not self._made:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self._made = True
+            data = json.dumps({'cubes': cubes}).encode('utf-8')
+            path.write_bytes(data)
+            if self._disk_bytes is None or self._disk_bytes + len(data) > self.disk_limit:
+                #The scan counts the new file, and the files other processes stored since the last one
+                self._evict_disk()
+            else:
+                self._disk_bytes += len(data)
+        except OSError:
+            pass #The disk tier is best effort
+
+    def _remember(self, key: str, cubes: list[str]) -> None:
+        self._memory[key] = cubes
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self) -> None:
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        entries.sort()
+        if total <= self.disk_limit:
+            entries = []
+        for _, size, path in entries:
+            if total <= EVICT_TO * self.disk_limit:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self._disk_bytes = total
+
+
+@dataclass(slots=True)
+class CacheLookup:
+    #A function as the cache sees it: its canonical form (key, tables) and how to map a cover of that back
+    key: str | None
+    perm: tuple[int, ...]
+    negate: int
+    support: list[int]
+    n_inputs: int
+    on_table: np.ndarray
+    dc_table: np.ndarray
+    #Cover of the canonical function, None until found or stored
+    cubes: list[str] | None
+
+    def job(self) -> tuple[list[str], list[str]]:
+        #(minterms, dont_cares) of the canonical function, the arguments of a minimizer
+        k = len(self.perm)
+        minterms = [format(row, f'0{k}b') for row in np.flatnonzero(self.on_table).tolist()]
+        dont_cares = [format(row, f'0{k}b') for row in np.flatnonzero(self.dc_table).tolist()]
+        return minterms, dont_cares
+
+    def result(self) -> list[str]:
+        #The cover of the original function over all its inputs
+        return [_restore(cube, self.perm, self.negate, self.support, self.n_inputs) for cube in self.cubes]
+
+
+#Tables are indexed by row number: input s of k (s = 0 is the first, most significant) is bit k - 1 - s
+def _support(n: int, on: np.ndarray, dc: np.ndarray) -> tuple[list[int], np.ndarray, np.ndarray]:
+    #Drops the inputs the function does not depend on. Returns (kept input positions, on, dc) over the kept inputs.
+    on = on.reshape((2,) * n) if n else on
+    dc = dc.reshape((2,) * n) if n else dc
+    keep = []
+    for s in range(n):
+        #Axis s of the reshaped table is input s
+        low_on, high_on = np.take(on, 0, axis=s), np.take(on, 1, axis=s)
+        low_dc, high_dc = np.take(dc, 0, axis=s), np.take(dc, 1, axis=s)
+        keep.append(not (np.array_equal(low_on, high_on) and np.array_equal(low_dc, high_dc)))
+    index = tuple(slice(None) if kept else 0 for kept in keep)
+    support = [s for s in range(n) if keep[s]]
+    if n:
+        on, dc = on[index].reshape(-1), dc[index].reshape(-1)
+    return support, on, dc
+
+
+def _np_canonical(k: int, on: np.ndarray, dc: np.ndarray) -> tuple[str, tuple[int, ...], int, np.ndarray, np.ndarray]:
+    #Tries every input permutation and negation g[r] = f[P(r) ^ negate], where P moves bit i of r to bit perm[i],
+    #and keeps the smallest (on, dc) table. Returns (key, perm, negate, g_on, g_dc).
+    rows = np.arange(1 << k, dtype=np.int64)
+    perms = np.array(list(permutations(range(k))), dtype=np.int64).reshape(-1, k)
+    bits = (rows[:, None] >> np.arange(k)) & 1
+    moved = (bits[None, :, :] << perms[:, None, :]).sum(axis=-1)
+    negations = np.arange(1 << k, dtype=np.int64)
+    index = moved[:, None, :] ^ negations[None, :, None]
+
+    weights = np.left_shift(np.uint64(1), rows.astype(np.uint64))
+    on_keys = (on[index].astype(np.uint64) * weights).sum(axis=-1, dtype=np.uint64).reshape(-1)
+    dc_keys = (dc[index].astype(np.uint64) * weights).sum(axis=-1, dtype=np.uint64).reshape(-1)
+    best = np.lexsort((dc_keys, on_keys))[0]
+    p, negate = divmod(int(best), 1 << k)
+    perm = tuple(int(i) for i in perms[p])
+    g = index[p, negate]
+    key = f'{VERSION}-np-{k}-{int(on_keys[best]):x}-{int(dc_keys[best]):x}'
+    return key, perm, negate, on[g], dc[g]
+
+
+def _restore(cube: str, perm: tuple[int, ...], negate: int, support: list[int], n: int) -> str:
+    #Maps a cube of the canonical function g back to f over all n inputs: y = P(x) ^ negate, then
+    #support input s of k becomes input support[s] of n, and the inputs outside the support are dashes.
+    k = len(perm)
+    value = mask = 0
+    for s, c in enumerate(cube):
+        bit = 1 << perm[k - 1 - s]
+        if c == '-':
+            mask |= bit
+        elif c == '1':
+            value |= bit
+    value = (value ^ negate) & ~mask
+    out = ['-'] * n
+    for s in range(k):
+        bit = 1 << (k - 1 - s)
+        if not mask & bit:
+            out[support[s]] = '1' if value & bit else '0'
+    return ''.join(out)
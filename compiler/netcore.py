@@ -0,0 +1,199 @@
+from array import array
+from bisect import bisect_left
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True, slots=True)
+class Operation:
+    output: str
+    #A and B can take Operation.output as inputs
+    A: Optional[str]
+    B: Optional[str]
+    operation: str
+
+    def __str__(self) -> str:
+        #Unary op: Formatted {op} {A}
+        if self.B is None:
+            return f'({self.operation} {self.A})'
+        #Binary op: Formatted {A} {op} {B}
+        return f'({self.A} {self.operation} {self.B})'
+
+    def __iter__(self):
+        if self.B is not None:
+            yield self.B
+        if self.A is not None:
+            yield self.A
+
+
+#Gate type codes. Index into GATE_OPS for the printed operator; '' is an operator with no gate
+#(a buffer, Y = A, or an operator the generator does not lower).
+GATE_OPS = ('&', '|', '^', '~', '')
+GATE_CODES = {op: code for code, op in enumerate(GATE_OPS)}
+
+#Net flags
+SEEN = 1 #Read by an expression
+DRIVEN = 2 #Assigned by a declaration or assignment
+TEMP = 4 #Intermediate net created by the generator
+
+NO_NET = -1
+
+
+class NetlistCore:
+    '''
+    Dense, integer indexed netlist. Nets and gates are numbered from 0 in creation order, and
+    everything a later pass walks is stored in array columns:
+        per net:  flags (B), driver (i) - driving gate or NO_NET, fanout (I) - number of gate inputs reading it,
+                  level (I) - gates on the longest path from an undriven net to the net's current value
+        per gate: gate_type (B) - GATE_CODES, gate_a/gate_b (i) - input nets (gate_b NO_NET if unary),
+                  gate_out (i) - output net, fanin (B)
+    Net names only live in the side symbol table (names/ids). Constant operands are nets named by
+    their value (True/False). Operation objects and printed lines are built on demand by the views.
+    Columns can be shared with NumPy without copying, e.g. numpy.frombuffer(core.gate_a, dtype=numpy.int32).
+
+    temp_count and gate_offset let a core continue the temp and instance numbering of an earlier one
+    (streaming emission starts a new core per statement).
+    '''
+
+    def __init__(self, temp_count: int = 0, gate_offset: int = 0) -> None:
+        self.names: list[object] = []
+        self.ids: dict[object, int] = {}
+        self.flags = array('B')
+        self.driver = array('i')
+        self.fanout = array('I')
+        self.level = array('I')
+
+        self.gate_type = array('B')
+        self.gate_a = array('i')
+        self.gate_b = array('i')
+        self.gate_out = array('i')
+        self.fanin = array('B')
+
+        self.temp_count = temp_count
+        self.gate_offset = gate_offset
+
+        self.operations = _GateView(self, self.operation)
+        self.lines = _GateView(self, self.format_gate)
+
+    @property
+    def n_nets(self) -> int:
+        return len(self.names)
+
+    @property
+    def n_gates(self) -> int:
+        return len(self.gate_type)
+
+    def net(self, name: object) -> int:
+        #Net id for name, created on first use
+        net = self.ids.get(name)
+        if net is None:
+            net = len(self.names)
+            self.names.append(name)
+            self.ids[name] = net
+            self.flags.append(0)
+            self.driver.append(NO_NET)
+            self.fanout.append(0)
+            self.level.append(0)
+        return net
+
+    @property
+    def max_level(self) -> int:
+        #Logic depth: every gate, buffers included, is one level (a redstone tick or more)
+        return max(self.level, default=0)
+
+    def new_temp(self) -> int:
+        self.temp_count += 1
+        net = self.net(f't{self.temp_count}')
+        self.flags[net] |= TEMP
+        return net
+
+    def mark(self, net: int, flag: int) -> None:
+        self.flags[net] |= flag
+
+    def name(self, net: int) -> object:
+        return self.names[net]
+
+    def add_gate(self, op: str, a: int, b: int, out: int) -> int:
+        gate = len(self.gate_type)
+        self.gate_type.append(GATE_CODES[op])
+        self.gate_a.append(a)
+        self.gate_b.append(b)
+        self.gate_out.append(out)
+        self.fanin.append(1 if b == NO_NET else 2)
+        self.fanout[a] += 1
+        if b != NO_NET:
+            self.fanout[b] += 1
+        self.driver[out] = gate
+        self.level[out] = 1 + max(self.level[a], 0 if b == NO_NET else self.level[b])
+        return gate
+
+    def nets_with(self, flag: int, without: int = 0) -> set:
+        #Names of nets that have any bit of flag set and no bit of without
+        flags = self.flags
+        return {self.names[net] for net in range(len(flags)) if flags[net] & flag and not flags[net] & without}
+
+    def cones(self, nets: list[int]) -> list[tuple[list[int], set[int]]]:
+        #Logic cone of the final value of each net: (gates in gate order, leaf nets the cone reads that no earlier
+        #gate drives, i.e. inputs, constants and nets read before they are driven). A gate input is driven by
+        #the last gate before it that writes that net, since nets can be driven more than once.
+        drivers: dict[int, list[int]] = {}
+        for gate, out in enumerate(self.gate_out):
+            drivers.setdefault(out, []).append(gate)
+
+        cones = []
+        for net in nets:
+            gates = set()
+            leaves = set()
+            stack = [(net, self.n_gates)]
+            while stack:
+                net, before = stack.pop()
+                driving = drivers.get(net, ())
+                i = bisect_left(driving, before)
+                if i == 0:
+                    leaves.add(net)
+                    continue
+                gate = driving[i - 1]
+                if gate in gates:
+                    continue
+                gates.add(gate)
+                stack.append((self.gate_a[gate], gate))
+                if self.gate_b[gate] != NO_NET:
+                    stack.append((self.gate_b[gate], gate))
+            cones.append((sorted(gates), leaves))
+        return cones
+
+    #Views
+    def operation(self, gate: int) -> Operation:
+        b = self.gate_b[gate]
+        return Operation(output = self.names[self.gate_out[gate]], A = self.names[self.gate_a[gate]],
+                         B = None if b == NO_NET else self.names[b], operation = GATE_OPS[self.gate_type[gate]])
+
+    def format_gate(self, gate: int) -> str:
+        #Instances are named u1, u2, ... in gate order
+        op, a, b = GATE_OPS[self.gate_type[gate]], self.names[self.gate_a[gate]], self.gate_b[gate]
+        y = self.names[self.gate_out[gate]]
+        instance = self.gate_offset + gate + 1
+        if b == NO_NET:
+            return f'u{instance}: {op} A = {a}, Y = {y}'
+        return f'u{instance}: {op} A = {a}, B = {self.names[b]}, Y = {y}'
+
+
+class _GateView(Sequence):
+    #Read only sequence over the gates of a NetlistCore, built item by item with render(gate)
+
+    def __init__(self, core: NetlistCore, render) -> None:
+        self._core = core
+        self._render = render
+
+    def __len__(self) -> int:
+        return self._core.n_gates
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._render(gate) for gate in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('gate index out of range')
+        return self._render(index)
@@ -1,38 +1,33 @@
 from .token import Token, Tok
 from .Expr import Expr, ExprVisitor, Literal, Grouping, Variable, Binary, Assign, Unary
 from .Stmt import Stmt, StmtVisitor, Expression, Var
+from collections.abc import Iterable, Iterator
 #from ..src.gates import Gate
 from .environment import Environment
 from .runtime_errors import RuntimeError_
 from .errors import _RuntimeError
-from typing import Optional
-from dataclasses import dataclass
-
-@dataclass(frozen=True, slots=True)
-class Operation:
-    output: str
-    #A and B can take Operation.output as inputs
-    A: Optional[str]
-    B: Optional[str]
-    operation: str
-
-    def __str__(self) -> str:
-        #Unary op: Formatted {op} {A}
-        if self.B is None:
-            return f'({self.operation} {self.A})'
-        #Binary op: Formatted {A} {op} {B}
-        return f'({self.A} {self.operation} {self.B})'
-    
-    def __iter__(self):
-        if self.B is not None:
-            yield self.B
-        if self.A is not None:
-            yield self.A
+from .netcore import NetlistCore, Operation, NO_NET, SEEN, DRIVEN, TEMP
+from .folder import ExprFolder
+from .truthtable import truth_tables, MAX_INPUTS
+from .mincache import MinimizationCache
+from .aig import AIG
+from .simplify_expression import SimplifyExpression
+from concurrent.futures import ProcessPoolExecutor
+from heapq import heapify, heappop, heappush
+
+
+#Outputs whose logic cone reads up to this many inputs are minimised from their truth tables (see _reduce_function)
+MINIMIZE_INPUTS = 16
+
+
+#Operators whose operands can be swapped, so their CSE keys are stored with sorted operands
+COMMUTATIVE = frozenset({Tok.AND, Tok.OR, Tok.XOR})
 
 
 class NetlistGenerator(ExprVisitor[object], StmtVisitor[None]):
     
-    def __init__(self):
+    def __init__(self, cse: bool = True, fold: bool = True, cache: MinimizationCache | None = None, jobs: int = 1,
+                 aig: bool = False, balance: bool = True):
         self.environment = Environment()
 
         #All variables in seen not in driven
@@ -43,34 +38,63 @@ class NetlistGenerator(ExprVisitor[object], StmtVisitor[None]):
         self.gates = {
             'AND', 'OR', 'XOR', 'NOT'
         }
-        self.netlist: list[str] = []
-        self.operations: list[str] = []
-
-        self.temp_id = 0
-        self.inst_id = 0
-
-        #All variables that have been assigned (initializer != None | in assignment statement)
-        self.driven: set[str] = set()
-        #All variables that have been declared, but not assigned; can be used in RHS of assignment.
-        self.seen: set[str] = set()
+        #Nets and gates are integer ids into the core. Expressions evaluate to net ids.
+        #driven (assigned: initializer != None | in assignment statement) and seen (used in RHS) are net flags.
+        self.core = NetlistCore()
+        #Printed gate lines and Operations, built from the core on demand
+        self.netlist = self.core.lines
+        self.operations = self.core.operations
 
         #At visit_var_stmt: If initializer is not None, push name.literal. If empty, target is temp else self.target, pop after
         self.target_stack: list[str] = []
 
+        #Common subexpression elimination: structural hash of (operator, operand nets) -> output net.
+        #_cse_uses maps each net to the keys that read or produce it, so they can be dropped when it is redriven.
+        self.cse = cse
+        self._cse_table: dict[tuple, int] = {}
+        self._cse_uses: dict[int, set[tuple]] = {}
+        #Gates requested by the source vs gates emitted
+        self.gates_requested = 0
+        #Depth vs area: chains of one associative operator (a ^ b ^ c ^ d) become trees of minimum depth
+        #(balance=True), or stay the left-deep chains the parser builds, which share more prefixes under CSE
+        #(balance=False). _written_level is the level each net would have as written, for the report.
+        self.balance = balance
+        self._written_level: dict[int, int] = {}
+
+        #Constant folding and Boolean identities, applied to each initializer/assigned value before it is lowered
+        self.folder = ExprFolder() if fold else None
+
+        #Minimised sum of products per output (over the inputs in self.cones) and the truth tables it came from
+        #(_reduce_function)
+        self.function: dict[str, list[str] | None] | None = None
+        self.truth_tables = {}
+        #Minimised covers by truth table, shared by every output (memory only unless a cache is passed in)
+        self.cache = MinimizationCache() if cache is None else cache
+        #Worker processes for minimisation, 1 minimises in this process
+        self.jobs = jobs
+        #Inputs each output's cone reads, and the two level netlist of the minimised outputs
+        self.cones: dict[str, list[str]] = {}
+        self.minimized: NetlistCore | None = None
+        #Multi-level optimisation: the netlist as an optimised And-Inverter Graph and its gates (_optimize)
+        self.use_aig = aig
+        self.aig: AIG | None = None
+        self.optimized: NetlistCore | None = None
+
     def create_netlist(self, statements: list[Stmt]):
         try:
             for statement in statements:
                 self._execute(statement)
 
-            self.inputs = {x for x in self.seen if x not in self.driven}
+            self.inputs = self.core.nets_with(SEEN, without=DRIVEN)
             if len(self.inputs) == 0: self.inputs = None
-            self.outputs = {x for x in self.driven if x not in self.seen}
+            self.outputs = self.core.nets_with(DRIVEN, without=SEEN)
             if len(self.outputs) == 0: self.outputs = None
 
-            self.nets = {f't{x}' for x in range(1, self.temp_id + 1)}
-            self.nets = self.nets | self.seen | self.driven
+            self.nets = self.core.nets_with(TEMP | SEEN | DRIVEN)
 
-            self._reduce_function(self.operations[-1], self.inputs)
+            self.function = self._reduce_function(self.inputs, self.outputs)
+            if self.use_aig:
+                self._optimize()
 
             print(f'In: {self.inputs}\nOut: {self.outputs}\n\nOperations:')
             for net in self.netlist:
@@ -79,34 +103,171 @@ class NetlistGenerator(ExprVisitor[object], StmtVisitor[None]):
             for op in self.operations:
                 print(op)
 
-            #print(f'Function: {self.function}') 
+            print(f'\nFunction: {self.function}')
+            print(f'Minimization cache: {self.cache}')
+            if self.minimized is not None:
+                print(f'Minimized: {self.minimized.n_gates} gates')
+            if self.aig is not None:
+                print(f'AIG: {self.aig}, {self.optimized.n_gates} gates and {self.optimized.max_level} levels mapped '
+                      f'({len(self.operations)} and {self.core.max_level} before)')
             print(f'\nNets: {self.nets}') 
+            print(f'CSE: {self.gates_requested} gates before, {len(self.operations)} gates after')
+            print(f'Depth: {self.core.max_level} levels, {max(self._written_level.values(), default=0)} as written')
+            if self.folder is not None:
+                print(f'Fold: {self.folder.folded} simplifications')
+
+        except RuntimeError_ as err:
+            _RuntimeError(err)
+
+    def stream_netlist(self, statements: Iterable[Stmt]) -> Iterator[str]:
+        '''
+        Streaming create_netlist: statements are consumed one at a time (statements can be a generator) and the
+        gate lines of each are yielded as soon as it is lowered. The core is then replaced by an empty one and the
+        folder is cleared, so only the flags of named nets (symbols) are kept between statements and memory is
+        bounded by the largest statement. In/Out and a net count are yielded last.
+        CSE is statement local here: a later statement cannot reuse a gate that has already been emitted.
+        '''
+        #Named net -> SEEN/DRIVEN flags over every statement so far
+        symbols: dict[object, int] = {}
+        try:
+            for statement in statements:
+                if statement is None:
+                    continue
+                self._execute(statement)
+                yield from self.netlist
+
+                core = self.core
+                for net, flags in enumerate(core.flags):
+                    if flags and not flags & TEMP:
+                        name = core.names[net]
+                        symbols[name] = symbols.get(name, 0) | flags
+                self._reset_core(NetlistCore(core.temp_count, core.gate_offset + core.n_gates))
+                #Folded trees are not shared between statements either
+                if self.folder is not None:
+                    self.folder.clear()
+
+            self.inputs = {name for name, flags in symbols.items() if flags & SEEN and not flags & DRIVEN} or None
+            self.outputs = {name for name, flags in symbols.items() if flags & DRIVEN and not flags & SEEN} or None
+
+            yield f'\nIn: {self.inputs}\nOut: {self.outputs}'
+            yield f'Nets: {len(symbols)} named, {self.core.temp_count} temporary'
+            yield f'CSE: {self.gates_requested} gates before, {self.core.gate_offset} gates after'
+            if self.folder is not None:
+                yield f'Fold: {self.folder.folded} simplifications'
 
         except RuntimeError_ as err:
             _RuntimeError(err)
 
 
     #Helpers
-    def _reduce_function(self, operation_: Operation, inputs: list[str]) -> str:
-        pass
+    def _reduce_function(self, inputs: set[str] | None, outputs: set[str] | None) -> dict[str, list[str] | None] | None:
+        #Minimised sum of products for each output, as cubes over the inputs its logic cone reads, sorted
+        #(self.cones[output]; '1-0' is a & ~c). The cone's on-set and don't cares come from a NumPy
+        #evaluation of its gates (truthtable.py) and go through self.cache. Cache misses are minimised in a
+        #process pool when self.jobs > 1; results are matched back by position, so the outcome does not
+        #depend on scheduling. An output whose cone reads more than MINIMIZE_INPUTS inputs maps to None.
+        #Also builds self.minimized, the netlist of the covers.
+        primary = inputs or set()
+        outputs = sorted(outputs or [])
+
+        self.truth_tables = {}
+        self.cones = {}
+        lookups = {}
+        for output, (gates, leaves) in zip(outputs, self.core.cones([self.core.ids[name] for name in outputs])):
+            cone_inputs = sorted(name for name in (self.core.name(net) for net in leaves) if name in primary)
+            if len(cone_inputs) > min(MAX_INPUTS, MINIMIZE_INPUTS):
+                continue
+            on, dont_care = truth_tables(self.core, cone_inputs, [output], gates)[output]
+            self.truth_tables[output] = (on, dont_care)
+            self.cones[output] = cone_inputs
+            lookups[output] = self.cache.lookup(len(cone_inputs), on, dont_care)
+
+        #One job per distinct missing function, in output order
+        misses: dict[str, list] = {}
+        for lookup in lookups.values():
+            if lookup.cubes is None:
+                misses.setdefault(lookup.key, []).append(lookup)
+        jobs = [group[0].job() for group in misses.values()]
+        if self.jobs > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.jobs, len(jobs))) as pool:
+                covers = list(pool.map(_minimize_job, jobs, chunksize=max(1, len(jobs) // (4 * self.jobs))))
+        else:
+            covers = [_minimize_job(job) for job in jobs]
+        for group, cubes in zip(misses.values(), covers):
+            for lookup in group:
+                self.cache.store(lookup, cubes)
+
+        function = {output: lookups[output].result() if output in lookups else None for output in outputs}
+        self.minimized = _sop_netlist(function, self.cones)
+        return function
+
+    def _optimize(self) -> None:
+        #AIG of the netlist, optimised (aig.py), and the gates it maps back to. Netlists with operators that have
+        #no gate are left alone.
+        try:
+            graph = AIG.from_operations(self.operations, self.outputs)
+        except ValueError:
+            return
+        self.aig = graph.optimize(depth=self.balance)
+        self.optimized = self.aig.to_core()
+
+    def _balanced_chain(self, expr: Binary, operands: list[Expr]) -> int:
+        #Tree height reduction: the two operands of lowest level are combined first (Huffman on levels), so the
+        #chain is log2(n) levels deep when its operands arrive together and late operands go in last.
+        #The last gate drives the target.
+        operation = expr.operator.kind
+        nets = [self._evaluate(operand, target=None) for operand in operands]
+        written = _parsed_level(expr, [self._written_level.get(net, 0) for net in nets])
+
+        level = self.core.level
+        heap = [(level[net], i, net) for i, net in enumerate(nets)]
+        heapify(heap)
+        order = len(heap)
+        while len(heap) > 2:
+            _, _, a = heappop(heap)
+            _, _, b = heappop(heap)
+            net = self._add_operation(left=a, operation=operation, right=b, target=None)
+            heappush(heap, (level[net], order, net))
+            order += 1
+        (_, _, a), (_, _, b) = heappop(heap), heappop(heap)
+        out = self._add_operation(left=a, operation=operation, right=b, target=self._get_named_target())
+        self._written_level[out] = written
+        return out
+
+    def _reset_core(self, core: NetlistCore) -> None:
+        #Swaps in core and drops everything that refers to net ids of the old one
+        self.core = core
+        self.netlist = core.lines
+        self.operations = core.operations
+        self._cse_table.clear()
+        self._cse_uses.clear()
+        self._written_level.clear()
+
    
 
-    def _newtemp(self) -> str:
-        self.temp_id += 1
-        return f't{self.temp_id}'
+    @property
+    def seen(self) -> set[str]:
+        return self.core.nets_with(SEEN)
 
-    def _newinst(self) -> str:
-        self.inst_id += 1
-        return f'u{self.inst_id}'
+    @property
+    def driven(self) -> set[str]:
+        return self.core.nets_with(DRIVEN)
 
-    def _get_target_name(self) -> str:
-        if len(self.target_stack) == 0: 
-            return self._newtemp()
-        top = self.target_stack[-1]
+    def _newtemp(self) -> int:
+        return self.core.new_temp()
+
+    def _get_target_name(self) -> int:
+        top = self._get_named_target()
         if top is None:
             return self._newtemp()
         return top
 
+    def _get_named_target(self) -> int | None:
+        #Target pushed by a declaration/assignment, or None if the result may go to any net
+        if len(self.target_stack) == 0:
+            return None
+        return self.target_stack[-1]
+
 
     def _is_truthy(self, obj: object) -> bool:
         if obj is None: return False
@@ -127,31 +288,70 @@ class NetlistGenerator(ExprVisitor[object], StmtVisitor[None]):
         finally:
             self.target_stack.pop()
 
-    def _add_operation(self, left, operation: Tok, right, target) -> None:
+    def _fold(self, expr: Expr) -> Expr:
+        return expr if self.folder is None else self.folder.fold(expr)
+
+    def _drive(self, name: int, value: int) -> int:
+        #A value that is not already on the named net (a variable, a constant, or an expression folded to one)
+        #is connected through a buffer
+        if value != name:
+            self._add_operation(left=value, operation=None, right=None, target=name)
+        return name
+
+    def _cse_key(self, left: int, operation: Tok, right: int) -> tuple:
+        #Canonical key: commutative operands are sorted by net id
+        if right != NO_NET and operation in COMMUTATIVE and right < left:
+            left, right = right, left
+        return (operation, left, right)
+
+    def _cse_invalidate(self, net: int) -> None:
+        #net is about to be (re)driven: gates that read or produce it no longer compute the same value
+        for key in self._cse_uses.pop(net, ()):
+            output = self._cse_table.pop(key, None)
+            for other in (key[1], key[2], output):
+                if other != net and other in self._cse_uses:
+                    self._cse_uses[other].discard(key)
+
+    def _add_operation(self, left: int, operation: Tok | None, right: int | None, target: int | None) -> int:
+        #Emits the gate and returns its output net. target None means any net: if an identical gate
+        #already exists its output is reused, otherwise a new temp is allocated. operation None is a buffer.
+        self.gates_requested += 1
+        if right is None: right = NO_NET
+        key = self._cse_key(left, operation, right)
+        if self.cse and target is None and key in self._cse_table:
+            return self._cse_table[key]
+        if target is None:
+            target = self._newtemp()
+
+        if self.cse:
+            self._cse_table[key] = target
+            for net in (left, right, target):
+                if net != NO_NET:
+                    self._cse_uses.setdefault(net, set()).add(key)
+
         op = ''
         match operation:
             case Tok.XOR: op = '^'
             case Tok.AND: op = '&'
             case Tok.OR: op = '|'
             case Tok.NOT: op = '~'
-        
-        if right is None:
-            self.operations.append(Operation(output = target, A = left, B = None, operation = op))
-            self.netlist.append(f'{self._newinst()}: {op} A = {left}, Y = {target}')
-        
-        else:
-            self.operations.append(Operation(output = target, A = left, B = right, operation = op))
-            self.netlist.append(f'{self._newinst()}: {op} A = {left}, B = {right}, Y = {target}')
+
+        self.core.add_gate(op, left, right, target)
+        written = self._written_level
+        written[target] = 1 + max(written.get(left, 0), written.get(right, 0))
+        return target
     
 #--------------------STMT-------------------
 
     def visit_var_stmt(self, stmt: Var) -> None:
-        name = stmt.name.lexeme
+        name = self.core.net(stmt.name.lexeme)
         value = None
 
         if stmt.intializer is not None:
-            value = self._evaluate(stmt.intializer, target=name)
-            self.driven.add(name)
+            self._cse_invalidate(name)
+            value = self._drive(name, self._evaluate(self._fold(stmt.intializer), target=name))
+            self._cse_invalidate(name)
+            self.core.mark(name, DRIVEN)
 
         self.environment.define(stmt.name.lexeme, value)
         return
@@ -173,38 +373,45 @@ class NetlistGenerator(ExprVisitor[object], StmtVisitor[None]):
 
 #--------------------EXPR-------------------
     def visit_literal_expr(self, expr: Literal) -> object:
-        return self._is_truthy(expr.value)
+        #Constants are nets named by their value
+        return self.core.net(self._is_truthy(expr.value))
     
     def visit_grouping_expr(self, expr: Grouping) -> object:
-        return self._evaluate(expr.expression, target=self._get_target_name())
+        #Parentheses only group, the inner expression inherits the target
+        return self._evaluate(expr.expression, target=self._get_named_target())
     
     def visit_binary_expr(self, expr: Binary) -> object:
+        if self.balance and expr.operator.kind in COMMUTATIVE:
+            operands = _chain_operands(expr)
+            if len(operands) > 2:
+                return self._balanced_chain(expr, operands)
+
         #Children get no target
         A = self._evaluate(expr.left, target=None)
         B = self._evaluate(expr.right, target=None)
-        Y = self._get_target_name()
+        Y = self._get_named_target()
 
-        self._add_operation(left = A, operation = expr.operator.kind, right = B, target = Y)
-        return Y
+        return self._add_operation(left = A, operation = expr.operator.kind, right = B, target = Y)
     
     def visit_unary_expr(self, expr: Unary) -> object:
         #Children get no target
         A = self._evaluate(expr.right, target=None)
-        Y = self._get_target_name()
+        Y = self._get_named_target()
 
-        self._add_operation(right=None, operation=expr.operator.kind, left=A, target=Y)
-        return Y
+        return self._add_operation(right=None, operation=expr.operator.kind, left=A, target=Y)
     
     def visit_variable_expr(self, expr: Variable) -> object:
-        name = expr.name.lexeme
-        self.seen.add(name)
+        name = self.core.net(expr.name.lexeme)
+        self.core.mark(name, SEEN)
         return name
         
 
     def visit_assign_expr(self, expr: Assign) -> object:
-        name = expr.name.lexeme
-        self.driven.add(name)
-        value = self._evaluate(expr.value, target=name)
+        name = self.core.net(expr.name.lexeme)
+        self.core.mark(name, DRIVEN)
+        self._cse_invalidate(name)
+        value = self._drive(name, self._evaluate(self._fold(expr.value), target=name))
+        self._cse_invalidate(name)
         self.environment.assign(name, value)
         return value
 
@@ -212,4 +419,93 @@ class NetlistGenerator(ExprVisitor[object], StmtVisitor[None]):
     def visit_call_expr(self, node):
         pass
     def visit_logical_expr(self, node):
-        pass
\ No newline at end of file
+        pass
+
+
+def _chain_operands(expr: Binary) -> list[Expr]:
+    #Operands of a chain of expr's operator, left to right, looking through parentheses: a ^ (b ^ c) ^ d -> a, b, c, d
+    kind = expr.operator.kind
+    operands = []
+    stack = [expr]
+    while stack:
+        node = inner = stack.pop()
+        while isinstance(inner, Grouping):
+            inner = inner.expression
+        if isinstance(inner, Binary) and inner.operator.kind == kind:
+            stack.append(inner.right)
+            stack.append(inner.left)
+        else:
+            operands.append(node)
+    return operands
+
+
+def _parsed_level(expr: Binary, levels: list[int]) -> int:
+    #Level of the chain as parsed (see _chain_operands), given the levels of its operands left to right
+    kind = expr.operator.kind
+    operands = iter(levels)
+    results = []
+    stack = [(expr, False)]
+    while stack:
+        node, combine = stack.pop()
+        while isinstance(node, Grouping):
+            node = node.expression
+        if isinstance(node, Binary) and node.operator.kind == kind:
+            if combine:
+                right, left = results.pop(), results.pop()
+                results.append(1 + max(left, right))
+            else:
+                stack.extend(((node, True), (node.right, False), (node.left, False)))
+        else:
+            results.append(next(operands))
+    return results[0]
+
+
+def _minimize_job(job: tuple[list[str], list[str]]) -> list[str]:
+    #Runs in pool workers: (minterms, dont_cares) -> cover
+    minterms, dont_cares = job
+    return SimplifyExpression.minimize(minterms, exact_inputs=MINIMIZE_INPUTS, dont_cares=dont_cares)
+
+
+def _sop_netlist(function: dict[str, list[str] | None], cones: dict[str, list[str]]) -> NetlistCore:
+    #Two level netlist of the covers, outputs in sorted order: one NOT per complemented input, an AND chain
+    #per cube and an OR chain per output. Outputs without a cover (None) are left out.
+    core = NetlistCore()
+    inverted: dict[str, int] = {}
+
+    def literal(name: str, c: str) -> int:
+        if c == '1':
+            return core.net(name)
+        if name not in inverted:
+            inverted[name] = core.new_temp()
+            core.add_gate('~', core.net(name), NO_NET, inverted[name])
+        return inverted[name]
+
+    def chain(op: str, nets: list[int], out: int) -> None:
+        #Left to right chain of op over nets, the last gate drives out
+        if len(nets) == 1:
+            core.add_gate('', nets[0], NO_NET, out)
+            return
+        acc = nets[0]
+        for i, net in enumerate(nets[1:], start=2):
+            target = out if i == len(nets) else core.new_temp()
+            core.add_gate(op, acc, net, target)
+            acc = target
+
+    for output, cubes in function.items():
+        if cubes is None:
+            continue
+        out = core.net(output)
+        core.mark(out, DRIVEN)
+        terms = []
+        for cube in cubes:
+            literals = [literal(name, c) for name, c in zip(cones[output], cube) if c != '-']
+            if len(literals) == 0:
+                terms.append(core.net(True))
+            elif len(literals) == 1:
+                terms.append(literals[0])
+            else:
+                term = core.new_temp()
+                chain('&', literals, term)
+                terms.append(term)
+        chain('|', terms or [core.net(False)], out)
+    return core
@@ -3,11 +3,32 @@ from .token import Token, Tok
 from .errors import error
 from .Stmt import Stmt, StmtVisitor, Print, Expression, Var, Block, If, While
 from .environment import Environment
+from .tokenstream import TokenStream
+from .interner import ExprFactory, InterningExprFactory
 
 class ParseError(Exception):
     pass
 
 
+#Binding powers for the pratt engine, one level per rule of hdlgrammar.cfg (lowest to highest precedence).
+#Binary rules are left associative: the right operand is parsed one level above the operator.
+BP_ASSIGN = 1
+BP_UNARY = 12
+INFIX: dict[Tok, tuple[int, type[Expr]]] = {
+    Tok.LOR: (2, Logical),
+    Tok.LXOR: (3, Logical),
+    Tok.LAND: (4, Logical),
+    Tok.OR: (5, Binary),
+    Tok.XOR: (6, Binary),
+    Tok.AND: (7, Binary),
+    Tok.NEQ: (8, Binary), Tok.EQ: (8, Binary),
+    Tok.GT: (9, Binary), Tok.GTE: (9, Binary), Tok.LT: (9, Binary), Tok.LTE: (9, Binary),
+    Tok.SUB: (10, Binary), Tok.PLUS: (10, Binary),
+    Tok.DIVIDE: (11, Binary), Tok.MULTIPLY: (11, Binary),
+}
+ENGINES = ('descent', 'pratt')
+
+
 class Parser:
     '''
     This Parser uses Recursive Descent, along with an LL(1) Context Free Grammar. The grammar is defined in the grammar.cfg file. 
@@ -63,9 +84,21 @@ class Parser:
     '''
 
     #TODO: Refactor bruh this is so unreadable
-    def __init__(self, tokens: list[Token]) -> None:
+    def __init__(self, tokens: list[Token] | TokenStream, engine: str = 'descent', intern: bool = False) -> None:
+        if engine not in ENGINES:
+            raise ValueError(f'Unknown parser engine "{engine}". Expected one of {ENGINES}.')
+        #Expression engine: descent (recursive, one call per grammar rule) or pratt (iterative, see pratt_expression)
+        self.engine = engine
+        #intern: share structurally identical subtrees, see interner.InterningExprFactory
+        self.nodes = InterningExprFactory() if intern else ExprFactory()
+        self.build = self.nodes.build
         self.tokens = tokens
         self.current = 0
+        #A TokenStream answers kind lookups from its columns, so check/is_at_end never build a Token
+        if isinstance(tokens, TokenStream):
+            self._kind = tokens.kind
+        else:
+            self._kind = lambda i: tokens[i].kind
 
 
 
@@ -86,10 +119,10 @@ class Parser:
     def synchronize(self) -> None:
         self.advance()
         while not self.is_at_end():
-            if self.previous().kind == Tok.SEMICOLON:
+            if self._kind(self.current - 1) == Tok.SEMICOLON:
                 return
             
-            match self.peek().kind:
+            match self._kind(self.current):
                 case Tok.FUNCTION: ...
                 case Tok.VAR: ...
                 case Tok.FOR: ...
@@ -137,7 +170,8 @@ class Parser:
     def match(self, *types: Tok) -> bool:
         for t in types:
             if self.check(t):
-                self.advance()
+                #check() implies not at end; step without materializing the token
+                self.current += 1
                 return True
              
         return False
@@ -145,7 +179,7 @@ class Parser:
     def check(self, type_: Tok) -> bool:
         if self.is_at_end():
             return False
-        return self.peek().kind == type_
+        return self._kind(self.current) == type_
 
 
     def advance(self) -> Token:
@@ -154,7 +188,7 @@ class Parser:
     
 
     def is_at_end(self) -> bool:
-        return self.peek().kind == Tok.EOF
+        return self._kind(self.current) == Tok.EOF
     
 
     def peek(self) -> Token:
@@ -241,6 +275,8 @@ class Parser:
 #------------------------------------------------
 
     def expression(self) -> Expr:
+        if self.engine == 'pratt':
+            return self.pratt_expression()
         return self.assignment()
     
     def assignment(self) -> Expr:
@@ -262,7 +298,7 @@ class Parser:
         while self.match(Tok.LOR):
             operator = self.previous()
             right = self.logical_xor()
-            expr = Logical(expr, operator, right)
+            expr = self.build(Logical, expr, operator, right)
 
         return expr
     
@@ -271,7 +307,7 @@ class Parser:
         while self.match(Tok.LXOR):
             operator = self.previous()
             right = self.logical_and()
-            expr = Logical(expr, operator, right)
+            expr = self.build(Logical, expr, operator, right)
 
         return expr
 
@@ -280,7 +316,7 @@ class Parser:
         while self.match(Tok.LAND):
             operator = self.previous()
             right = self.bit_or()
-            expr = Logical(expr, operator, right)
+            expr = self.build(Logical, expr, operator, right)
         
         return expr
 
@@ -289,7 +325,7 @@ class Parser:
         while self.match(Tok.OR):
             operator = self.previous()
             right = self.bit_xor()
-            expr = Binary(expr, operator, right)
+            expr = self.build(Binary, expr, operator, right)
         
         return expr
     
@@ -298,7 +334,7 @@ class Parser:
         while self.match(Tok.XOR):
             operator = self.previous()
             right = self.bit_and()
-            expr = Binary(expr, operator, right)
+            expr = self.build(Binary, expr, operator, right)
 
         return expr
     
@@ -307,7 +343,7 @@ class Parser:
         while self.match(Tok.AND):
             operator = self.previous()
             right = self.equality()
-            expr = Binary(expr, operator, right)
+            expr = self.build(Binary, expr, operator, right)
 
         return expr
     
@@ -317,7 +353,7 @@ class Parser:
         while self.match(Tok.NEQ, Tok.EQ):
             operator = self.previous()
             right = self.comparison()
-            expr = Binary(expr, operator, right)
+            expr = self.build(Binary, expr, operator, right)
 
         return expr
 
@@ -327,7 +363,7 @@ class Parser:
         while self.match(Tok.GT, Tok.GTE, Tok.LT, Tok.LTE):
             operator = self.previous()
             right = self.term()
-            expr = Binary(expr, operator, right)
+            expr = self.build(Binary, expr, operator, right)
 
         return expr
     
@@ -337,7 +373,7 @@ class Parser:
         while self.match(Tok.SUB, Tok.PLUS):
             operator = self.previous()
             right = self.factor()
-            expr = Binary(expr, operator, right)
+            expr = self.build(Binary, expr, operator, right)
 
         return expr
     
@@ -347,7 +383,7 @@ class Parser:
         while self.match(Tok.DIVIDE, Tok.MULTIPLY):
             operator = self.previous()
             right = self.unary()
-            expr = Binary(expr, operator, right)
+            expr = self.build(Binary, expr, operator, right)
 
         return expr
     
@@ -355,7 +391,7 @@ class Parser:
         if self.match(Tok.NOT, Tok.SUB):
             operator = self.previous()
             right = self.unary()
-            return Unary(operator, right)
+            return self.build(Unary, operator, right)
         
         return self.call()
     
@@ -384,26 +420,136 @@ class Parser:
         return Call(callee, paren, arguments)
     
     def primary(self) -> Expr:
-        if self.match(Tok.FALSE): return Literal(False)
-        if self.match(Tok.TRUE): return Literal(True)
-        if self.match(Tok.NULL): return Literal(None)
+        if self.match(Tok.FALSE): return self.build(Literal, False)
+        if self.match(Tok.TRUE): return self.build(Literal, True)
+        if self.match(Tok.NULL): return self.build(Literal, None)
 
         if self.match(Tok.NUMBER, Tok.STRING):
-            return Literal(self.previous().literal)
+            return self.build(Literal, self.previous().literal)
 
         if self.match(Tok.IDENT):
-            return Variable(self.previous())
+            return self.build(Variable, self.previous())
 
         if self.match(Tok.LPAREN):
             expr = self.expression()
             self.consume(Tok.RPAREN, 'Expected ")" after expression.')
-            return Grouping(expr)
+            return self.build(Grouping, expr)
         
         raise self.error(token=self.peek(), message="Unexpected Expression")
 
 
 
 
+#------------------------------------------------
+
+    def pratt_expression(self) -> Expr:
+        '''
+        Iterative precedence climbing over the INFIX binding power table. Builds the same nodes, and reports the
+        same errors, as the recursive descent rules from assignment down to primary.
+        Every point where descent would recurse (right operand, unary operand, grouping, call argument) instead
+        pushes a frame onto an explicit stack, so nesting depth is bounded by memory rather than the recursion limit.
+        Frames are (kind, saved min_bp, ...) where kind is one of:
+            'infix'  - (lhs, operator, node class) waiting for its right operand
+            'unary'  - (operator) waiting for its operand
+            'assign' - (target, equals) waiting for the assigned value
+            'group'  - waiting for ")"
+            'call'   - (callee, arguments) waiting for the next argument
+        '''
+        stack: list[tuple] = []
+        min_bp = BP_ASSIGN
+
+        while True:
+            #Operand position: prefix operators, then a primary
+            while self.match(Tok.NOT, Tok.SUB):
+                stack.append(('unary', min_bp, self.previous()))
+                min_bp = BP_UNARY
+
+            if self.match(Tok.LPAREN):
+                stack.append(('group', min_bp))
+                min_bp = BP_ASSIGN
+                continue
+            expr = self._pratt_atom()
+            primary = True
+
+            while True:
+                if primary:
+                    #Postfix calls bind to a primary before any prefix or infix operator
+                    opened = False
+                    while self.match(Tok.LPAREN):
+                        if not self.check(Tok.RPAREN):
+                            stack.append(('call', min_bp, expr, []))
+                            opened = True
+                            break
+                        expr = Call(expr, self.consume(Tok.RPAREN, "Expected ')' after function call"), [])
+                    if opened:
+                        min_bp = BP_ASSIGN
+                        break
+                    primary = False
+
+                #Infix operators at or above min_bp open a frame for their right operand
+                kind = self._kind(self.current)
+                if kind in INFIX and INFIX[kind][0] >= min_bp:
+                    bp, node = INFIX[kind]
+                    self.current += 1
+                    stack.append(('infix', min_bp, expr, self.previous(), node))
+                    min_bp = bp + 1
+                    break
+                if kind == Tok.EQUAL and min_bp <= BP_ASSIGN:
+                    self.current += 1
+                    stack.append(('assign', min_bp, expr, self.previous()))
+                    min_bp = BP_ASSIGN
+                    break
+
+                #expr is complete at this level, hand it to the innermost frame
+                if not stack:
+                    return expr
+
+                frame = stack.pop()
+                min_bp = frame[1]
+                match frame[0]:
+                    case 'infix':
+                        _, _, left, operator, node = frame
+                        expr = self.build(node, left, operator, expr)
+                    case 'unary':
+                        expr = self.build(Unary, frame[2], expr)
+                    case 'assign':
+                        _, _, target, equals = frame
+                        if isinstance(target, Variable):
+                            expr = Assign(target.name, expr)
+                        else:
+                            error(token=equals, message='Invalid assignment target.')
+                            expr = target
+                    case 'group':
+                        self.consume(Tok.RPAREN, 'Expected ")" after expression.')
+                        expr = self.build(Grouping, expr)
+                        primary = True
+                    case 'call':
+                        _, _, callee, arguments = frame
+                        arguments.append(expr)
+                        if len(arguments) >= 255:
+                            error(token=self.peek(), message="Cannot have more than 255 arguments.")
+                        if self.match(Tok.COMMA):
+                            stack.append(frame)
+                            min_bp = BP_ASSIGN
+                            break
+                        expr = Call(callee, self.consume(Tok.RPAREN, "Expected ')' after function call"), arguments)
+                        primary = True
+
+    def _pratt_atom(self) -> Expr:
+        #primary, except grouping which pratt_expression handles with a frame
+        if self.match(Tok.FALSE): return self.build(Literal, False)
+        if self.match(Tok.TRUE): return self.build(Literal, True)
+        if self.match(Tok.NULL): return self.build(Literal, None)
+
+        if self.match(Tok.NUMBER, Tok.STRING):
+            return self.build(Literal, self.previous().literal)
+
+        if self.match(Tok.IDENT):
+            return self.build(Variable, self.previous())
+
+        raise self.error(token=self.peek(), message="Unexpected Expression")
+
+
     def consume(self, type_:Tok, message: str) -> Token:
         if self.check(type_): return self.advance()
         raise self.error(self.peek(), message)
@@ -5,67 +5,119 @@
 
 #RDT, RC, RHC, 
 
+import os
 import sys
 from pathlib import Path
 from .errors import HAD_ERROR, HAD_RUNTIME_ERROR
 from .token import Tok, Token
 from .parser import Parser
-from .lexer import Lexer
+from .lexer import Lexer, split_statements
 #from .old.AstPPrinter import AstPrinter
 #from .interpreter import Interpreter
 from .netlistPrinter import NetlistGenerator
+from .mincache import MinimizationCache, DEFAULT_DIRECTORY
 
 
 #interpreter = Interpreter()
-net = NetlistGenerator()
 
 
 def main(argv: list[str]) -> None:
-    if len(argv) > 1:
-        print("Useage: rhls [script]")
+    #--stream: emit the netlist statement by statement (see run_file)
+    #--jobs N: minimise outputs in N worker processes, 0 for one per CPU
+    #--aig: also optimise the netlist as an And-Inverter Graph
+    #--area: keep operator chains as written (fewer gates under CSE) instead of balancing them for depth
+    stream = '--stream' in argv
+    aig = '--aig' in argv
+    balance = '--area' not in argv
+    argv = [arg for arg in argv if arg not in ('--stream', '--aig', '--area')]
+    jobs = 1
+    if '--jobs' in argv:
+        i = argv.index('--jobs')
+        try:
+            jobs = int(argv[i + 1])
+        except (IndexError, ValueError):
+            jobs = -1
+        argv = argv[:i] + argv[i + 2:]
+    if len(argv) > 1 or jobs < 0:
+        print("Useage: rhls [--stream] [--jobs N] [--aig] [--area] [script]")
         sys.exit(64) #cmd line error
 
     elif len(argv) == 1:
-        run_file(argv[0]) #Run script file
+        run_file(argv[0], stream=stream, jobs=jobs, net=generator(aig=aig, balance=balance)) #Run script file
 
     else:
-        run_prompt() #Start REPL
+        run_prompt(generator(aig=aig, balance=balance)) #Start REPL
 
 
-def run_file(path: str) -> None:
+def generator(aig: bool = False, balance: bool = True) -> NetlistGenerator:
+    #A netlist generator whose minimised functions are kept on disk between runs
+    return NetlistGenerator(cache=MinimizationCache(directory=DEFAULT_DIRECTORY), aig=aig, balance=balance)
+
+
+def run_file(path: str, stream: bool = False, output: str | None = None, jobs: int = 1,
+             net: NetlistGenerator | None = None) -> None:
+    #stream: read, parse and lower one statement at a time, writing gates to output (stdout if None) as they are made
+    #jobs: worker processes for minimisation (0 = os.cpu_count())
+    #net: the generator to use, a new generator() if None
     global HAD_ERROR
-    source = Path(path).read_text(encoding='utf-8')
-    run(source)
+    net = generator() if net is None else net
+    net.jobs = jobs or os.cpu_count() or 1
+    if stream:
+        run_stream(path, output, balance=net.balance)
+    else:
+        source = Path(path).read_text(encoding='utf-8')
+        run(source, net)
     if HAD_ERROR:
         sys.exit(65) #data error
     if HAD_RUNTIME_ERROR:
         sys.exit(70)
 
 
-def run_prompt() -> None:
+def run_prompt(net: NetlistGenerator | None = None) -> None:
+    #Every line goes to the same generator, so later lines see the variables of earlier ones
     global HAD_ERROR
+    net = generator() if net is None else net
     try:
         while True:
             line = input("> ")
-            run(line)
+            run(line, net)
             HAD_ERROR = False #Keep REPL open after error
     except (KeyboardInterrupt):
         print()
 
 
-def run(source: str) -> None:
+def run(source: str, net: NetlistGenerator | None = None) -> None:
 
     lex=Lexer(source, is_file=False)
-    tokens = lex.scan_tokens()
-    parser = Parser(tokens=tokens)
+    tokens = lex.scan_stream()
+    parser = Parser(tokens=tokens, engine='pratt')
     statements = parser.parse()
     
     if HAD_ERROR: return
     #interpreter.interpret(statements)
-    net.create_netlist(statements)
+    (generator() if net is None else net).create_netlist(statements)
+
+
+def parse_stream(path: str):
+    #Statements of the file in order, parsed group by group (split_statements)
+    with open(path, encoding='utf-8') as f:
+        for text, line in split_statements(f):
+            yield from Parser(tokens=Lexer(text, line=line).scan_stream(), engine='pratt').parse()
+
+
+def run_stream(path: str, output: str | None = None, balance: bool = True) -> None:
+    sink = sys.stdout if output is None else open(output, 'w', encoding='utf-8')
+    try:
+        for line in NetlistGenerator(balance=balance).stream_netlist(parse_stream(path)):
+            sink.write(line)
+            sink.write('\n')
+    finally:
+        if sink is not sys.stdout:
+            sink.close()
 if __name__ == '__main__':
     file = sys.argv[1:]
     #bruh
-    if str(file[0])[-4:] != '.rhc':
+    scripts = [arg for i, arg in enumerate(file) if arg not in ('--stream', '--jobs', '--aig', '--area') and (i == 0 or file[i - 1] != '--jobs')]
+    if len(scripts) > 0 and str(scripts[0])[-4:] != '.rhc':
             raise TypeError("Filetype must be .rhc")
     main(file)
\ No newline at end of file
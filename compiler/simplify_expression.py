@@ -0,0 +1,180 @@
+from .cover import MinimumCover
+from .espresso import Espresso
+
+# Cost of one prime implicant in the cover, less one per dash. Must exceed the number of inputs.
+GATE_COST = 1 << 10
+# minimize() uses exact Quine-McCluskey up to this many inputs, Espresso above
+EXACT_INPUTS = 12
+
+
+class SimplifyExpression:
+    """Quine-McCluskey minimisation. Terms are strings like '1-0-' (most significant input first) at the API,
+    and (value, mask) integer pairs internally: mask has a 1 for every dash, value holds the remaining bits
+    and is 0 under the mask. Ex '1-0-' is (0b1000, 0b0101)."""
+
+    @classmethod
+    def simplify(cls, minterms: list[str], time_budget: float = 1.0, dont_cares: list[str] | None = None) -> list[str]:
+        """Return the simplest sum of prime implicants that is equivalent to the expression given by minterms.
+        This process is described here https://en.wikipedia.org/wiki/Quine%E2%80%93McCluskey_algorithm.
+        time_budget (seconds) bounds the exact cover search, past it the best cover found is returned.
+        dont_cares are terms the result may or may not contain: they take part in merging, so primes can grow
+        through them, but they are not columns of the chart, so no prime is chosen to cover them."""
+        if len(minterms) == 0:
+            return []
+        n_inputs = len(minterms[0])
+        terms = [cls._to_implicant(minterm) for minterm in minterms]
+        dont_care_terms = [cls._to_implicant(dont_care) for dont_care in dont_cares or []]
+        prime_implicants = cls._prime_implicants(terms + dont_care_terms, n_inputs)
+        chart = cls._build_prime_implicant_chart(prime_implicants, cls._expand(terms))
+        # Primes made only of don't cares cover nothing
+        chart = {prime_implicant: row for prime_implicant, row in chart.items() if row}
+        minimal_prime_implicants = cls._read_prime_implicant_chart(chart, time_budget)
+        return [cls._to_string(implicant, n_inputs) for implicant in minimal_prime_implicants]
+
+    @classmethod
+    def minimize(cls, expression: list[str], time_budget: float = 1.0, exact_inputs: int = EXACT_INPUTS,
+                 dont_cares: list[str] | None = None) -> list[str]:
+        """Return a sum of products equivalent to expression, a list of cubes like '1-0-', outside dont_cares.
+        Functions of up to exact_inputs inputs are minimised exactly (simplify), wider ones with the Espresso
+        heuristic, which works on the cubes directly instead of expanding them to minterms."""
+        if len(expression) == 0:
+            return []
+        n_inputs = len(expression[0])
+        if n_inputs <= exact_inputs:
+            # simplify only merges terms with the same dashes, so it is given minterms: the cubes' minterms
+            # that are not don't cares, and the don't cares' minterms
+            dont_care_minterms = cls._expand([cls._to_implicant(dont_care) for dont_care in dont_cares or []])
+            minterms = set(cls._expand([cls._to_implicant(cube) for cube in expression]))
+            minterms.difference_update(dont_care_minterms)
+            return cls.simplify([cls._to_string((minterm, 0), n_inputs) for minterm in sorted(minterms)],
+                                time_budget, [cls._to_string((minterm, 0), n_inputs) for minterm in dont_care_minterms])
+        dont_care_cubes = [cls._to_implicant(dont_care) for dont_care in dont_cares or []]
+        cover = Espresso(n_inputs, dont_care_cubes).minimize([cls._to_implicant(cube) for cube in expression])
+        return [cls._to_string(cube, n_inputs) for cube in cover]
+
+    @classmethod
+    def _get_prime_implicants(cls, minterms: list[str]) -> list[str]:
+        """Return a list of the prime implicants from minterms. A prime implicant is a product term
+        that can not be simplified any further by combining with other groups."""
+        if len(minterms) == 0:
+            return []
+        n_inputs = len(minterms[0])
+        prime_implicants = cls._prime_implicants([cls._to_implicant(minterm) for minterm in minterms], n_inputs)
+        return [cls._to_string(implicant, n_inputs) for implicant in prime_implicants]
+
+    @staticmethod
+    def _to_implicant(minterm: str) -> tuple[int, int]:
+        """Return the (value, mask) pair for a string minterm. Ex '1-0-' -> (0b1000, 0b0101)."""
+        value = int(minterm.replace("-", "0"), 2)
+        mask = int(minterm.replace("1", "0").replace("-", "1"), 2)
+        return value, mask
+
+    @staticmethod
+    def _to_string(implicant: tuple[int, int], n_inputs: int) -> str:
+        """Return the string form of a (value, mask) pair."""
+        value, mask = implicant
+        bits = []
+        for i in range(n_inputs - 1, -1, -1):
+            bit = 1 << i
+            bits.append("-" if mask & bit else "1" if value & bit else "0")
+        return "".join(bits)
+
+    @staticmethod
+    def _prime_implicants(terms: list[tuple[int, int]], n_inputs: int) -> list[tuple[int, int]]:
+        """Return the prime implicants of terms, sorted by (mask, value).
+        Terms with the same mask are grouped by popcount of value: a term only merges with a term of the next
+        group that has exactly one more bit set (at a position outside the mask). Instead of comparing the two
+        groups pairwise, each term looks up its possible partners (value | bit, for every free 0 bit) in a set,
+        which is the same comparison in O(n_inputs) per term. Each pass merges every pair once, and merged
+        terms are deduplicated by the sets."""
+        full = (1 << n_inputs) - 1
+        # mask -> popcount -> values
+        current: dict[int, dict[int, set[int]]] = {}
+        for value, mask in terms:
+            value &= ~mask
+            current.setdefault(mask, {}).setdefault(value.bit_count(), set()).add(value)
+
+        prime_implicants = []
+        while current:
+            merged: dict[int, dict[int, set[int]]] = {}
+            for mask, groups in current.items():
+                free = full & ~mask
+                for count, values in groups.items():
+                    above = groups.get(count + 1)
+                    below = groups.get(count - 1)
+                    for value in values:
+                        combined = False
+                        # Partners above: one more bit set. Merged terms are emitted from the lower side only.
+                        if above:
+                            candidates = free & ~value
+                            while candidates:
+                                bit = candidates & -candidates
+                                candidates ^= bit
+                                if value | bit in above:
+                                    combined = True
+                                    merged.setdefault(mask | bit, {}).setdefault(count, set()).add(value)
+                        # Partners below: one fewer bit set. Only needed to know whether value merged at all.
+                        if not combined and below:
+                            candidates = value
+                            while candidates:
+                                bit = candidates & -candidates
+                                candidates ^= bit
+                                if value ^ bit in below:
+                                    combined = True
+                                    break
+                        if not combined:
+                            prime_implicants.append((value, mask))
+            current = merged
+
+        prime_implicants.sort(key=lambda implicant: (implicant[1], implicant[0]))
+        return prime_implicants
+
+    @staticmethod
+    def _expand(terms: list[tuple[int, int]]) -> list[int]:
+        """Return the sorted minterm values covered by terms (terms with dashes cover several minterms)."""
+        minterms = set()
+        for value, mask in terms:
+            # Enumerate every subset of mask
+            subset = mask
+            while True:
+                minterms.add(value | subset)
+                if subset == 0:
+                    break
+                subset = (subset - 1) & mask
+        return sorted(minterms)
+
+    @classmethod
+    def _build_prime_implicant_chart(cls, prime_implicants: list[tuple[int, int]],
+                                     minterms: list[int]) -> dict[tuple[int, int], int]:
+        """Return a dictionary that maps prime implicants to a bitset over minterms,
+        where bit i is 1 iff the prime implicant contains the minterm at index i."""
+        index = {minterm: i for i, minterm in enumerate(minterms)}
+        chart = {}
+        for prime_implicant in prime_implicants:
+            value, mask = prime_implicant
+            row = 0
+            # The minterms a prime implicant contains are value | every subset of mask. Ex 1-0- contains 1001.
+            subset = mask
+            while True:
+                i = index.get(value | subset)
+                if i is not None:
+                    row |= 1 << i
+                if subset == 0:
+                    break
+                subset = (subset - 1) & mask
+            chart[prime_implicant] = row
+        return chart
+
+    @classmethod
+    def _read_prime_implicant_chart(cls, chart: dict[tuple[int, int], int],
+                                    time_budget: float = 1.0) -> list[tuple[int, int]]:
+        """Return the minimal needed prime implicants from the prime implicants chart.
+        Every prime costs one AND gate, ties are broken on literals (the inputs an AND gate reads).
+        See MinimumCover for the reduction and search, time_budget bounds the search in seconds."""
+        if len(chart) == 0:
+            return []
+        prime_implicants = list(chart)
+        # A gate outweighs any number of literals, and fewer literals is more dashes
+        costs = [GATE_COST - mask.bit_count() for _, mask in prime_implicants]
+        solver = MinimumCover([chart[prime_implicant] for prime_implicant in prime_implicants], costs)
+        return [prime_implicants[j] for j in solver.solve(time_budget)]
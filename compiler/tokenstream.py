@@ -0,0 +1,123 @@
+from array import array
+import sys
+from .token import Tok, Token
+
+#Kind codes: Tok members are numbered from 1 by auto(), so the code is Tok.value and fits in one byte.
+_KINDS: tuple[Tok | None, ...] = (None,) + tuple(Tok)
+_NO_LITERAL = -1
+
+
+class TokenStream:
+    '''
+    Compact, array backed replacement for list[Token].
+    Every token is one row across parallel columns:
+        kinds    (B) - Tok.value
+        starts   (I) - offset of the first character of the lexeme in source
+        ends     (I) - offset one past the last character
+        lines    (I) - line number, as reported by the Lexer
+        cols     (I) - col number, as reported by the Lexer
+        literals (i) - NUMBER rows: index into numbers (d). Other rows: index into the interned
+                       string table, -1 for None.
+    Lexemes are never stored; they are sliced out of source (NUMBER lexemes are their float literal).
+    Token objects are only built on demand by __getitem__, e.g. for AST nodes and error reporting.
+    Tokens that do not fit this layout (sized/signed/based numbers) are kept whole in _extras.
+
+    A row costs 21 bytes (29 for numbers), against roughly 150 bytes for a Token, its lexeme and its literal.
+    See tools/bench_tokens.py.
+    '''
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self.kinds = array('B')
+        self.starts = array('I')
+        self.ends = array('I')
+        self.lines = array('I')
+        self.cols = array('I')
+        self.literals = array('i')
+        self.numbers = array('d')
+        self._strings: list[str] = []
+        self._string_ids: dict[str, int] = {}
+        self._extras: dict[int, Token] = {}
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def __getitem__(self, i: int) -> Token:
+        if i < 0:
+            i += len(self.kinds)
+        if i in self._extras:
+            return self._extras[i]
+
+        kind = _KINDS[self.kinds[i]]
+        literal_id = self.literals[i]
+        if kind == Tok.NUMBER:
+            number = self.numbers[literal_id]
+            return Token(kind, number, self.lines[i], self.cols[i], number)
+        literal = None if literal_id == _NO_LITERAL else self._strings[literal_id]
+        return Token(kind, self.source[self.starts[i]:self.ends[i]], self.lines[i], self.cols[i], literal)
+
+    def __iter__(self):
+        for i in range(len(self.kinds)):
+            yield self[i]
+
+    def kind(self, i: int) -> Tok:
+        #Token kind without materializing the Token
+        return _KINDS[self.kinds[i]]
+
+    def lexeme(self, i: int) -> str:
+        return self.source[self.starts[i]:self.ends[i]]
+
+    def append(self, kind: Tok, lexeme: object, start: int, end: int, line: int, col: int,
+               literal: object | None = None) -> None:
+        #lexeme is implied by start/end (or literal for numbers); accepted to share the Lexer's emit signature
+        if kind == Tok.NUMBER:
+            literal_id = len(self.numbers)
+            self.numbers.append(literal)
+        else:
+            literal_id = self._intern(literal)
+        self._push(kind.value, start, end, line, col, literal_id)
+
+    def append_token(self, token: Token, start: int, end: int) -> None:
+        #Keeps a fully built Token for rows the columns can not reproduce exactly
+        kind, literal = token.kind, token.literal
+        if (isinstance(kind, Tok) and token.size is None and token.signed is None and token.base is None
+                and (isinstance(literal, float) if kind == Tok.NUMBER else literal is None or isinstance(literal, str))):
+            self.append(kind, token.lexeme, start, end, token.line, token.col, literal)
+            if self[len(self) - 1] == token:
+                return
+            self._pop()
+
+        code = kind.value if isinstance(kind, Tok) else Tok.NUMBER.value
+        self._push(code, start, end, token.line, token.col, _NO_LITERAL)
+        self._extras[len(self) - 1] = token
+
+    def _push(self, code: int, start: int, end: int, line: int, col: int, literal_id: int) -> None:
+        self.kinds.append(code)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(line)
+        self.cols.append(col)
+        self.literals.append(literal_id)
+
+    def _pop(self) -> None:
+        if self.kinds[-1] == Tok.NUMBER.value:
+            self.numbers.pop()
+        for column in (self.kinds, self.starts, self.ends, self.lines, self.cols, self.literals):
+            column.pop()
+
+    def _intern(self, literal: str | None) -> int:
+        if literal is None:
+            return _NO_LITERAL
+        literal_id = self._string_ids.get(literal)
+        if literal_id is None:
+            literal_id = len(self._strings)
+            self._strings.append(literal)
+            self._string_ids[literal] = literal_id
+        return literal_id
+
+    def nbytes(self) -> int:
+        #Bytes held by the columns and the string table (excluding source, which the Lexer already owns)
+        columns = (self.kinds, self.starts, self.ends, self.lines, self.cols, self.literals, self.numbers)
+        total = sum(column.itemsize * len(column) for column in columns)
+        total += sum(sys.getsizeof(string) for string in self._strings)
+        return total
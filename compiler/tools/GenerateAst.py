@@ -26,7 +26,7 @@ is used to statically enforce types, such that they are consistent within operat
 
 HEADER = '''\
 #Created from tools/GenerateAst.py
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from abc import ABC, abstractmethod
 from interpreter import Token
 from typing import TypeVar, Generic
@@ -71,7 +71,8 @@ def define_ast(
         #out_directory: str,
         base: str,
         definitions: dict[str, list[str]],
-        dependant: bool = False):
+        dependant: bool = False,
+        hashed: bool = False):
 
     methods = ''
     nodes = []
@@ -83,6 +84,9 @@ def define_ast(
         methods += f'@abstractmethod\n    def {visitName}(self, node: "{className}") -> T_co: ...\n\n    '
         for param in params:
             field += (': '.join(param.split())) + '\n    '
+        if hashed:
+            #Structural hash slot filled in by the interning factory (interner.py)
+            field += 'struct_hash: int = field(default=0, compare=False, repr=False)\n    '
 
         nodes.append(NODE_CLASS.format(Name=className,Base=base, Fields=field, Visit_name=visitName))
 
@@ -127,4 +131,4 @@ boolean = {
 
 if __name__ == '__main__':
     #define_ast(base='Stmt', definitions=statements, dependant=True)
-    define_ast(base='Expr', definitions=definitions)
+    define_ast(base='Expr', definitions=definitions, hashed=True)
@@ -0,0 +1,68 @@
+import random
+import sys
+from time import perf_counter
+
+from ..espresso import Espresso
+from ..simplify_expression import EXACT_INPUTS, SimplifyExpression
+
+# Exact (Quine-McCluskey) vs heuristic (Espresso) minimisation of random sums of products.
+# Usage: python -m compiler.tools.bench_espresso [max exact inputs] [seed]
+
+INPUTS = (8, 10, 12, 14, 16, 20, 24, 28, 32)
+
+
+def random_cover(n_inputs: int, rng: random.Random) -> list[str]:
+    """Return a redundant cover: n_inputs // 2 random cubes with about a third of the inputs as literals,
+    each split into 4 cubes on two of its dashes."""
+    cubes = []
+    for _ in range(n_inputs // 2):
+        cube = [rng.choice("01") if rng.random() < 1 / 3 else "-" for _ in range(n_inputs)]
+        dashes = [i for i, c in enumerate(cube) if c == "-"]
+        split = rng.sample(dashes, min(2, len(dashes)))
+        for bits in range(1 << len(split)):
+            part = list(cube)
+            for k, i in enumerate(split):
+                part[i] = "1" if bits >> k & 1 else "0"
+            cubes.append("".join(part))
+    return cubes
+
+
+def equivalent(n_inputs: int, a: list[str], b: list[str]) -> bool:
+    """Return True if the covers a and b are the same function."""
+    espresso = Espresso(n_inputs)
+    a = [SimplifyExpression._to_implicant(cube) for cube in a]
+    b = [SimplifyExpression._to_implicant(cube) for cube in b]
+    return all(espresso._covers(b, cube) for cube in a) and all(espresso._covers(a, cube) for cube in b)
+
+
+def run(minimize, expression: list[str]) -> tuple[float, list[str]]:
+    start = perf_counter()
+    result = minimize(expression)
+    return perf_counter() - start, result
+
+
+def main(argv: list[str]) -> None:
+    max_exact = int(argv[0]) if len(argv) > 0 else EXACT_INPUTS
+    rng = random.Random(int(argv[1]) if len(argv) > 1 else 0)
+
+    for n_inputs in INPUTS:
+        expression = random_cover(n_inputs, rng)
+        line = f"{n_inputs:2} inputs, {len(expression):2} cubes in:"
+
+        seconds, heuristic = run(lambda cubes: SimplifyExpression.minimize(cubes, exact_inputs=0), expression)
+        if not equivalent(n_inputs, expression, heuristic):
+            raise AssertionError("Espresso changed the function.")
+        line += f"  espresso {len(heuristic):3} cubes {seconds * 1e3:9.1f} ms"
+
+        if n_inputs <= max_exact:
+            seconds, exact = run(lambda cubes: SimplifyExpression.minimize(cubes, exact_inputs=n_inputs), expression)
+            if not equivalent(n_inputs, expression, exact):
+                raise AssertionError("Quine-McCluskey changed the function.")
+            if len(exact) > len(heuristic):
+                raise AssertionError(f"The exact cover has {len(exact)} cubes, Espresso's {len(heuristic)}.")
+            line += f"  exact {len(exact):3} cubes {seconds * 1e3:9.1f} ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
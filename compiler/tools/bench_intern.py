@@ -0,0 +1,72 @@
+from dataclasses import fields
+from pathlib import Path
+import sys
+import tracemalloc
+
+from ..Expr import Expr
+from ..Stmt import Stmt
+from ..lexer import Lexer
+from ..token import Token
+from ..parser import Parser
+
+#AST size with and without hash-consing (Parser(intern=True)).
+#Usage: python -m compiler.tools.bench_intern [source file]
+
+DEFAULT_SOURCE = Path(__file__).resolve().parent.parent / 'test' / 'boolean_netlist_expressions_big.rhls'
+
+
+def count_nodes(statements: list[Stmt]) -> tuple[int, int]:
+    #Returns (tree size, distinct node objects) over every Expr reachable from statements
+    references = 0
+    distinct = set()
+    stack = [stmt for stmt in statements if stmt is not None]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Expr):
+            references += 1
+            distinct.add(id(node))
+        for f in fields(node):
+            value = getattr(node, f.name)
+            children = value if isinstance(value, list) else [value]
+            stack.extend(child for child in children if isinstance(child, (Expr, Stmt)))
+    return references, len(distinct)
+
+
+def signature(node: object) -> object:
+    #Structure of node with tokens reduced to (kind, lexeme): interned nodes keep their first occurrence's position
+    if isinstance(node, Token):
+        return (node.kind, node.lexeme)
+    if isinstance(node, list):
+        return [signature(child) for child in node]
+    if isinstance(node, (Expr, Stmt)):
+        return (type(node).__name__, *(signature(getattr(node, f.name)) for f in fields(node) if f.compare))
+    return node
+
+
+def measure(tokens, intern: bool) -> tuple[list[Stmt], int]:
+    #Parses tokens and returns the statements and the bytes retained by the AST
+    tracemalloc.start()
+    statements = Parser(tokens, engine='pratt', intern=intern).parse()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statements, held
+
+
+def main(argv: list[str]) -> None:
+    path = Path(argv[0]) if len(argv) > 0 else DEFAULT_SOURCE
+    tokens = Lexer(path.read_text(encoding='utf-8')).scan_stream()
+
+    plain, plain_bytes = measure(tokens, intern=False)
+    interned, interned_bytes = measure(tokens, intern=True)
+    if signature(plain) != signature(interned):
+        raise AssertionError('Interning changed the parsed AST.')
+
+    print(f'{path.name}: {len(plain)} statements')
+    for name, statements, held in (('plain', plain, plain_bytes), ('interned', interned, interned_bytes)):
+        references, distinct = count_nodes(statements)
+        print(f'{name:>8}: {references:7,} node references  {distinct:7,} node objects  {held / 1e3:9.1f} kB')
+    print(f'memory reduction: {plain_bytes / interned_bytes:.2f}x')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,44 @@
+from pathlib import Path
+from time import perf_counter
+import sys
+
+from ..lexer import Lexer, ENGINES
+
+#Lexing throughput benchmark: match (reference) engine vs table engine.
+#Usage: python -m compiler.tools.bench_lexer [source file] [repeats]
+
+DEFAULT_SOURCE = Path(__file__).resolve().parent.parent / 'test' / 'stress_expr_integers.txt'
+
+
+def bench(source: str, engine: str, repeats: int) -> tuple[float, int]:
+    #Returns the best time of repeats runs, and the token count.
+    best = float('inf')
+    n_tokens = 0
+    for _ in range(repeats):
+        start = perf_counter()
+        tokens = Lexer(source, engine=engine).scan_tokens()
+        best = min(best, perf_counter() - start)
+        n_tokens = len(tokens)
+    return best, n_tokens
+
+
+def main(argv: list[str]) -> None:
+    path = Path(argv[0]) if len(argv) > 0 else DEFAULT_SOURCE
+    repeats = int(argv[1]) if len(argv) > 1 else 5
+    source = path.read_text(encoding='utf-8')
+    size_mb = len(source.encode('utf-8')) / 1e6
+
+    if Lexer(source, engine='match').scan_tokens() != Lexer(source, engine='table').scan_tokens():
+        raise AssertionError('Engines produced different token streams.')
+
+    print(f'{path.name}: {size_mb:.2f} MB, best of {repeats}')
+    results = {}
+    for engine in ENGINES:
+        seconds, n_tokens = bench(source, engine, repeats)
+        results[engine] = seconds
+        print(f'{engine:>6}: {seconds * 1e3:8.1f} ms  {size_mb / seconds:6.2f} MB/s  {n_tokens / seconds:12,.0f} tokens/s')
+    print(f'speedup: {results["match"] / results["table"]:.2f}x')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,54 @@
+from pathlib import Path
+from time import perf_counter
+import sys
+
+from ..lexer import Lexer
+from ..parser import Parser, ENGINES
+
+#Expression parsing benchmark: recursive descent vs pratt engine.
+#Usage: python -m compiler.tools.bench_parser [source file] [repeats]
+#Each line of the source is parsed as one expression statement.
+
+DEFAULT_SOURCE = Path(__file__).resolve().parent.parent / 'test' / 'stress_expr_integers.txt'
+
+
+def bench(source: str, engine: str, repeats: int) -> float:
+    tokens = Lexer(source).scan_stream()
+    best = float('inf')
+    for _ in range(repeats):
+        start = perf_counter()
+        Parser(tokens, engine=engine).parse()
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def max_depth(engine: str, limit: int = 1 << 17) -> str:
+    #Deepest parenthesised expression the engine parses, doubling up to limit
+    depth = 8
+    while depth <= limit:
+        source = '(' * depth + 'a' + ')' * depth + ';'
+        try:
+            Parser(Lexer(source).scan_stream(), engine=engine).parse()
+        except RecursionError:
+            return f'{depth // 2:,}'
+        depth *= 2
+    return f'>= {depth // 2:,}'
+
+
+def main(argv: list[str]) -> None:
+    path = Path(argv[0]) if len(argv) > 0 else DEFAULT_SOURCE
+    repeats = int(argv[1]) if len(argv) > 1 else 3
+    lines = [line for line in path.read_text(encoding='utf-8').splitlines() if line.strip()]
+    source = ''.join(f'{line};\n' for line in lines)
+
+    print(f'{path.name}: {len(lines):,} expressions, best of {repeats}')
+    results = {}
+    for engine in ENGINES:
+        results[engine] = bench(source, engine, repeats)
+        print(f'{engine:>8}: {results[engine] * 1e3:8.1f} ms  {len(lines) / results[engine]:10,.0f} expr/s'
+              f'  max nesting {max_depth(engine)}')
+    print(f'speedup: {results["descent"] / results["pratt"]:.2f}x')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,53 @@
+import random
+import sys
+from time import perf_counter
+
+from ..simplify_expression import SimplifyExpression
+
+# Quine-McCluskey benchmark over random functions of 4 to 16 inputs.
+# Usage: python -m compiler.tools.bench_simplify [min inputs] [max inputs] [density] [seed]
+
+
+def random_minterms(n_inputs: int, density: float, rng: random.Random) -> list[str]:
+    return [format(i, f"0{n_inputs}b") for i in range(1 << n_inputs) if rng.random() < density]
+
+
+def check_primes(minterms: list[str], primes: list[str]) -> None:
+    """Raise if the primes do not cover exactly the minterms, or one of them could be expanded further."""
+    on = {SimplifyExpression._to_implicant(minterm)[0] for minterm in minterms}
+    terms = [SimplifyExpression._to_implicant(prime) for prime in primes]
+    if set(SimplifyExpression._expand(terms)) != on:
+        raise AssertionError("Prime implicants do not cover the function.")
+    n_inputs = len(minterms[0])
+    for value, mask in terms:
+        for i in range(n_inputs):
+            bit = 1 << i
+            if not mask & bit and set(SimplifyExpression._expand([(value & ~bit, mask | bit)])) <= on:
+                raise AssertionError(f"{SimplifyExpression._to_string((value, mask), n_inputs)} is not prime.")
+
+
+def main(argv: list[str]) -> None:
+    low = int(argv[0]) if len(argv) > 0 else 4
+    high = int(argv[1]) if len(argv) > 1 else 16
+    density = float(argv[2]) if len(argv) > 2 else 0.3
+    rng = random.Random(int(argv[3]) if len(argv) > 3 else 0)
+
+    print(f"density {density}")
+    for n_inputs in range(low, high + 1):
+        minterms = random_minterms(n_inputs, density, rng)
+        if len(minterms) == 0:
+            continue
+        start = perf_counter()
+        primes = SimplifyExpression._get_prime_implicants(minterms)
+        prime_time = perf_counter() - start
+        start = perf_counter()
+        cover = SimplifyExpression.simplify(minterms)
+        total = perf_counter() - start
+        if n_inputs <= 12:
+            check_primes(minterms, primes)
+        print(f"{n_inputs:2} inputs: {len(minterms):6,} minterms  {len(primes):7,} primes  {len(cover):6,} selected"
+              f"  primes {prime_time * 1e3:9.1f} ms  simplify {total * 1e3:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
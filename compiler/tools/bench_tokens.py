@@ -0,0 +1,44 @@
+from pathlib import Path
+from time import perf_counter
+import sys
+import tracemalloc
+
+from ..lexer import Lexer
+
+#Token storage benchmark: list[Token] vs TokenStream.
+#Usage: python -m compiler.tools.bench_tokens [source file]
+
+DEFAULT_SOURCE = Path(__file__).resolve().parent.parent / 'test' / 'stress_expr_integers.txt'
+
+
+def measure(build) -> tuple[object, int, float]:
+    #Returns the result of build(), the bytes it still holds once built, and the build time.
+    #Time is taken on a separate untraced run, tracemalloc slows allocation down considerably.
+    start = perf_counter()
+    build()
+    seconds = perf_counter() - start
+
+    tracemalloc.start()
+    result = build()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, held, seconds
+
+
+def main(argv: list[str]) -> None:
+    path = Path(argv[0]) if len(argv) > 0 else DEFAULT_SOURCE
+    source = path.read_text(encoding='utf-8')
+    source_bytes = len(source.encode('utf-8'))
+
+    tokens, list_bytes, list_seconds = measure(lambda: Lexer(source, engine='table').scan_tokens())
+    stream, stream_bytes, stream_seconds = measure(lambda: Lexer(source).scan_stream())
+    n_tokens = len(tokens)
+
+    print(f'{path.name}: {source_bytes / 1e6:.2f} MB source, {n_tokens:,} tokens')
+    print(f'list[Token]: {list_bytes / 1e6:8.2f} MB  {list_bytes / n_tokens:6.1f} B/token  {list_seconds * 1e3:8.1f} ms')
+    print(f'TokenStream: {stream_bytes / 1e6:8.2f} MB  {stream_bytes / n_tokens:6.1f} B/token  {stream_seconds * 1e3:8.1f} ms')
+    print(f'reduction:   {list_bytes / stream_bytes:.1f}x')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,72 @@
+import random
+import sys
+
+import numpy as np
+
+from ..aig import AIG, SCRIPT
+from ..netcore import NetlistCore, Operation, NO_NET
+from ..truthtable import truth_tables
+
+#AIG equivalence check: random netlists go through the optimisation passes and every mapped netlist is
+#simulated against the original on every input vector.
+#Usage: python -m compiler.tools.check_aig [netlists] [seed]
+
+N_INPUTS = 6
+N_GATES = 40
+N_OUTPUTS = 4
+OPS = ('&', '|', '^', '~')
+#Pass sequences checked, each from AIG.from_operations(...).strash()
+SCRIPTS = (('rewrite',), ('refactor',), ('balance', 'rewrite'), ('balance', 'refactor'), SCRIPT)
+
+
+def random_operations(rng: random.Random) -> tuple[list[Operation], list[str], list[str]]:
+    #Gates reading inputs and earlier gates; nets are reassigned now and then, as statements do
+    inputs = [f'i{k}' for k in range(N_INPUTS)]
+    nets = inputs[:]
+    operations = []
+    for k in range(N_GATES):
+        op = rng.choice(OPS)
+        output = rng.choice(nets[N_INPUTS:]) if k > N_OUTPUTS and rng.random() < 0.1 else f'n{k}'
+        a = rng.choice(nets)
+        operations.append(Operation(output=output, A=a, B=None if op == '~' else rng.choice(nets), operation=op))
+        if output not in nets:
+            nets.append(output)
+    return operations, inputs, rng.sample(nets[N_INPUTS:], N_OUTPUTS)
+
+
+def core_of(operations: list[Operation]) -> NetlistCore:
+    core = NetlistCore()
+    for op in operations:
+        a = core.net(op.A)
+        b = NO_NET if op.B is None else core.net(op.B)
+        core.add_gate(op.operation, a, b, core.net(op.output))
+    return core
+
+
+def equivalent(core: NetlistCore, expected: dict, inputs: list[str], outputs: list[str]) -> bool:
+    tables = truth_tables(core, inputs, outputs)
+    return all(np.array_equal(tables[name][0], expected[name][0]) for name in outputs)
+
+
+def main(argv: list[str]) -> None:
+    count = int(argv[0]) if len(argv) > 0 else 200
+    rng = random.Random(int(argv[1]) if len(argv) > 1 else 0)
+    failures = {script: 0 for script in SCRIPTS}
+    for _ in range(count):
+        operations, inputs, outputs = random_operations(rng)
+        expected = truth_tables(core_of(operations), inputs, outputs)
+        for script in SCRIPTS:
+            aig = AIG.from_operations(operations, outputs).strash()
+            for step in script:
+                aig = getattr(aig, step)()
+            if not equivalent(aig.to_core(), expected, inputs, outputs):
+                failures[script] += 1
+
+    for script, failed in failures.items():
+        print(f'{" > ".join(script):>40}: {failed} of {count} netlists differ')
+    if any(failures.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
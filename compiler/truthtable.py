@@ -0,0 +1,93 @@
+import numpy as np
+
+from .netcore import NetlistCore, GATE_CODES, NO_NET
+
+#Truth tables are built for at most this many inputs (2^n rows, one byte per row per live net)
+MAX_INPUTS = 20
+
+AND, OR, XOR, NOT, NONE = (GATE_CODES[op] for op in ('&', '|', '^', '~', ''))
+
+
+def truth_tables(core: NetlistCore, inputs: list[str], outputs: list[str],
+                 gates: list[int] | None = None) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    '''
+    Evaluates the netlist on all 2^n combinations of inputs at once and returns, for each output, the row
+    numbers of its on-set and don't-care set. Row r sets input k to bit (n - 1 - k) of r, so rows read
+    as minterms with the first input as the most significant bit.
+
+    Every net is a NumPy boolean array over the rows and every gate is one array operation, in gate order.
+    Values are three valued: a net can also be unknown on some rows (a known mask is kept next to the
+    value, None when every row is known). Gates with no lowering ('' with two inputs) and nets read before
+    anything drives them are unknown, and unknowns propagate like Kleene logic (0 & x = 0, 1 | x = 1).
+    The rows where an output is unknown are its don't cares. Arrays are dropped after their last reader.
+    gates restricts the evaluation to those gates, in order (e.g. a logic cone from NetlistCore.cones).
+    '''
+    n = len(inputs)
+    if n > MAX_INPUTS:
+        raise ValueError(f'Truth table of {n} inputs is too large (at most {MAX_INPUTS}).')
+    rows = np.arange(1 << n, dtype=np.uint32)
+    nowhere = np.zeros(1 << n, dtype=bool)
+
+    #net id -> (value, known)
+    values: dict[int, tuple[np.ndarray, np.ndarray | None]] = {}
+    for k, name in enumerate(inputs):
+        values[core.net(name)] = (((rows >> (n - 1 - k)) & 1).astype(bool), None)
+    for constant in (False, True):
+        if constant in core.ids:
+            values[core.ids[constant]] = (np.full(1 << n, constant), None)
+
+    if gates is None:
+        gates = range(core.n_gates)
+    keep = {core.ids[name] for name in outputs}
+    last_read = {}
+    for gate in gates:
+        last_read[core.gate_a[gate]] = gate
+        last_read[core.gate_b[gate]] = gate
+
+    unknown = (nowhere, nowhere)
+    for gate in gates:
+        code, a, b, out = core.gate_type[gate], core.gate_a[gate], core.gate_b[gate], core.gate_out[gate]
+        va, ka = values.get(a, unknown)
+        if b == NO_NET:
+            if code == NOT:
+                values[out] = (~va if ka is None else ~va & ka, ka)
+            else:
+                #Buffer
+                values[out] = (va, ka)
+        else:
+            vb, kb = values.get(b, unknown)
+            values[out] = _binary(code, va, ka, vb, kb, nowhere)
+
+        for net in (a, b):
+            if last_read.get(net) == gate and net not in keep and net in values and net != out:
+                del values[net]
+
+    tables = {}
+    for name in outputs:
+        value, known = values.get(core.ids[name], unknown)
+        if known is None:
+            tables[name] = (np.flatnonzero(value), np.flatnonzero(nowhere))
+        else:
+            tables[name] = (np.flatnonzero(value & known), np.flatnonzero(~known))
+    return tables
+
+
+def _binary(code: int, va, ka, vb, kb, nowhere) -> tuple[np.ndarray, np.ndarray | None]:
+    #Unknown rows always hold value False
+    if code == NONE:
+        return nowhere, nowhere
+    if ka is None and kb is None:
+        if code == AND: return va & vb, None
+        if code == OR: return va | vb, None
+        return va ^ vb, None
+
+    ka_ = np.ones_like(va) if ka is None else ka
+    kb_ = np.ones_like(vb) if kb is None else kb
+    if code == AND:
+        known = (ka_ & kb_) | (ka_ & ~va) | (kb_ & ~vb)
+        return va & vb & known, known
+    if code == OR:
+        known = (ka_ & kb_) | va | vb
+        return (va | vb) & known, known
+    known = ka_ & kb_
+    return (va ^ vb) & known, known
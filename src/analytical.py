@@ -0,0 +1,195 @@
+import numpy as np
+
+from const import Coord2
+from netlist import Netlist, Node
+
+# Weight of the first round's pull towards the targets, doubled every round after
+ANCHOR_WEIGHT = 0.01
+ROUNDS = 10
+
+
+class QuadraticPlacer:
+    """Analytical placement: gates are points, and the sum over nets of the squared wire lengths is minimised
+    by solving (L + W) x = W t_x (and likewise y) for the graph Laplacian L of the net model and a diagonal W
+    of pulls towards targets t. Two-pin nets are one edge, three-pin nets a clique of weight 1/2 per edge,
+    and larger nets a star: an extra point joined to every pin by an edge of weight p/(p-1) for p pins.
+    Edges are plain index and weight arrays (memory linear in the netlist) and L is only ever applied, as
+    bincounts over them, inside a Jacobi preconditioned conjugate gradient.
+
+    No gate is fixed. place() starts from a legal placement, with every gate pulled towards its centre
+    there; every round then legalizes the solution and pulls each gate towards its legal spot twice as hard
+    as the round before, so the points spread out while staying near what their nets want. It keeps the
+    legal placement with the least HPWL, the starting one included.
+
+    legalize() turns points into non-overlapping corners on a canvas: gates are taken in x order into
+    columns as long as the canvas, which start as close to their first gate's x as the room left for the
+    rest of the gates allows, and a new column opens when a column is full or the next gate is past it. Each
+    column is stacked in y order with every gate as close to its solved y as the rest of the column
+    allows."""
+
+    def __init__(self, netlist: Netlist, column_gap: int, row_gap: int) -> None:
+        self.column_gap = column_gap
+        self.row_gap = row_gap
+        self._nodes, pred_offsets, pred_ids = netlist.to_csr()
+        n = len(self._nodes)
+        gates = [node.gate for node in self._nodes]
+        self._widths = np.fromiter((gate.get_width() for gate in gates), dtype=np.int64, count=n)
+        self._lengths = np.fromiter((gate.get_length() for gate in gates), dtype=np.int64, count=n)
+
+        # Edges driver -> sink with the pins they join: the driver's output, the sink's k-th input for its
+        # k-th predecessor
+        sinks = np.repeat(np.arange(n, dtype=np.int64), np.diff(pred_offsets))
+        drivers = pred_ids.astype(np.int64)
+        outputs = np.array([gate.get_output() for gate in gates], dtype=np.int64).reshape(-1, 2)
+        ks = (np.arange(len(sinks)) - pred_offsets[sinks]).tolist()
+        inputs = np.array([gates[sink].get_inputs()[k % len(gates[sink].get_inputs())]
+                           for sink, k in zip(sinks.tolist(), ks)], dtype=np.int64).reshape(-1, 2)
+        self._pins = drivers, outputs, sinks, inputs
+
+        order = np.argsort(drivers, kind="stable")
+        self._build(drivers[order], sinks[order])
+        self.iterations = 0
+        self.x = self.y = None
+
+    def _build(self, drivers: np.ndarray, sinks: np.ndarray) -> None:
+        """Net model edges (i, j, w) over the points: gates, then one star per net of more than three pins."""
+        n = len(self._nodes)
+        fanout = np.bincount(drivers, minlength=n)
+        pins = fanout[drivers] + 1
+        starts = np.concatenate([[0], np.cumsum(fanout)])[:-1]
+
+        two = pins == 2
+        three = pins == 3
+        first = three & (np.arange(len(drivers)) == starts[drivers])
+        star_drivers = np.flatnonzero(fanout + 1 > 3)
+        star_of = np.full(n, -1, dtype=np.int64)
+        star_of[star_drivers] = n + np.arange(len(star_drivers))
+        star = pins > 3
+        star_pins = (fanout[star_drivers] + 1).astype(float)
+
+        self._i = np.concatenate([drivers[two], drivers[three], sinks[first],
+                                  star_of[star_drivers], star_of[drivers[star]]])
+        self._j = np.concatenate([sinks[two], sinks[three], sinks[np.flatnonzero(first) + 1],
+                                  star_drivers, sinks[star]])
+        self._w = np.concatenate([np.ones(int(two.sum())), np.full(int(three.sum()), 0.5),
+                                  np.full(int(first.sum()), 0.5), star_pins / (star_pins - 1),
+                                  pins[star] / (pins[star] - 1)])
+        self._star_drivers = star_drivers
+        self._n_points = n + len(star_drivers)
+        self._degree = np.bincount(self._i, self._w, minlength=self._n_points) \
+            + np.bincount(self._j, self._w, minlength=self._n_points)
+        self.edges = len(self._w)
+
+    def place(self, positions: dict[Node, Coord2], size: tuple[int, int], tolerance: float = 1e-5,
+              max_iterations: int = 1000) -> dict[Node, Coord2]:
+        """Return the best legal corners, no wider or longer than size, over ROUNDS rounds from positions."""
+        corners = np.array([positions[node] for node in self._nodes], dtype=np.int64).reshape(-1, 2)
+        best = self.hpwl(corners), corners
+        weight = ANCHOR_WEIGHT
+        for _ in range(ROUNDS):
+            self.solve(corners[:, 0] + self._widths / 2, corners[:, 1] + self._lengths / 2, weight, tolerance,
+                       max_iterations)
+            corners = self.legalize(size)
+            hpwl = self.hpwl(corners)
+            if hpwl < best[0] and (corners[:, 0] + self._widths).max(initial=0) <= size[0]:
+                best = hpwl, corners
+            weight *= 2
+        return dict(zip(self._nodes, map(tuple, best[1].tolist())))
+
+    def solve(self, target_x: np.ndarray, target_y: np.ndarray, weight: float, tolerance: float = 1e-5,
+              max_iterations: int = 1000) -> None:
+        """Solve for the points with every gate pulled towards (target_x, target_y) by an edge of the given
+        weight, starting from the last solution (or the targets)."""
+        n = len(self._nodes)
+        diagonal = self._degree.astype(float)
+        diagonal[:n] += weight
+        for axis, target in (("x", target_x), ("y", target_y)):
+            b = np.zeros(self._n_points)
+            b[:n] = weight * target
+            # Stars start at their driver
+            last = getattr(self, axis)
+            start = np.concatenate([target if last is None else last, np.zeros(self._n_points - n)])
+            start[n:] = start[self._star_drivers]
+            solved, iterations = self._conjugate_gradient(diagonal, b, start, tolerance, max_iterations)
+            self.iterations += iterations
+            setattr(self, axis, solved[:n])
+
+    def _apply(self, diagonal: np.ndarray, v: np.ndarray) -> np.ndarray:
+        m, i, j, w = self._n_points, self._i, self._j, self._w
+        return diagonal * v - np.bincount(i, w * v[j], minlength=m) - np.bincount(j, w * v[i], minlength=m)
+
+    def _conjugate_gradient(self, diagonal: np.ndarray, b: np.ndarray, x: np.ndarray, tolerance: float,
+                            max_iterations: int) -> tuple[np.ndarray, int]:
+        """Solve A x = b from x, preconditioned by A's diagonal, until the residual is tolerance of b's."""
+        r = b - self._apply(diagonal, x)
+        z = r / diagonal
+        p = z.copy()
+        rz = r @ z
+        limit = tolerance * np.linalg.norm(b)
+        for iteration in range(max_iterations):
+            if np.linalg.norm(r) <= limit:
+                return x, iteration
+            q = self._apply(diagonal, p)
+            alpha = rz / (p @ q)
+            x += alpha * p
+            r -= alpha * q
+            z = r / diagonal
+            rz, rz_old = r @ z, rz
+            p = z + rz / rz_old * p
+        return x, max_iterations
+
+    def legalize(self, size: tuple[int, int]) -> np.ndarray:
+        """Non-overlapping corners (a row per gate) for the solved points on a canvas of size. The length is
+        kept; columns only run past the width if the gates left cannot be packed into the room left."""
+        width, length = size
+        gap, row_gap = self.column_gap, self.row_gap
+        widths = self._widths.tolist()
+        steps = (self._lengths + row_gap).tolist()
+        capacity = length + row_gap
+        lefts = np.rint(self.x - self._widths / 2).astype(np.int64).tolist()
+        order = np.lexsort((self.y, self.x)).tolist()
+
+        # rest[k]: the width gates order[k:] need, a gap after each column, packed into full columns from
+        # the right
+        rest = [0] * (len(order) + 1)
+        used, column, after = capacity, 0, 0
+        for k in range(len(order) - 1, -1, -1):
+            i = order[k]
+            if used + steps[i] > capacity:
+                used, column, after = 0, 0, rest[k + 1]
+            used += steps[i]
+            column = max(column, widths[i])
+            rest[k] = after + column + gap
+
+        columns: list[tuple[int, list[int]]] = []
+        used, x, column = capacity, -gap, 0
+        for k, i in enumerate(order):
+            if used + steps[i] > capacity or lefts[i] >= x + column + gap and lefts[i] + rest[k] - gap <= width:
+                x = max(x + column + gap, min(lefts[i], width - rest[k] + gap))
+                columns.append((x, []))
+                used, column = 0, 0
+            columns[-1][1].append(i)
+            used += steps[i]
+            column = max(column, widths[i])
+
+        corners = np.zeros((len(self._nodes), 2), dtype=np.int64)
+        targets = np.rint(self.y - self._lengths / 2).astype(np.int64).tolist()
+        for x, column in columns:
+            column.sort(key=targets.__getitem__)
+            rest_y = sum(steps[i] for i in column) - row_gap
+            y = 0
+            for i in column:
+                y = min(max(y, targets[i]), length - rest_y)
+                corners[i] = x, y
+                y += steps[i]
+                rest_y -= steps[i]
+        return corners
+
+    def hpwl(self, corners: np.ndarray) -> int:
+        """Half-perimeter wirelength of the corners (a row per gate), measured as Placer.hpwl does."""
+        drivers, outputs, sinks, inputs = self._pins
+        out = corners + outputs
+        low, high = out.copy(), out.copy()
+        np.minimum.at(low, drivers, corners[sinks] + inputs)
+        np.maximum.at(high, drivers, corners[sinks] + inputs)
+        return int((high - low).sum())
@@ -0,0 +1,269 @@
+import random
+from math import exp
+from time import perf_counter
+
+import numpy as np
+
+from const import Coord2
+from netlist import Netlist, Node
+
+FREE = -1
+# The default start temperature, as a fraction of the spread of random moves' cost changes: low enough to
+# refine a constructive placement rather than melt it
+START = 0.03
+# Nets of up to this many pins are rescanned on a move, which costs less than updating their box from the
+# moved pins
+SCAN_PINS = 8
+
+
+class Annealer:
+    """Simulated annealing of a placement to cut half-perimeter wirelength. A move takes a random gate and a
+    random spot within rlim of it: an empty spot the gate fits at moves it there, a gate of the same size
+    there swaps places with it. Every net (a driver and the gates it drives) keeps its bounding box and how
+    many of its pins lie on each edge of the box, so a move's cost comes from the moved pins alone: a net is
+    only rescanned when a pin leaves an edge that no other pin is on. Nets of up to SCAN_PINS pins are
+    simply rescanned.
+
+    The schedule starts at temperature (by default START times the spread of the cost changes of random
+    moves), lowers it by cooling after every moves_per_temperature moves (by default ten per gate), and
+    adapts rlim to keep about 44% of moves accepted. It stops when the temperature is negligible against
+    the cost per net, or when run()'s time or move budget runs out, and keeps the best placement seen at
+    the end of a temperature. Runs with the same seed and a move budget are repeatable; a time budget stops
+    wherever the clock says."""
+
+    def __init__(self, netlist: Netlist, positions: dict[Node, Coord2], size: tuple[int, int], seed: int = 0,
+                 temperature: float | None = None, cooling: float = 0.95,
+                 moves_per_temperature: int | None = None) -> None:
+        self._rng = random.Random(seed)
+        self._nodes = list(positions)
+        index = {node: i for i, node in enumerate(self._nodes)}
+        n = len(self._nodes)
+        self._width, self._length = size
+        self._sizes = [node.gate.get_size() for node in self._nodes]
+        self._x = [positions[node][0] for node in self._nodes]
+        self._y = [positions[node][1] for node in self._nodes]
+
+        # Net i is driven by node i: its pins are (node, pin x, pin y), the output pin first
+        self._pins: list[list[tuple[int, int, int]]] = [[(i, *node.gate.get_output())]
+                                                       for i, node in enumerate(self._nodes)]
+        for i, node in enumerate(self._nodes):
+            inputs = node.gate.get_inputs()
+            for k, pred in enumerate(netlist.predecessors(node)):
+                self._pins[index[pred]].append((i, *inputs[k % len(inputs)]))
+        # Nets of up to SCAN_PINS pins a node has a pin on, and the node's pins on larger nets as
+        # (net, pin x, pin y); nets without sinks have no length and are left out
+        self._nets: list[list[int]] = [[] for _ in range(n)]
+        self._node_pins: list[list[tuple[int, int, int]]] = [[] for _ in range(n)]
+        for net, pins in enumerate(self._pins):
+            if len(pins) > SCAN_PINS:
+                for node, px, py in pins:
+                    self._node_pins[node].append((net, px, py))
+            elif len(pins) > 1:
+                for node in {node for node, _, _ in pins}:
+                    self._nets[node].append(net)
+        self._measure()
+
+        self._owner = np.full((self._width, self._length), FREE, dtype=np.int32)
+        for i in range(n):
+            self._occupy(i, i)
+
+        self.cooling = cooling
+        self.moves_per_temperature = moves_per_temperature if moves_per_temperature is not None else 10 * n
+        self.temperature = temperature if temperature is not None else self._initial_temperature()
+        self.rlim = float(max(self._width, self._length))
+        self.moves = 0
+        self.accepted = 0
+
+    def get_positions(self) -> dict[Node, Coord2]:
+        return {node: (self._x[i], self._y[i]) for i, node in enumerate(self._nodes)}
+
+    def run(self, time_budget: float | None = None, moves: int | None = None) -> dict[Node, Coord2]:
+        if not self._nodes:
+            return {}
+        deadline = perf_counter() + time_budget if time_budget is not None else None
+        last_move = self.moves + moves if moves is not None else None
+        n_nets = sum(1 for nets in self._pins if len(nets) > 1) or 1
+        best = self.hpwl, self._x[:], self._y[:]
+        while self.temperature > 0.005 * self.hpwl / n_nets:
+            accepted = self.accepted
+            for _ in range(self.moves_per_temperature):
+                if last_move is not None and self.moves >= last_move:
+                    return self._keep_best(best)
+                self._move()
+                # Checking the clock every move would cost as much as a move
+                if deadline is not None and self.moves & 255 == 0 and perf_counter() > deadline:
+                    return self._keep_best(best)
+            if self.hpwl < best[0]:
+                best = self.hpwl, self._x[:], self._y[:]
+            rate = (self.accepted - accepted) / self.moves_per_temperature
+            self.rlim = min(max(self.rlim * (0.56 + rate), 1.0), float(max(self._width, self._length)))
+            self.temperature *= self.cooling
+        return self._keep_best(best)
+
+    def _keep_best(self, best: tuple[int, list[int], list[int]]) -> dict[Node, Coord2]:
+        hpwl, xs, ys = best
+        if hpwl < self.hpwl:
+            self._x, self._y = xs, ys
+            self._measure()
+            self._owner[...] = FREE
+            for i in range(len(self._nodes)):
+                self._occupy(i, i)
+        return self.get_positions()
+
+    # Moves
+    def _move(self) -> None:
+        self.moves += 1
+        proposal = self._propose()
+        if proposal is None:
+            return
+        delta, nets, costs, boxes = self._delta(proposal)
+        if delta <= 0 or self._rng.random() < exp(-delta / self.temperature):
+            self._apply(proposal, nets, costs, boxes)
+            self.accepted += 1
+        else:
+            self._undo(proposal)
+
+    def _propose(self) -> list[tuple[int, int, int]] | None:
+        """Pick a move and make it in _x/_y only: returns [(node, old x, old y), ...] or None if the spot
+        drawn is unusable."""
+        rng = self._rng
+        a = rng.randrange(len(self._nodes))
+        r = int(self.rlim)
+        x = min(max(self._x[a] + rng.randint(-r, r), 0), self._width - 1)
+        y = min(max(self._y[a] + rng.randint(-r, r), 0), self._length - 1)
+        b = int(self._owner[x, y])
+        if b == a:
+            return None
+        if b == FREE:
+            w, l = self._sizes[a]
+            if x + w > self._width or y + l > self._length:
+                return None
+            area = self._owner[x:x + w, y:y + l]
+            if not ((area == FREE) | (area == a)).all():
+                return None
+            proposal = [(a, self._x[a], self._y[a])]
+            self._x[a], self._y[a] = x, y
+            return proposal
+        if self._sizes[b] != self._sizes[a]:
+            return None
+        proposal = [(a, self._x[a], self._y[a]), (b, self._x[b], self._y[b])]
+        self._x[a], self._y[a], self._x[b], self._y[b] = self._x[b], self._y[b], self._x[a], self._y[a]
+        return proposal
+
+    def _delta(self, proposal: list[tuple[int, int, int]]) \
+            -> tuple[int, list[int], list[int], dict[int, list[int]]]:
+        """The cost change of a proposed move, the nets it changes with their new costs, and the new boxes of
+        those of more than SCAN_PINS pins."""
+        nets = list({net for node, _, _ in proposal for net in self._nets[node]})
+        costs = [self._net_cost(net) for net in nets]
+        # net -> [(old pin x, old pin y, new pin x, new pin y), ...]
+        moved: dict[int, list[tuple[int, int, int, int]]] = {}
+        for node, old_x, old_y in proposal:
+            x, y = self._x[node], self._y[node]
+            for net, px, py in self._node_pins[node]:
+                moved.setdefault(net, []).append((old_x + px, old_y + py, x + px, y + py))
+        boxes = {net: self._moved_box(net, pins) for net, pins in moved.items()}
+        nets.extend(boxes)
+        costs.extend(map(_cost, boxes.values()))
+        return sum(costs) - sum(self._cost[net] for net in nets), nets, costs, boxes
+
+    def _apply(self, proposal: list[tuple[int, int, int]], nets: list[int], costs: list[int],
+               boxes: dict[int, list[int]]) -> None:
+        for net, cost in zip(nets, costs):
+            self.hpwl += cost - self._cost[net]
+            self._cost[net] = cost
+        self._boxes.update(boxes)
+        moved = [node for node, _, _ in proposal]
+        for node, x, y in proposal:
+            w, l = self._sizes[node]
+            self._owner[x:x + w, y:y + l] = FREE
+        for node in moved:
+            self._occupy(node, node)
+
+    def _undo(self, proposal: list[tuple[int, int, int]]) -> None:
+        for node, x, y in proposal:
+            self._x[node], self._y[node] = x, y
+
+    def _occupy(self, node: int, owner: int) -> None:
+        w, l = self._sizes[node]
+        self._owner[self._x[node]:self._x[node] + w, self._y[node]:self._y[node] + l] = owner
+
+    # Cost
+    def _measure(self) -> None:
+        # Per net of more than SCAN_PINS pins
+        # [low x, pins on it, high x, pins on it, low y, pins on it, high y, pins on it]
+        self._boxes = {net: self._box(net) for net, pins in enumerate(self._pins) if len(pins) > SCAN_PINS}
+        self._cost = [self._net_cost(net) for net in range(len(self._pins))]
+        self.hpwl = sum(self._cost)
+
+    def _net_cost(self, net: int) -> int:
+        xs, ys = self._x, self._y
+        node, px, py = self._pins[net][0]
+        low_x = high_x = xs[node] + px
+        low_y = high_y = ys[node] + py
+        for node, px, py in self._pins[net]:
+            x, y = xs[node] + px, ys[node] + py
+            if x < low_x:
+                low_x = x
+            elif x > high_x:
+                high_x = x
+            if y < low_y:
+                low_y = y
+            elif y > high_y:
+                high_y = y
+        return high_x - low_x + high_y - low_y
+
+    def _box(self, net: int) -> list[int]:
+        """The bounding box of the net's pins, scanning them all."""
+        xs, ys = self._x, self._y
+        px = [xs[node] + pin_x for node, pin_x, _ in self._pins[net]]
+        py = [ys[node] + pin_y for node, _, pin_y in self._pins[net]]
+        low_x, high_x, low_y, high_y = min(px), max(px), min(py), max(py)
+        return [low_x, px.count(low_x), high_x, px.count(high_x), low_y, py.count(low_y), high_y, py.count(high_y)]
+
+    def _moved_box(self, net: int, pins: list[tuple[int, int, int, int]]) -> list[int]:
+        """The net's box once pins move from (old x, old y) to (new x, new y): the pins are taken off the edges
+        they were on, then put back where they went. An edge left with no pin on it has moved inwards to
+        somewhere unknown, and only then is the net rescanned."""
+        low_x, n_low_x, high_x, n_high_x, low_y, n_low_y, high_y, n_high_y = self._boxes[net]
+        for old_x, old_y, _, _ in pins:
+            n_low_x -= old_x == low_x
+            n_high_x -= old_x == high_x
+            n_low_y -= old_y == low_y
+            n_high_y -= old_y == high_y
+        for _, _, x, y in pins:
+            if x < low_x:
+                low_x, n_low_x = x, 1
+            elif x == low_x:
+                n_low_x += 1
+            if x > high_x:
+                high_x, n_high_x = x, 1
+            elif x == high_x:
+                n_high_x += 1
+            if y < low_y:
+                low_y, n_low_y = y, 1
+            elif y == low_y:
+                n_low_y += 1
+            if y > high_y:
+                high_y, n_high_y = y, 1
+            elif y == high_y:
+                n_high_y += 1
+        if not (n_low_x and n_high_x and n_low_y and n_high_y):
+            return self._box(net)
+        return [low_x, n_low_x, high_x, n_high_x, low_y, n_low_y, high_y, n_high_y]
+
+    def _initial_temperature(self) -> float:
+        """START times the standard deviation of the cost change of random moves (none is kept)."""
+        deltas = []
+        self.rlim = float(max(self._width, self._length))
+        for _ in range(min(len(self._nodes), 1000)):
+            proposal = self._propose()
+            if proposal is not None:
+                deltas.append(self._delta(proposal)[0])
+                self._undo(proposal)
+        return START * float(np.std(deltas)) if deltas else 1.0
+
+
+def _cost(box: list[int]) -> int:
+    # Half the perimeter of a net's box
+    return box[2] - box[0] + box[6] - box[4]
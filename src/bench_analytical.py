@@ -0,0 +1,36 @@
+import random
+import sys
+from time import perf_counter
+
+from analytical import ROUNDS, QuadraticPlacer
+from bench_placer import random_netlist
+from placer import COLUMN_GAP, ROW_GAP, Placer
+
+# Analytical placement of a large random netlist, from and against its column placement.
+# Usage (from src): python bench_analytical.py [gates] [seed]
+
+
+def main(argv: list[str]) -> None:
+    n = int(argv[0]) if len(argv) > 0 else 100_000
+    netlist = random_netlist(n, random.Random(int(argv[1]) if len(argv) > 1 else 0))
+
+    start = perf_counter()
+    placer = Placer(netlist)
+    placer.place_gates()
+    size = placer.get_canvas().get_size()
+    print(f"{n:,} gates, columns:    placed {perf_counter() - start:6.2f} s  canvas {size[0]} x {size[1]}  "
+          f"HPWL {placer.hpwl():,}")
+
+    start = perf_counter()
+    quadratic = QuadraticPlacer(netlist, COLUMN_GAP, ROW_GAP)
+    built = perf_counter()
+    positions = quadratic.place(placer.get_positions(), size)
+    done = perf_counter()
+    print(f"{n:,} gates, analytical: placed {done - start:6.2f} s  canvas {size[0]} x {size[1]}  "
+          f"HPWL {placer.hpwl(positions):,}")
+    print(f"{'':>{len(f'{n:,}')}}        net model of {quadratic.edges:,} edges built in {built - start:.2f} s, "
+          f"{quadratic.iterations:,} conjugate gradient iterations over {ROUNDS} rounds")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
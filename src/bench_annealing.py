@@ -0,0 +1,36 @@
+import random
+import sys
+from time import perf_counter
+
+from annealing import Annealer
+from bench_placer import random_netlist
+from placer import Placer
+
+# Annealing refinement of column placements of random netlists, within a time budget per netlist.
+# Usage (from src): python bench_annealing.py [seconds] [seed]
+
+SIZES = (1000, 3000, 10_000)
+
+
+def main(argv: list[str]) -> None:
+    seconds = float(argv[0]) if len(argv) > 0 else 10.0
+    seed = int(argv[1]) if len(argv) > 1 else 0
+
+    for n in SIZES:
+        netlist = random_netlist(n, random.Random(seed))
+        placer = Placer(netlist)
+        placer.place_gates()
+        constructive = placer.hpwl()
+
+        start = perf_counter()
+        annealer = Annealer(netlist, placer.get_positions(), placer.get_canvas().get_size(), seed=seed)
+        refined = placer.hpwl(annealer.run(time_budget=seconds))
+        elapsed = perf_counter() - start
+        if refined != annealer.hpwl:
+            raise AssertionError("Incremental HPWL drifted from the placement's.")
+        print(f"{n:>6,} gates: HPWL {constructive:9,} -> {refined:9,} ({refined / constructive - 1:+.1%})  "
+              f"{annealer.moves / elapsed:8,.0f} moves/s over {elapsed:.1f} s")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
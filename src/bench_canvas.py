@@ -0,0 +1,65 @@
+import random
+import sys
+from time import perf_counter
+
+from canvas import EMPTY, Canvas
+from gates import AND, NOT, OR, Repeater
+
+# Filling a 512 x 512 canvas with gates at random valid corners, against the cell by cell scan Canvas used to do.
+# Usage (from src): python bench_canvas.py [gates] [seed]
+
+SIZE = 512
+SCANS = 3
+
+
+def cell_by_cell(canvas: Canvas, width: int, length: int) -> list[tuple[int, int]]:
+    """The old _get_valid_placements: every corner, every spot of the footprint, on a list of lists."""
+    grid = canvas._grid.tolist()
+    valid = []
+    for x in range(SIZE - width + 1):
+        for y in range(SIZE - length + 1):
+            if all(grid[x + i][y + j] == EMPTY for i in range(width) for j in range(length)):
+                valid.append((x, y))
+    return valid
+
+
+def main(argv: list[str]) -> None:
+    n = int(argv[0]) if len(argv) > 0 else 5000
+    rng = random.Random(int(argv[1]) if len(argv) > 1 else 0)
+    kinds = (AND, OR, NOT, Repeater)
+
+    canvas = Canvas(SIZE, SIZE)
+    scan = place = check = 0.0
+    placed_gates = 0
+    for _ in range(n):
+        gate = rng.choice(kinds)()
+        start = perf_counter()
+        valid = canvas._get_valid_placements(gate)
+        scanned = perf_counter()
+        if not len(valid):
+            break
+        x, y = valid[rng.randrange(len(valid))].tolist()
+        canvas[x, y] = gate
+        placed = perf_counter()
+        for _ in range(100):
+            canvas._is_valid_placement((rng.randrange(SIZE), rng.randrange(SIZE)), gate)
+        checked = perf_counter()
+        scan += scanned - start
+        place += placed - scanned
+        check += checked - placed
+        placed_gates += 1
+    print(f"{placed_gates:,} gates on {SIZE} x {SIZE}: valid corners {1e3 * scan / placed_gates:7.3f} ms  "
+          f"place {1e6 * place / placed_gates:6.1f} us  is valid {1e6 * check / placed_gates / 100:5.2f} us")
+
+    gate = AND()
+    start = perf_counter()
+    for _ in range(SCANS):
+        slow = cell_by_cell(canvas, *gate.get_size())
+    seconds = (perf_counter() - start) / SCANS
+    if slow != list(map(tuple, canvas._get_valid_placements(gate).tolist())):
+        raise AssertionError("Summed-area table disagrees with the cell by cell scan.")
+    print(f"{'':>31}cell by cell valid corners {1e3 * seconds:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,43 @@
+import os
+import random
+import sys
+from time import perf_counter
+
+from bench_placer import random_netlist
+from placer import Placer
+
+# One annealing run against one per core in the same wall-clock budget, then a replay of the winner.
+# Usage (from src): python bench_multistart.py [gates] [seconds] [starts]
+
+
+def main(argv: list[str]) -> None:
+    n = int(argv[0]) if len(argv) > 0 else 3000
+    seconds = float(argv[1]) if len(argv) > 1 else 10.0
+    starts = int(argv[2]) if len(argv) > 2 else os.cpu_count() or 1
+    netlist = random_netlist(n, random.Random(0))
+
+    placer = Placer(netlist)
+    placer.place_gates()
+    start = perf_counter()
+    placer.refine(time_budget=seconds)
+    print(f"{n:,} gates, 1 start: HPWL {placer.hpwl():,} in {perf_counter() - start:.1f} s")
+
+    placer = Placer(netlist)
+    placer.place_gates()
+    start = perf_counter()
+    runs = placer.refine_parallel(starts, time_budget=seconds)
+    elapsed = perf_counter() - start
+    best = runs[0]
+    print(f"{n:,} gates, {starts} starts: HPWL {best.hpwl:,} (seed {best.seed}, {best.moves:,} moves, "
+          f"{best.delay} ticks) in {elapsed:.1f} s; worst start {runs[-1].hpwl:,}")
+
+    replay = Placer(netlist)
+    replay.place_gates()
+    replay.refine(seed=best.seed, moves=best.moves)
+    if replay.get_positions() != best.positions:
+        raise AssertionError("Replaying the winning seed gave another placement.")
+    print(f"{'':>{len(f'{n:,}')}}        replayed seed {best.seed}: HPWL {replay.hpwl():,}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,56 @@
+import sys
+from time import perf_counter
+
+import numpy as np
+
+from netlist import Netlist
+
+# Levelisation of random gate graphs built straight as CSR arrays, then buffer insertion as a stream of edits.
+# Usage (from src): python bench_netlist.py [gates] [seed]
+
+N_INPUTS = 1000
+BUFFERS = 1000
+
+
+def random_dag(n: int, rng: np.random.Generator, window: int) -> tuple[np.ndarray, np.ndarray]:
+    """Return predecessor CSR arrays of n nodes: N_INPUTS inputs, then two input gates reading nodes among the
+    window nodes before them (a small window gives deep, chain-like graphs)."""
+    counts = np.full(n, 2, dtype=np.int64)
+    counts[:N_INPUTS] = 0
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    gates = np.repeat(np.arange(n), counts)
+    back = rng.integers(1, window + 1, size=len(gates))
+    return offsets, np.maximum(gates - back, 0).astype(np.int32)
+
+
+def main(argv: list[str]) -> None:
+    n = int(argv[0]) if len(argv) > 0 else 1_000_000
+    rng = np.random.default_rng(int(argv[1]) if len(argv) > 1 else 0)
+
+    for window in (n, 10_000, 100):
+        offsets, preds = random_dag(n, rng, window)
+        start = perf_counter()
+        netlist = Netlist.from_csr(range(n), offsets, preds)
+        built = perf_counter()
+        levels = netlist.levels()
+        done = perf_counter()
+        print(f"{n:,} gates, window {window:>9,}: succ graph {1000 * (built - start):7.1f} ms  "
+              f"levels {1000 * (done - built):7.1f} ms  depth {levels.max():,}")
+
+        # Buffer random edges: one node and three edge edits each, levels pushed down the fan-out
+        gates = rng.integers(N_INPUTS, n, size=BUFFERS)
+        netlist.level(0)
+        start = perf_counter()
+        for buffer, gate in enumerate(gates.tolist(), start=n):
+            pred = netlist.predecessors(gate)[0]
+            netlist.add_node(buffer, [pred])
+            netlist.remove_edge(pred, gate)
+            netlist.add_edge(buffer, gate)
+        done = perf_counter()
+        print(f"{'':>36}{BUFFERS:,} buffers inserted: {1e6 * (done - start) / BUFFERS:7.1f} us each  "
+              f"depth {netlist.levels().max():,}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,42 @@
+import random
+import sys
+from time import perf_counter
+
+from canvas import Canvas
+from gates import AND, NOT, OR, Repeater
+from packing import HEURISTICS, Packer
+
+# Packing random gates on a 512 x 512 canvas with each free-rectangle heuristic, against taking the first
+# valid corner of a Canvas scan.
+# Usage (from src): python bench_packing.py [gates] [seed]
+
+SIZE = 512
+
+
+def main(argv: list[str]) -> None:
+    n = int(argv[0]) if len(argv) > 0 else 5000
+    rng = random.Random(int(argv[1]) if len(argv) > 1 else 0)
+    kinds = (AND, OR, NOT, Repeater)
+    gates = [rng.choice(kinds)() for _ in range(n)]
+
+    for name in HEURISTICS:
+        canvas = Canvas(SIZE, SIZE)
+        packer = Packer(canvas, name)
+        start = perf_counter()
+        for gate in gates:
+            packer.place(gate)
+        seconds = perf_counter() - start
+        print(f"{name:>20}: {n:,} gates {1e6 * seconds / n:7.1f} us each  "
+              f"{len(packer._free):5,} free rectangles")
+
+    canvas = Canvas(SIZE, SIZE)
+    start = perf_counter()
+    for gate in gates:
+        x, y = canvas._get_valid_placements(gate)[0].tolist()
+        canvas[x, y] = gate
+    seconds = perf_counter() - start
+    print(f"{'canvas scan':>20}: {n:,} gates {1e6 * seconds / n:7.1f} us each")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
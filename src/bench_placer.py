@@ -0,0 +1,50 @@
+import random
+import sys
+from time import perf_counter
+
+from gates import AND, NOT, OR
+from netlist import Netlist, Node
+from placer import Placer
+
+# Column placement of random netlists, with and without barycentre ordering.
+# Usage (from src): python bench_placer.py [gates] [seed]
+
+N_INPUTS = 200
+WINDOW = 500
+
+
+def random_netlist(n: int, rng: random.Random) -> Netlist:
+    """N_INPUTS inputs, then gates reading one or two of the WINDOW nodes before them."""
+    nodes = []
+    graph = {}
+    for i in range(n):
+        if i < N_INPUTS:
+            node, preds = Node(f"in{i}", NOT()), []
+        else:
+            gate = rng.choice((AND, OR, NOT))()
+            preds = rng.sample(nodes[max(0, i - WINDOW):], len(gate.get_inputs()))
+            node = Node(f"g{i}", gate)
+        nodes.append(node)
+        graph[node] = preds
+    return Netlist(graph)
+
+
+def main(argv: list[str]) -> None:
+    n = int(argv[0]) if len(argv) > 0 else 10_000
+    rng = random.Random(int(argv[1]) if len(argv) > 1 else 0)
+    netlist = random_netlist(n, rng)
+
+    for barycentre in (False, True):
+        placer = Placer(netlist, barycentre)
+        start = perf_counter()
+        placer.place_gates()
+        placed = perf_counter()
+        hpwl = placer.hpwl()
+        done = perf_counter()
+        width, length = placer.get_canvas().get_size()
+        print(f"{n:,} gates, barycentre {str(barycentre):>5}: placed {placed - start:6.2f} s  "
+              f"canvas {width} x {length}  HPWL {hpwl:,} ({1e3 * (done - placed):.0f} ms)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,4 +1,7 @@
 from enum import Enum
+
+import numpy as np
+
 from const import CanvasPlacingError, Coord2
 from gates import AND, OR, Gate
 
@@ -10,20 +13,66 @@ class Spot(Enum):
     OUTPUT = "x"
 
 
+# Spots are stored in the grid as their position in Spot
+SPOTS = list(Spot)
+EMPTY, FILLED, INPUT, OUTPUT = range(len(SPOTS))
+
+REBUILD_AFTER = 4
+
+
 class Canvas:
+    """Grid of width x length spots, stored as a uint8 array of Spot codes. Next to it a summed-area table
+    counts the filled spots: _area[x, y] is the number in grid[:x, :y], so the spots of any rectangle are
+    counted with four lookups. Placed footprints are added to the table when it is next read, each from the
+    spots it newly filled, or by rebuilding it when more than REBUILD_AFTER are waiting."""
 
     def __init__(self, width: int, length: int) -> None:
         self._width = width
         self._length = length
-        self._grid = [[Spot.EMPTY] * length for _ in range(width)]
+        self._grid = np.full((width, length), EMPTY, dtype=np.uint8)
+        self._area = np.zeros((width + 1, length + 1), dtype=np.int32)
+        # (x, y, width, length, summed-area table of the spots newly filled or None if all of them were)
+        self._pending: list[tuple[int, int, int, int, np.ndarray | None]] = []
         self._gates = {}
 
     def __str__(self) -> str:
-        return "\n" + "\n".join([" ".join([item.value for item in row]) for row in self._grid[::-1]])
+        chars = np.array([spot.value for spot in SPOTS])[self._grid]
+        return "\n" + "\n".join([" ".join(row) for row in chars[::-1].tolist()])
 
-    def __getitem__(self, index: Coord2) -> str:
+    def __getitem__(self, index: Coord2) -> Spot:
         x, y = index
-        return self._grid[x][y]
+        return SPOTS[self._grid[x, y]]
+
+    def get_size(self) -> tuple[int, int]:
+        return self._width, self._length
+
+    def get_gates(self) -> dict[Coord2, Gate]:
+        return self._gates
+
+    def _summed_area(self) -> np.ndarray:
+        area = self._area
+        if len(self._pending) > REBUILD_AFTER:
+            np.cumsum(np.cumsum(self._grid != EMPTY, axis=0, dtype=np.int32), axis=1, out=area[1:, 1:])
+        else:
+            for x, y, g_w, g_l, new in self._pending:
+                if new is None:
+                    # The new spots in grid[:i, :j] are the overlap of the footprint with that corner, a
+                    # product of the overlaps along each axis
+                    along_x = np.minimum(np.arange(1, self._width - x + 1, dtype=np.int32), g_w)
+                    along_y = np.minimum(np.arange(1, self._length - y + 1, dtype=np.int32), g_l)
+                    area[x + 1:, y + 1:] += along_x[:, None] * along_y
+                else:
+                    # Those of the footprint's own table, at the corner clamped to the footprint
+                    along_x = np.minimum(np.arange(self._width - x), g_w - 1)
+                    along_y = np.minimum(np.arange(self._length - y), g_l - 1)
+                    area[x + 1:, y + 1:] += new[along_x[:, None], along_y]
+        self._pending.clear()
+        return area
+
+    def _filled(self, x: int, y: int, width: int, length: int) -> int:
+        """Return the number of filled spots in the rectangle at (x, y)."""
+        area = self._summed_area()
+        return int(area[x + width, y + length] - area[x, y + length] - area[x + width, y] + area[x, y])
 
     def _is_valid_placement(self, index: Coord2, gate: Gate) -> bool:
         x, y = index
@@ -31,49 +80,45 @@ class Canvas:
 
         if min(x, y) < 0 or (x + g_w > self._width) or (y + g_l) > self._length:
             return False
-
-        for i in range(g_w):
-            for j in range(g_l):
-                new_x, new_y = x + i, y + j
-                if self[new_x, new_y] != Spot.EMPTY:
-                    return False
-        return True
+        return self._filled(x, y, g_w, g_l) == 0
 
     def __setitem__(self, index: Coord2, gate: Gate) -> None:
         """Assumes the gate can be placed here."""
         x, y = index
         g_w, g_l = gate.get_size()
 
-        for i in range(g_w):
-            for j in range(g_l):
-                new_x, new_y = x + i, y + j
-                if (i, j) in gate.get_inputs():
-                    spot_type = Spot.INPUT
-                elif (i, j) == gate.get_output():
-                    spot_type = Spot.OUTPUT
-                else:
-                    spot_type = Spot.FILLED
-                self._grid[new_x][new_y] = spot_type
-
+        footprint = self._grid[x:x + g_w, y:y + g_l]
+        # Only spots that were empty are new to the summed-area table, so a gate overlapping another adds
+        # what a rebuild would count
+        empty = footprint == EMPTY
+        new = None if empty.all() else np.cumsum(np.cumsum(empty, axis=0, dtype=np.int32), axis=1)
+        footprint[...] = FILLED
+        out_x, out_y = gate.get_output()
+        footprint[out_x, out_y] = OUTPUT
+        in_x, in_y = zip(*gate.get_inputs())
+        footprint[in_x, in_y] = INPUT
+
+        self._pending.append((x, y, *footprint.shape, new))
         self._gates[index] = gate
 
-    def _get_valid_placements(self, gate: Gate) -> list[Coord2]:
-        valid = []
-
-        for x in range(self._width):
-            for y in range(self._length):
-                coord = x, y
-                if self._is_valid_placement(coord, gate):
-                    valid.append(coord)
-        return valid
-
-
-canvas = Canvas(10, 10)
-
-print(canvas)
-canvas[1, 2] = OR()
-print(canvas)
-canvas[7, 7] = OR()
-print(canvas)
-canvas[4, 4] = AND()
-print(canvas)
+    def _get_valid_placements(self, gate: Gate) -> np.ndarray:
+        """Return every (x, y) corner the gate fits at as rows of an array, in x then y order: filled-spot
+        counts of every g_w x g_l window at once, from shifted views of the summed-area table."""
+        g_w, g_l = gate.get_size()
+        if g_w > self._width or g_l > self._length:
+            return np.empty((0, 2), dtype=np.intp)
+        area = self._summed_area()
+        filled = area[g_w:, g_l:] - area[:-g_w, g_l:] - area[g_w:, :-g_l] + area[:-g_w, :-g_l]
+        return np.argwhere(filled == 0)
+
+
+if __name__ == "__main__":
+    canvas = Canvas(10, 10)
+
+    print(canvas)
+    canvas[1, 2] = OR()
+    print(canvas)
+    canvas[7, 7] = OR()
+    print(canvas)
+    canvas[4, 4] = AND()
+    print(canvas)
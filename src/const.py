@@ -40,3 +40,9 @@ class Block:
     E_REPEATER = BlockState("minecraft:repeater", facing="west")
     S_REPEATER = BlockState("minecraft:repeater", facing="north")
     W_REPEATER = BlockState("minecraft:repeater", facing="east")
+
+
+class NetlistCycleError(Exception):
+    def __init__(self, cycle: list) -> None:
+        super().__init__(f"Netlist has a combinational cycle: {' -> '.join(map(repr, cycle + cycle[:1]))}")
+        self.cycle = cycle
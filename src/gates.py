@@ -3,11 +3,12 @@ from region_wrappper import RegionWrapper
 
 
 class Gate:
-    def __init__(self, width: int, length: int, inputs: list[Coord2], output: Coord2) -> None:
+    def __init__(self, width: int, length: int, inputs: list[Coord2], output: Coord2, delay: int) -> None:
         self._width = width
         self._length = length
         self._inputs = inputs
         self._output = output
+        self._delay = delay
 
     def get_width(self) -> int:
         return self._width
@@ -24,21 +25,46 @@ class Gate:
     def get_output(self) -> Coord2:
         return self._output
 
+    def get_delay(self) -> int:
+        """Redstone ticks from an input changing to the output following it."""
+        return self._delay
+
     def build(self) -> RegionWrapper:
         raise NotImplementedError
 
 
 class OR(Gate):
+    # Inputs join on dust behind a repeater
     def __init__(self) -> None:
-        super().__init__(3, 3, [(0, 0), (2, 0)], (1, 2))
+        super().__init__(3, 3, [(0, 0), (2, 0)], (1, 2), 1)
 
     def build(self):
         pass
 
 
 class AND(Gate):
+    # Inverted inputs into a NOR torch: two torches deep
+    def __init__(self) -> None:
+        super().__init__(3, 4, [(0, 0), (2, 0)], (1, 3), 2)
+
+    def build(self):
+        pass
+
+
+class NOT(Gate):
+    # One torch
     def __init__(self) -> None:
-        super().__init__(3, 4, [(0, 0), (2, 0)], (1, 3))
+        super().__init__(1, 2, [(0, 0)], (0, 1), 1)
+
+    def build(self):
+        pass
+
+
+class Repeater(Gate):
+    def __init__(self, delay: int = 1) -> None:
+        if not 1 <= delay <= 4:
+            raise ValueError("A repeater delays 1 to 4 ticks.")
+        super().__init__(1, 2, [(0, 0)], (0, 1), delay)
 
     def build(self):
         pass
@@ -0,0 +1,85 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from annealing import Annealer
+from const import Coord2
+from gates import Gate
+from netlist import Netlist, Node
+from timing import Timing
+
+
+@dataclass(slots=True)
+class Start:
+    # One annealing run: Placer.refine(seed=seed, moves=moves) from the same placement repeats it exactly
+    seed: int
+    moves: int
+    hpwl: int
+    delay: int
+    positions: dict[Node, Coord2]
+
+
+def multi_start(netlist: Netlist, positions: dict[Node, Coord2], size: tuple[int, int], starts: int,
+                jobs: int = 0, time_budget: float | None = None, moves: int | None = None, seed: int = 0,
+                timing: bool = False, **schedule) -> list[Start]:
+    """Anneal the placement from starts seeds (seed, seed + 1, ...) in a pool of jobs processes (0 for one
+    per core) and return the runs, best first: by HPWL then critical delay, or by delay first with timing.
+
+    Workers get the netlist once, when they start, as CSR arrays of node ids with a code per node for its
+    gate (one pickled prototype per kind of gate); each run then only sends its seed and gets back the
+    corners as arrays."""
+    jobs = jobs or os.cpu_count() or 1
+    nodes, pred_offsets, pred_ids = netlist.to_csr()
+    kinds: dict[tuple[type, int], int] = {}
+    prototypes: list[Gate] = []
+    codes = np.empty(len(nodes), dtype=np.int32)
+    for i, node in enumerate(nodes):
+        kind = type(node.gate), node.gate.get_delay()
+        if kind not in kinds:
+            kinds[kind] = len(prototypes)
+            prototypes.append(node.gate)
+        codes[i] = kinds[kind]
+    # Annealer numbers gates in the order of positions, so the workers' placements keep it for the runs
+    # to be the ones refine() makes
+    index = {node: i for i, node in enumerate(nodes)}
+    order = np.array([index[node] for node in positions], dtype=np.int32)
+    corners = np.array(list(positions.values()), dtype=np.int32).reshape(-1, 2)
+    shared = (prototypes, codes, pred_offsets, pred_ids, order, corners, size, time_budget, moves, schedule)
+
+    seeds = range(seed, seed + starts)
+    if jobs > 1 and starts > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, starts), initializer=_share, initargs=shared) as pool:
+            results = list(pool.map(_start, seeds))
+    else:
+        _share(*shared)
+        results = [_start(start) for start in seeds]
+
+    placed = list(positions)
+    runs = [Start(run_seed, run_moves, hpwl, delay, dict(zip(placed, map(tuple, corners.tolist()))))
+            for run_seed, run_moves, hpwl, delay, corners in results]
+    runs.sort(key=lambda run: (run.delay, run.hpwl, run.seed) if timing else (run.hpwl, run.delay, run.seed))
+    return runs
+
+
+# Set in each worker by _share
+_shared = None
+
+
+def _share(prototypes, codes, pred_offsets, pred_ids, order, corners, size, time_budget, moves, schedule) -> None:
+    global _shared
+    nodes = [Node(str(i), prototypes[code]) for i, code in enumerate(codes.tolist())]
+    netlist = Netlist.from_csr(nodes, pred_offsets, pred_ids)
+    positions = {nodes[i]: corner for i, corner in zip(order.tolist(), map(tuple, corners.tolist()))}
+    _shared = netlist, positions, size, time_budget, moves, schedule
+
+
+def _start(seed: int) -> tuple[int, int, int, int, np.ndarray]:
+    # Runs in pool workers: seed -> (seed, moves, hpwl, critical delay, corners)
+    netlist, positions, size, time_budget, moves, schedule = _shared
+    annealer = Annealer(netlist, positions, size, seed=seed, **schedule)
+    placed = annealer.run(time_budget, moves)
+    delay = Timing(netlist, placed).get_delay()
+    corners = np.array([placed[node] for node in positions], dtype=np.int32).reshape(-1, 2)
+    return seed, annealer.moves, annealer.hpwl, delay, corners
@@ -1,3 +1,8 @@
+import heapq
+
+import numpy as np
+
+from const import NetlistCycleError
 from gates import AND, OR, Gate
 
 
@@ -12,66 +17,343 @@ class Node:
 
 Graph = dict[Node, list[Node]]
 
+# Waves of Kahn's algorithm smaller than SMALL_WAVE nodes are walked node by node instead of with array
+# operations, until one is larger than LARGE_WAVE
+SMALL_WAVE = 64
+LARGE_WAVE = 4096
+
 
 class Netlist:
+    """Gate graph stored as CSR arrays of node ids: the predecessors of node i are
+    pred_ids[pred_offsets[i]:pred_offsets[i + 1]], and successors likewise. Nodes are numbered by their
+    position in nodes; the Node objects are only needed to translate results back.
+
+    The first edit (add_node, remove_node, add_edge, remove_edge, replace_node) turns the CSR arrays into
+    lists of ids per node and a level per node, which later edits keep up to date by revisiting only the
+    fan-out whose level changes. Ids are never reused: a removed node leaves an empty row with level -1."""
 
     def __init__(self, pred_graph: Graph):
-        self._pred_graph = pred_graph
-        self._succ_graph = self._create_succ_graph(pred_graph)
+        self._nodes = list(pred_graph)
+        self._index = {node: i for i, node in enumerate(self._nodes)}
+        counts = np.fromiter((len(preds) for preds in pred_graph.values()), dtype=np.int64, count=len(self._nodes))
+        self._pred_offsets = np.zeros(len(self._nodes) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self._pred_offsets[1:])
+        index = self._index
+        self._pred_ids = np.fromiter((index[pred] for preds in pred_graph.values() for pred in preds),
+                                     dtype=np.int32, count=int(self._pred_offsets[-1]))
+        self._succ_offsets, self._succ_ids = self._create_succ_graph(self._pred_offsets, self._pred_ids)
+        self._preds = self._succs = self._level = None
+        self._live = len(self._nodes)
+
+    @classmethod
+    def from_csr(cls, nodes: list[Node], pred_offsets: np.ndarray, pred_ids: np.ndarray) -> "Netlist":
+        """Build a netlist straight from predecessor CSR arrays, without a dict of lists."""
+        netlist = cls.__new__(cls)
+        netlist._nodes = list(nodes)
+        netlist._index = None
+        netlist._pred_offsets = np.asarray(pred_offsets, dtype=np.int64)
+        netlist._pred_ids = np.asarray(pred_ids, dtype=np.int32)
+        netlist._succ_offsets, netlist._succ_ids = cls._create_succ_graph(netlist._pred_offsets, netlist._pred_ids)
+        netlist._preds = netlist._succs = netlist._level = None
+        netlist._live = len(netlist._nodes)
+        return netlist
+
+    def to_csr(self) -> tuple[list[Node], np.ndarray, np.ndarray]:
+        """Return (nodes, pred_offsets, pred_ids) as from_csr takes them. Edited netlists are renumbered
+        without their removed nodes."""
+        if self._preds is None:
+            return list(self._nodes), self._pred_offsets, self._pred_ids
+        live = [i for i, node in enumerate(self._nodes) if node is not None]
+        renumber = {i: k for k, i in enumerate(live)}
+        counts = np.fromiter((len(self._preds[i]) for i in live), dtype=np.int64, count=len(live))
+        pred_offsets = np.zeros(len(live) + 1, dtype=np.int64)
+        np.cumsum(counts, out=pred_offsets[1:])
+        pred_ids = np.fromiter((renumber[j] for i in live for j in self._preds[i]), dtype=np.int32,
+                               count=int(pred_offsets[-1]))
+        return [self._nodes[i] for i in live], pred_offsets, pred_ids
+
+    def __len__(self) -> int:
+        return self._live
+
+    def __contains__(self, node: Node) -> bool:
+        if self._index is None:
+            self._index = {node: i for i, node in enumerate(self._nodes)}
+        return node in self._index
 
     @staticmethod
-    def _create_succ_graph(pred_graph: Graph) -> Graph:
-        succ_graph = {node: [] for node in pred_graph.keys()}
-        for n1 in pred_graph:
-            for n2 in pred_graph:
-                if n1 in pred_graph[n2]:
-                    succ_graph[n1].append(n2)
-        return succ_graph
+    def _create_succ_graph(pred_offsets: np.ndarray, pred_ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Invert the predecessor CSR: every edge pred -> node becomes node in pred's successor row.
+        Rows are counted with bincount. Each edge is packed into one int64 (pred << 32 | node), so a single
+        sort groups the edges by pred with every successor row in id order."""
+        n = len(pred_offsets) - 1
+        targets = np.repeat(np.arange(n, dtype=np.int64), np.diff(pred_offsets))
+        succ_offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pred_ids, minlength=n), out=succ_offsets[1:])
+        edges = np.sort(pred_ids.astype(np.int64) << 32 | targets)
+        succ_ids = (edges & 0xFFFFFFFF).astype(np.int32)
+        return succ_offsets, succ_ids
 
-    def get_level_mapping(self) -> dict[Node, int]:
+    def _id(self, node: Node) -> int:
+        if node not in self:
+            raise KeyError(f"{node!r} is not in the netlist")
+        return self._index[node]
 
-        levels = {}
+    def predecessors(self, node: Node) -> list[Node]:
+        i = self._id(node)
+        if self._preds is not None:
+            return [self._nodes[j] for j in self._preds[i]]
+        return [self._nodes[j] for j in self._pred_ids[self._pred_offsets[i]:self._pred_offsets[i + 1]].tolist()]
 
-        def _get_level_helper(node: Node):
-            if node in levels:
-                return
-            preds = self._pred_graph[node]
+    def successors(self, node: Node) -> list[Node]:
+        i = self._id(node)
+        if self._succs is not None:
+            return [self._nodes[j] for j in self._succs[i]]
+        return [self._nodes[j] for j in self._succ_ids[self._succ_offsets[i]:self._succ_offsets[i + 1]].tolist()]
 
-            if len(preds) == 0:
-                levels[node] = 0
-                return
+    def fanout(self, node: Node) -> int:
+        i = self._id(node)
+        if self._succs is not None:
+            return len(self._succs[i])
+        return int(self._succ_offsets[i + 1] - self._succ_offsets[i])
 
-            for pred in preds:
-                _get_level_helper(pred)
+    def level(self, node: Node) -> int:
+        self._thaw()
+        return self._level[self._id(node)]
 
-            levels[node] = max([levels[pred] for pred in preds]) + 1
+    def levels(self) -> np.ndarray:
+        """Return the level of every node by id: 0 for nodes without predecessors, else one more than the
+        highest level among them. Kahn's algorithm in waves: each wave is the nodes whose predecessors have
+        all been levelled, and its in-degree updates are one bincount over the successors of the whole wave.
+        Raises NetlistCycleError if some nodes are never freed, i.e. the graph has a cycle.
+        Once the netlist has been edited this is the maintained level list (-1 for removed ids)."""
+        if self._level is not None:
+            return np.array(self._level, dtype=np.int64)
+        n = len(self._nodes)
+        succ_offsets, succ_ids = self._succ_offsets, self._succ_ids
+        in_degree = np.diff(self._pred_offsets)
+        levels = np.full(n, -1, dtype=np.int64)
+        wave = np.flatnonzero(in_degree == 0)
+        level = 0
+        # Long thin stretches (chains) would pay the array overhead once per node, so waves under SMALL_WAVE
+        # nodes are walked with Python lists, until a wave grows past LARGE_WAVE again
+        offsets_list = succ_list = None
+        scalar = False
+        while len(wave):
+            levels[wave] = level
+            if scalar and len(wave) > LARGE_WAVE:
+                scalar, in_degree, wave = False, np.array(in_degree, dtype=np.int64), np.array(wave, dtype=np.int64)
+            elif not scalar and len(wave) < SMALL_WAVE:
+                if offsets_list is None:
+                    offsets_list, succ_list = succ_offsets.tolist(), succ_ids.tolist()
+                scalar, in_degree, wave = True, in_degree.tolist(), wave.tolist()
 
-        for node in self._pred_graph:
-            _get_level_helper(node)
+            if scalar:
+                freed = []
+                for i in wave:
+                    for j in succ_list[offsets_list[i]:offsets_list[i + 1]]:
+                        in_degree[j] -= 1
+                        if in_degree[j] == 0:
+                            freed.append(j)
+                wave = freed
+            else:
+                starts, ends = succ_offsets[wave], succ_offsets[wave + 1]
+                lengths = ends - starts
+                # Positions of every successor of the wave in succ_ids
+                positions = np.repeat(ends - lengths.cumsum(), lengths) + np.arange(lengths.sum())
+                targets = succ_ids[positions]
+                touched, hits = np.unique(targets, return_counts=True)
+                in_degree[touched] -= hits
+                wave = touched[in_degree[touched] == 0]
+            level += 1
 
+        if (levels < 0).any():
+            raise NetlistCycleError(self.find_cycle())
         return levels
 
+    def find_cycle(self) -> list[Node] | None:
+        """Return the nodes of one cycle in order (each a predecessor of the next), or None if there is none.
+        Nodes Kahn's algorithm cannot free all have a predecessor that is not freed either, so walking
+        backwards through such predecessors must repeat a node."""
+        if self._preds is not None:
+            # Edits refuse to close a cycle
+            return None
+        n = len(self._nodes)
+        pred_offsets, pred_ids = self._pred_offsets, self._pred_ids
+        in_degree = np.diff(pred_offsets)
+        succ_offsets, succ_list = self._succ_offsets.tolist(), self._succ_ids.tolist()
+        stack = np.flatnonzero(in_degree == 0).tolist()
+        freed = np.zeros(n, dtype=bool)
+        while stack:
+            i = stack.pop()
+            freed[i] = True
+            for j in succ_list[succ_offsets[i]:succ_offsets[i + 1]]:
+                in_degree[j] -= 1
+                if in_degree[j] == 0:
+                    stack.append(j)
+        stuck = np.flatnonzero(~freed)
+        if len(stuck) == 0:
+            return None
+
+        seen = {}
+        path = []
+        i = int(stuck[0])
+        while i not in seen:
+            seen[i] = len(path)
+            path.append(i)
+            preds = pred_ids[pred_offsets[i]:pred_offsets[i + 1]]
+            i = int(preds[~freed[preds]][0])
+        cycle = path[seen[i]:][::-1]
+        return [self._nodes[j] for j in cycle]
+
+    def get_level_mapping(self) -> dict[Node, int]:
+        return {node: level for node, level in zip(self._nodes, self.levels().tolist()) if level >= 0}
+
+    # Editing
+    def add_node(self, node: Node, preds: list[Node] = ()) -> None:
+        """Add node, driven by preds (which must already be in the netlist)."""
+        if node in self:
+            raise ValueError(f"{node!r} is already in the netlist")
+        pred_ids = [self._id(pred) for pred in preds]
+        self._thaw()
+        i = len(self._nodes)
+        self._nodes.append(node)
+        self._index[node] = i
+        self._preds.append(pred_ids)
+        self._succs.append([])
+        self._level.append(self._level_from_preds(i))
+        for j in pred_ids:
+            self._succs[j].append(i)
+        self._live += 1
+
+    def remove_node(self, node: Node) -> None:
+        """Remove node and every edge into or out of it. Its successors lose an input and may drop a level."""
+        i = self._id(node)
+        self._thaw()
+        for j in self._preds[i]:
+            self._succs[j].remove(i)
+        succs = self._succs[i]
+        for j in succs:
+            self._preds[j].remove(i)
+        self._preds[i], self._succs[i] = [], []
+        self._level[i] = -1
+        self._nodes[i] = None
+        del self._index[node]
+        self._live -= 1
+        self._update_levels(succs)
+
+    def add_edge(self, pred: Node, node: Node) -> None:
+        """Make pred drive node. Raises NetlistCycleError, leaving the netlist unchanged, if node already
+        reaches pred."""
+        i, j = self._id(pred), self._id(node)
+        self._thaw()
+        path = self._path(j, i)
+        if path is not None:
+            raise NetlistCycleError([self._nodes[k] for k in path])
+        self._preds[j].append(i)
+        self._succs[i].append(j)
+        self._update_levels([j])
+
+    def remove_edge(self, pred: Node, node: Node) -> None:
+        """Remove one edge pred -> node."""
+        i, j = self._id(pred), self._id(node)
+        self._thaw()
+        if i not in self._preds[j]:
+            raise KeyError(f"{pred!r} does not drive {node!r}")
+        self._preds[j].remove(i)
+        self._succs[i].remove(j)
+        self._update_levels([j])
+
+    def replace_node(self, old: Node, new: Node) -> None:
+        """Put new in the place of old, with the same predecessors and successors (e.g. to change its gate).
+        Levels do not change."""
+        i = self._id(old)
+        if new in self:
+            raise ValueError(f"{new!r} is already in the netlist")
+        self._thaw()
+        self._nodes[i] = new
+        del self._index[old]
+        self._index[new] = i
+
+    def _thaw(self) -> None:
+        """Switch from CSR arrays to editable lists of ids, computing the levels the edits maintain."""
+        if self._preds is not None:
+            return
+        level = self.levels().tolist()
+        if self._index is None:
+            self._index = {node: i for i, node in enumerate(self._nodes)}
+        pred_offsets, pred_ids = self._pred_offsets.tolist(), self._pred_ids.tolist()
+        succ_offsets, succ_ids = self._succ_offsets.tolist(), self._succ_ids.tolist()
+        n = len(self._nodes)
+        self._preds = [pred_ids[pred_offsets[i]:pred_offsets[i + 1]] for i in range(n)]
+        self._succs = [succ_ids[succ_offsets[i]:succ_offsets[i + 1]] for i in range(n)]
+        self._level = level
+        self._pred_offsets = self._pred_ids = self._succ_offsets = self._succ_ids = None
+
+    def _level_from_preds(self, i: int) -> int:
+        level = self._level
+        return 1 + max((level[j] for j in self._preds[i]), default=-1)
+
+    def _update_levels(self, starts: list[int]) -> None:
+        """Recompute the level of starts, then of the successors of every node whose level changed, lowest
+        level first. Nodes outside that fan-out are never visited."""
+        level = self._level
+        pending = set(starts)
+        heap = [(level[i], i) for i in pending]
+        heapq.heapify(heap)
+        while heap:
+            _, i = heapq.heappop(heap)
+            pending.discard(i)
+            new = self._level_from_preds(i)
+            if new != level[i]:
+                level[i] = new
+                for j in self._succs[i]:
+                    # A queued node reads all its predecessors when popped, so one entry is enough
+                    if j not in pending:
+                        pending.add(j)
+                        heapq.heappush(heap, (new + 1, j))
+
+    def _path(self, start: int, goal: int) -> list[int] | None:
+        """Return the ids of a path start -> ... -> goal, or None. Every node on such a path has a lower level
+        than goal, so the search stays below it."""
+        limit = self._level[goal]
+        parent = {start: None}
+        stack = [start]
+        while stack:
+            i = stack.pop()
+            if i == goal:
+                path = []
+                while i is not None:
+                    path.append(i)
+                    i = parent[i]
+                return path[::-1]
+            for j in self._succs[i]:
+                if j not in parent and (j == goal or self._level[j] < limit):
+                    parent[j] = i
+                    stack.append(j)
+        return None
+
+
+if __name__ == "__main__":
+    n1 = Node("n1", AND())
+    n2 = Node("n2", OR())
+    n3 = Node("n3", AND())
+    n4 = Node("n4", OR())
+    n5 = Node("n5", OR())
+    n6 = Node("n6", AND())
+    n7 = Node("n7", AND())
+    n8 = Node("n8", OR())
+
+    graph = {}
+    graph[n1] = []
+    graph[n2] = []
+    graph[n3] = []
+    graph[n4] = [n1, n2]
+    graph[n5] = [n3, n4]
+    graph[n6] = [n5]
+    graph[n7] = [n2, n4, n5]
+    graph[n8] = [n7]
+    net = Netlist(graph)
 
-n1 = Node("n1", AND())
-n2 = Node("n2", OR())
-n3 = Node("n3", AND())
-n4 = Node("n4", OR())
-n5 = Node("n5", OR())
-n6 = Node("n6", AND())
-n7 = Node("n7", AND())
-n8 = Node("n8", OR())
-
-graph = {}
-graph[n1] = []
-graph[n2] = []
-graph[n3] = []
-graph[n4] = [n1, n2]
-graph[n5] = [n3, n4]
-graph[n6] = [n5]
-graph[n7] = [n2, n4, n5]
-graph[n8] = [n7]
-net = Netlist(graph)
-
-print(net.get_level_mapping())
-print(net._pred_graph)
-print(net._succ_graph)
+    print(net.get_level_mapping())
+    print({node: net.predecessors(node) for node in graph})
+    print({node: net.successors(node) for node in graph})
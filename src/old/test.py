@@ -1,4 +1,6 @@
-from simplify_expression import SimplifyExpression
+from compiler.simplify_expression import SimplifyExpression
+
+# Usage (from the repository root): python -m src.old.test
 
 
 minterms = ["0100", "1000", "1010", "1011", "1100", "1111"]
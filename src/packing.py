@@ -0,0 +1,125 @@
+from collections.abc import Callable
+
+import numpy as np
+
+from canvas import Canvas
+from const import CanvasPlacingError, Coord2
+from gates import Gate
+
+# A heuristic scores the free rectangles a width x length footprint fits in (rows of x, y, width, length);
+# the footprint goes in the corner of the one with the smallest scores, compared in order
+Heuristic = Callable[[np.ndarray, int, int], tuple[np.ndarray, ...]]
+
+
+def best_short_side_fit(free: np.ndarray, width: int, length: int) -> tuple[np.ndarray, ...]:
+    # Least space left along the tighter side, then along the other
+    left_w, left_l = free[:, 2] - width, free[:, 3] - length
+    return np.minimum(left_w, left_l), np.maximum(left_w, left_l)
+
+
+def best_long_side_fit(free: np.ndarray, width: int, length: int) -> tuple[np.ndarray, ...]:
+    left_w, left_l = free[:, 2] - width, free[:, 3] - length
+    return np.maximum(left_w, left_l), np.minimum(left_w, left_l)
+
+
+def best_area_fit(free: np.ndarray, width: int, length: int) -> tuple[np.ndarray, ...]:
+    left_w, left_l = free[:, 2] - width, free[:, 3] - length
+    return free[:, 2] * free[:, 3], np.minimum(left_w, left_l)
+
+
+def bottom_left(free: np.ndarray, width: int, length: int) -> tuple[np.ndarray, ...]:
+    # Lowest top edge, then leftmost
+    return free[:, 1] + length, free[:, 0]
+
+
+HEURISTICS: dict[str, Heuristic] = {
+    "best_short_side_fit": best_short_side_fit,
+    "best_long_side_fit": best_long_side_fit,
+    "best_area_fit": best_area_fit,
+    "bottom_left": bottom_left,
+}
+
+
+class FreeRectangles:
+    """The free space of a width x length area as its maximal free rectangles: every empty rectangle of the
+    area lies inside one of them, and none lies inside another. They are rows of x, y, width, length in one
+    array, so finding where a footprint fits is one vectorised pass over the free rectangles, whatever the
+    area's size. Occupying a rectangle only splits the free rectangles it overlaps (into up to four strips
+    each) and drops the strips that lie inside another free rectangle."""
+
+    def __init__(self, width: int, length: int, heuristic: str | Heuristic = "best_short_side_fit") -> None:
+        self._free = np.array([[0, 0, width, length]], dtype=np.int64)
+        self.heuristic = HEURISTICS[heuristic] if isinstance(heuristic, str) else heuristic
+
+    def __len__(self) -> int:
+        return len(self._free)
+
+    def get_rectangles(self) -> list[tuple[int, int, int, int]]:
+        return list(map(tuple, self._free.tolist()))
+
+    def find(self, width: int, length: int) -> Coord2 | None:
+        """Return the corner the heuristic picks for a width x length footprint, or None if none fits."""
+        free = self._free
+        fits = free[(free[:, 2] >= width) & (free[:, 3] >= length)]
+        if len(fits) == 0:
+            return None
+        scores = self.heuristic(fits, width, length)
+        best = np.lexsort(scores[::-1])[0]
+        return int(fits[best, 0]), int(fits[best, 1])
+
+    def occupy(self, x: int, y: int, width: int, length: int) -> None:
+        free = self._free
+        fx, fy, fw, fl = free.T
+        overlap = (fx < x + width) & (x < fx + fw) & (fy < y + length) & (y < fy + fl)
+        if not overlap.any():
+            return
+        kept = free[~overlap]
+        hx, hy, hw, hl = free[overlap].T
+
+        # The strips of each overlapped rectangle left, right, below and above the occupied one
+        right, top = hx + hw, hy + hl
+        strips = np.concatenate([
+            np.stack([hx, hy, x - hx, hl], axis=1),
+            np.stack([np.full_like(hx, x + width), hy, right - x - width, hl], axis=1),
+            np.stack([hx, hy, hw, y - hy], axis=1),
+            np.stack([hx, np.full_like(hy, y + length), hw, top - y - length], axis=1),
+        ])
+        strips = strips[(strips[:, 2] > 0) & (strips[:, 3] > 0)]
+
+        # Strips inside a kept rectangle or inside another strip are not maximal (of equal strips the first
+        # is kept). Kept rectangles never lie inside a strip: a strip lies inside a rectangle they did not.
+        others = np.concatenate([kept, strips])
+        sx, sy, sw, sl = (column[:, None] for column in strips.T)
+        ox, oy, ow, ol = others.T
+        inside = (sx >= ox) & (sy >= oy) & (sx + sw <= ox + ow) & (sy + sl <= oy + ol)
+        # Among the strips, every strip is inside itself and equal strips are inside each other: a strip only
+        # counts as inside one that differs from it, or an equal one that comes before it
+        distinct = (strips[:, None] != strips[None, :]).any(axis=2)
+        inside[:, len(kept):] &= distinct | np.tri(len(strips), k=-1, dtype=bool)
+        self._free = np.concatenate([kept, strips[~inside.any(axis=1)]])
+
+
+class Packer:
+    """Places gates on a canvas where a FreeRectangles index of it says they fit, without scanning the
+    canvas. Gates already on the canvas are taken as occupied; gates placed on it other than through
+    place() must be passed to occupy()."""
+
+    def __init__(self, canvas: Canvas, heuristic: str | Heuristic = "best_short_side_fit") -> None:
+        self._canvas = canvas
+        self._free = FreeRectangles(*canvas.get_size(), heuristic)
+        for corner, gate in canvas.get_gates().items():
+            self.occupy(corner, gate)
+
+    def find(self, gate: Gate) -> Coord2 | None:
+        return self._free.find(*gate.get_size())
+
+    def place(self, gate: Gate) -> Coord2:
+        corner = self.find(gate)
+        if corner is None:
+            raise CanvasPlacingError(f"No room left for a {gate.get_width()} x {gate.get_length()} gate.")
+        self._canvas[corner] = gate
+        self.occupy(corner, gate)
+        return corner
+
+    def occupy(self, corner: Coord2, gate: Gate) -> None:
+        self._free.occupy(*corner, *gate.get_size())
@@ -1,12 +1,180 @@
+from math import ceil, sqrt
+
+import numpy as np
+
+from analytical import QuadraticPlacer
+from annealing import Annealer
 from canvas import Canvas
-from netlist import Netlist
+from const import Coord2
+from gates import AND, NOT, OR
+from multistart import Start, multi_start
+from netlist import Netlist, Node
+
+# Blocks left free between columns (for wires) and between gates in a column
+COLUMN_GAP = 2
+ROW_GAP = 1
 
 
 class Placer:
+    """Constructive placement in columns: gates of level k go in column k, left to right, so every wire runs
+    forwards. The canvas is sized from the gates' footprint: columns are at most about the square root of
+    the total area long, and a level with more gates than fit wraps into several columns.
 
-    def __init__(self, netlist: Netlist) -> None:
+    Columns are filled in one pass each, in level order. The gates of a column are sorted by the barycentre
+    of their predecessors' output pins, dealt round robin over the level's columns, and each put as close to
+    its barycentre as the room left below the column's end allows. With barycentre=False gates keep the
+    netlist's order and are packed from the start of the column."""
+
+    def __init__(self, netlist: Netlist, barycentre: bool = True) -> None:
         self._netlist = netlist
-        self._canvas = Canvas(10, 10)
+        self.barycentre = barycentre
+        self._canvas = None
+        self._positions: dict[Node, Coord2] = {}
+
+    def get_canvas(self) -> Canvas:
+        return self._canvas
 
-    def place_gates(self) -> None:
+    def get_positions(self) -> dict[Node, Coord2]:
+        return self._positions
+
+    def place_gates(self) -> dict[Node, Coord2]:
         levels = self._netlist.get_level_mapping()
+        by_level: list[list[Node]] = [[] for _ in range(max(levels.values(), default=-1) + 1)]
+        for node, level in levels.items():
+            by_level[level].append(node)
+
+        area = sum((node.gate.get_width() + COLUMN_GAP) * (node.gate.get_length() + ROW_GAP) for node in levels)
+        tallest = max((node.gate.get_length() for node in levels), default=0)
+        length = max(ceil(sqrt(area)), tallest)
+
+        positions = {}
+        x = 0
+        for nodes in by_level:
+            nodes.sort(key=lambda node: self._barycentre(node, positions))
+            needed = sum(node.gate.get_length() + ROW_GAP for node in nodes) - ROW_GAP
+            n_columns = -(-(needed + ROW_GAP) // (length + ROW_GAP))
+            # Some gates may not fit after dealing, so add columns until they all do
+            while (columns := self._fill(nodes, n_columns, length, positions, x)) is None:
+                n_columns += 1
+            x += sum(columns) + COLUMN_GAP * len(columns)
+
+        self._set_positions(positions, (max(x - COLUMN_GAP, 0), length))
+        return positions
+
+    def place_analytical(self, tolerance: float = 1e-5, max_iterations: int = 1000) -> dict[Node, Coord2]:
+        """Improve the placement (the column placement if there is none yet) by rounds of quadratic
+        wirelength minimisation and legalisation (see QuadraticPlacer), on the same canvas size. Scales to
+        netlists far too large for annealing."""
+        if self._canvas is None:
+            self.place_gates()
+        size = self._canvas.get_size()
+        placer = QuadraticPlacer(self._netlist, COLUMN_GAP, ROW_GAP)
+        positions = placer.place(self._positions, size, tolerance, max_iterations)
+        self._set_positions(positions, size)
+        return positions
+
+    def refine(self, time_budget: float | None = None, moves: int | None = None, seed: int = 0,
+               **schedule) -> dict[Node, Coord2]:
+        """Improve the placement by simulated annealing (see Annealer for the schedule's keywords), on the
+        same canvas size."""
+        size = self._canvas.get_size()
+        annealer = Annealer(self._netlist, self._positions, size, seed=seed, **schedule)
+        positions = annealer.run(time_budget, moves)
+        self._set_positions(positions, size)
+        return positions
+
+    def refine_parallel(self, starts: int, jobs: int = 0, time_budget: float | None = None,
+                        moves: int | None = None, seed: int = 0, timing: bool = False, **schedule) -> list[Start]:
+        """Refine from starts seeds at once in a process pool (see multi_start) and keep the best run, by
+        HPWL or with timing by critical delay. Returns every run, best first; refine(seed=run.seed,
+        moves=run.moves) from the same placement reproduces a run."""
+        size = self._canvas.get_size()
+        runs = multi_start(self._netlist, self._positions, size, starts, jobs, time_budget, moves, seed, timing,
+                           **schedule)
+        self._set_positions(runs[0].positions, size)
+        return runs
+
+    def _set_positions(self, positions: dict[Node, Coord2], size: tuple[int, int]) -> None:
+        self._canvas = Canvas(*size)
+        for node, corner in positions.items():
+            self._canvas[corner] = node.gate
+        self._positions = positions
+
+    def _barycentre(self, node: Node, positions: dict[Node, Coord2]) -> float:
+        """Mean y of the output pins driving node, less that of its input pins: where it should start."""
+        preds = self._netlist.predecessors(node)
+        if not preds or not self.barycentre:
+            return 0.0
+        pins = [positions[pred][1] + pred.gate.get_output()[1] for pred in preds]
+        inputs = [y for _, y in node.gate.get_inputs()]
+        return sum(pins) / len(pins) - sum(inputs) / len(inputs)
+
+    def _fill(self, nodes: list[Node], n_columns: int, length: int, positions: dict[Node, Coord2],
+              x: int) -> list[int] | None:
+        """Place nodes (sorted) in n_columns columns from x on, node i in column i % n_columns. Returns the
+        column widths, or None (placing nothing) if some column overflows."""
+        dealt = [nodes[i::n_columns] for i in range(n_columns)]
+        placed = {}
+        widths = []
+        for column in dealt:
+            # Blocks the rest of the column needs, gaps included
+            rest = sum(node.gate.get_length() + ROW_GAP for node in column) - ROW_GAP
+            if rest > length:
+                return None
+            y = 0
+            for node in column:
+                target = round(self._barycentre(node, positions))
+                y = min(max(y, target), length - rest)
+                placed[node] = (x, y)
+                step = node.gate.get_length() + ROW_GAP
+                y += step
+                rest -= step
+            width = max((node.gate.get_width() for node in column), default=0)
+            widths.append(width)
+            x += width + COLUMN_GAP
+        positions.update(placed)
+        return widths
+
+    def hpwl(self, positions: dict[Node, Coord2] | None = None) -> int:
+        """Total half-perimeter wirelength: per driver, the width plus the height of the box around its
+        output pin and the input pins it drives (the k-th predecessor of a gate drives its pin k)."""
+        positions = self._positions if positions is None else positions
+        nodes = list(positions)
+        index = {node: i for i, node in enumerate(nodes)}
+        out = np.array([(positions[node][0] + node.gate.get_output()[0], positions[node][1] +
+                         node.gate.get_output()[1]) for node in nodes], dtype=np.int64).reshape(-1, 2)
+        drivers, pins = [], []
+        for node in nodes:
+            x, y = positions[node]
+            inputs = node.gate.get_inputs()
+            for k, pred in enumerate(self._netlist.predecessors(node)):
+                in_x, in_y = inputs[k % len(inputs)]
+                drivers.append(index[pred])
+                pins.append((x + in_x, y + in_y))
+        drivers = np.array(drivers, dtype=np.int64)
+        pins = np.array(pins, dtype=np.int64).reshape(-1, 2)
+
+        low, high = out.copy(), out.copy()
+        np.minimum.at(low, drivers, pins)
+        np.maximum.at(high, drivers, pins)
+        return int((high - low).sum())
+
+
+if __name__ == "__main__":
+    n1 = Node("n1", NOT())
+    n2 = Node("n2", NOT())
+    n3 = Node("n3", NOT())
+    n4 = Node("n4", OR())
+    n5 = Node("n5", OR())
+    n6 = Node("n6", AND())
+    n7 = Node("n7", AND())
+    n8 = Node("n8", OR())
+
+    graph = {n1: [], n2: [], n3: [], n4: [n1, n2], n5: [n3, n4], n6: [n5], n7: [n2, n4], n8: [n7, n6]}
+    placer = Placer(Netlist(graph))
+    print(placer.place_gates())
+    print(placer.get_canvas())
+    print(f"HPWL: {placer.hpwl()}")
+    placer.refine(moves=20_000)
+    print(placer.get_canvas())
+    print(f"HPWL after annealing: {placer.hpwl()}")
@@ -0,0 +1,181 @@
+import heapq
+
+from const import Coord2
+from gates import AND, NOT, OR, Repeater
+from netlist import Netlist, Node
+
+# Wires carry a repeater (1 tick) on their first block and every 16 blocks after, as Wire.east/west lay them
+REPEATER_SPACING = 16
+REPEATER_DELAY = 1
+
+
+def wire_delay(length: int) -> int:
+    """Ticks through a wire of length blocks."""
+    return -(-length // REPEATER_SPACING) * REPEATER_DELAY
+
+
+class Timing:
+    """Static timing of a netlist in redstone ticks. A node's arrival is the time its output settles: its gate
+    delay after the latest of its inputs, where an input arrives the wire delay after its driver's output.
+    Nodes without predecessors are driven at time 0. A node's tail is the longest delay from its output
+    through the rest of the netlist, so its required time is the clock (by default the critical delay, the
+    latest arrival) minus its tail, and its slack is what is left between the two.
+
+    Wires are as long as the Manhattan distance from the driver's output pin to the input pin the edge uses
+    (the k-th predecessor uses pin k), given positions of the gates' corners; edges with an unplaced end
+    have no delay.
+
+    analyse() times everything in one sweep forwards and one backwards in level order. After that, move()
+    and update() only revisit the fan-out whose arrival changes and the fan-in whose tail changes."""
+
+    def __init__(self, netlist: Netlist, positions: dict[Node, Coord2] | None = None,
+                 clock: int | None = None) -> None:
+        self._netlist = netlist
+        self._positions = dict(positions) if positions is not None else {}
+        self.clock = clock
+        self._arrival: dict[Node, int] = {}
+        self._tail: dict[Node, int] = {}
+        self.analyse()
+
+    # Queries
+    def arrival(self, node: Node) -> int:
+        return self._arrival[node]
+
+    def required(self, node: Node) -> int:
+        return self.get_clock() - self._tail[node]
+
+    def slack(self, node: Node) -> int:
+        return self.required(node) - self._arrival[node]
+
+    def get_delay(self) -> int:
+        """The critical delay: the latest arrival over the netlist."""
+        return max(self._arrival.values(), default=0)
+
+    def get_clock(self) -> int:
+        return self.clock if self.clock is not None else self.get_delay()
+
+    def critical_path(self) -> list[Node]:
+        """Return the nodes of a path with the latest arrival, from the driving node to the last one."""
+        if not self._arrival:
+            return []
+        node = max(self._arrival, key=self._arrival.get)
+        path = [node]
+        while True:
+            ready = self._arrival[node] - node.gate.get_delay()
+            pred = next((pred for pred in self._netlist.predecessors(node)
+                         if self._arrival[pred] + self._wire_delay(pred, node) == ready), None)
+            if pred is None:
+                return path[::-1]
+            node = pred
+            path.append(node)
+
+    def report(self) -> str:
+        path = self.critical_path()
+        return f"Critical path: {self.get_delay()} ticks, {len(path)} gates ({' -> '.join(map(repr, path))})"
+
+    # Analysis
+    def analyse(self) -> None:
+        levels = self._netlist.get_level_mapping()
+        order = sorted(levels, key=levels.get)
+        self._arrival = {}
+        for node in order:
+            self._arrival[node] = self._arrival_from_preds(node)
+        self._tail = {}
+        for node in reversed(order):
+            self._tail[node] = self._tail_from_succs(node)
+
+    def move(self, node: Node, position: Coord2 | None) -> None:
+        """Place node at position (None to unplace it) and retime what its wires change."""
+        if position is None:
+            self._positions.pop(node, None)
+        else:
+            self._positions[node] = position
+        succs = self._netlist.successors(node)
+        preds = self._netlist.predecessors(node)
+        self._update_arrivals([node, *succs])
+        self._update_tails([node, *preds])
+
+    def update(self, nodes: list[Node]) -> None:
+        """Retime after netlist edits: nodes are those whose gate or predecessors changed, or which lost a
+        successor. Removed nodes are forgotten, so pass their former neighbours instead."""
+        for node in list(self._arrival):
+            if node not in self._netlist:
+                del self._arrival[node], self._tail[node]
+                self._positions.pop(node, None)
+        nodes = [node for node in nodes if node in self._netlist]
+        for node in nodes:
+            self._arrival.setdefault(node, 0)
+            self._tail.setdefault(node, 0)
+        self._update_arrivals(nodes)
+        self._update_tails([pred for node in nodes for pred in [node, *self._netlist.predecessors(node)]])
+
+    def _update_arrivals(self, starts: list[Node]) -> None:
+        # Lowest level first, so a node is usually retimed once after all its changed predecessors
+        level = self._netlist.level
+        pending = set(starts)
+        heap = [(level(node), id(node), node) for node in pending]
+        heapq.heapify(heap)
+        while heap:
+            _, _, node = heapq.heappop(heap)
+            pending.discard(node)
+            arrival = self._arrival_from_preds(node)
+            if arrival != self._arrival[node]:
+                self._arrival[node] = arrival
+                for succ in self._netlist.successors(node):
+                    if succ not in pending:
+                        pending.add(succ)
+                        heapq.heappush(heap, (level(succ), id(succ), succ))
+
+    def _update_tails(self, starts: list[Node]) -> None:
+        level = self._netlist.level
+        pending = set(starts)
+        heap = [(-level(node), id(node), node) for node in pending]
+        heapq.heapify(heap)
+        while heap:
+            _, _, node = heapq.heappop(heap)
+            pending.discard(node)
+            tail = self._tail_from_succs(node)
+            if tail != self._tail[node]:
+                self._tail[node] = tail
+                for pred in self._netlist.predecessors(node):
+                    if pred not in pending:
+                        pending.add(pred)
+                        heapq.heappush(heap, (-level(pred), id(pred), pred))
+
+    def _arrival_from_preds(self, node: Node) -> int:
+        ready = max((self._arrival[pred] + self._wire_delay(pred, node)
+                     for pred in self._netlist.predecessors(node)), default=0)
+        return ready + node.gate.get_delay()
+
+    def _tail_from_succs(self, node: Node) -> int:
+        return max((self._wire_delay(node, succ) + succ.gate.get_delay() + self._tail[succ]
+                    for succ in self._netlist.successors(node)), default=0)
+
+    def _wire_delay(self, pred: Node, node: Node) -> int:
+        if pred not in self._positions or node not in self._positions:
+            return 0
+        (px, py), (x, y) = self._positions[pred], self._positions[node]
+        out_x, out_y = pred.gate.get_output()
+        inputs = node.gate.get_inputs()
+        in_x, in_y = inputs[self._netlist.predecessors(node).index(pred) % len(inputs)]
+        return wire_delay(abs(px + out_x - x - in_x) + abs(py + out_y - y - in_y))
+
+
+if __name__ == "__main__":
+    a = Node("a", Repeater())
+    b = Node("b", Repeater())
+    c = Node("c", Repeater())
+    nand = Node("nand", AND())
+    inv = Node("inv", NOT())
+    out = Node("out", OR())
+    delay = Node("delay", Repeater(3))
+
+    net = Netlist({a: [], b: [], c: [], nand: [a, b], inv: [nand], out: [inv, c], delay: [c]})
+    timing = Timing(net)
+    print(timing.report())
+    print({node: timing.slack(node) for node in (a, b, c, nand, inv, out, delay)})
+
+    timing.move(c, (0, 0))
+    timing.move(out, (60, 0))
+    print(timing.report())
+    print({node: timing.slack(node) for node in (a, b, c, nand, inv, out, delay)})